@@ -0,0 +1,57 @@
+##############################################################################
+#                 Steady Readings from Potentiometers                        #
+##############################################################################
+# A single AnalogIn reading jitters by a few counts even when nobody is     #
+# touching the knob, so anything recomputed when a knob moves would be      #
+# recomputed all the time. AnalogControl averages several readings, then   #
+# ignores changes smaller than a deadband (so it doesn't flicker between    #
+# two values when the knob sits on the edge), and scales the result to an  #
+# integer range with integer maths. update() says whether the value        #
+# actually changed, so whatever depends on it only needs redoing then.     #
+##############################################################################
+
+class AnalogControl:
+    #------------------------------------------------------------------------
+    # value runs from low (knob at 0) to high (knob at full). (high - low)
+    # should be under 16384 so the scaling stays in small integers on a
+    # board. deadband is in raw 16-bit counts.
+    #------------------------------------------------------------------------
+    def __init__(self, analog_in, low, high, oversample=8, deadband=128):
+        self.analog_in = analog_in
+        self.low = low
+        self.span = high - low
+        self.oversample = oversample
+        self.deadband = deadband
+        self.changes = 0
+        self.level = self.read_raw()
+        self.value = self.scale(self.level)
+
+    # Average of oversample readings, 0-65535
+    def read_raw(self):
+        total = 0
+        analog_in = self.analog_in
+        for _ in range(self.oversample):
+            total += analog_in.value
+        return total // self.oversample
+
+    def scale(self, level):
+        return self.low + (level * self.span + 32767) // 65535
+
+    # Take a new reading. Returns True if value changed.
+    def update(self):
+        level = self.read_raw()
+        # Snap to the ends, so the deadband can't stop the knob reaching them
+        if level <= self.deadband:
+            level = 0
+        elif level >= 65535 - self.deadband:
+            level = 65535
+        if level == self.level or (0 < level < 65535 and
+                                   -self.deadband <= level - self.level <= self.deadband):
+            return False
+        self.level = level
+        value = self.scale(level)
+        if value == self.value:
+            return False
+        self.value = value
+        self.changes += 1
+        return True
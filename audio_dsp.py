@@ -0,0 +1,372 @@
+##############################################################################
+#                 Audio Analysis Helpers for CircuitPython                   #
+##############################################################################
+# Used by the Perfect Pitch Machine to measure the microphone.              #
+#                                                                            #
+# normalized_rms() uses ulab (CircuitPython's numpy) when the board has it, #
+# or numpy on a host, and otherwise a single pass of integer arithmetic.   #
+# RMS_BACKEND says which one was picked.                                    #
+#                                                                            #
+# LoudnessTracker follows the loudness of a continuous stream of samples   #
+# instead of one block at a time, and PitchDetector finds which of a set of #
+# notes is being sounded for the machine's tuner mode.                      #
+##############################################################################
+
+import array
+import math
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+#----------------------------------------------------------------------------
+# RMS of a block of samples after removing the DC bias, which is taken as the
+# mean truncated to an integer. One pass over the data, all in integers.
+#
+# Samples are first offset by the first sample, a cheap estimate of the
+# bias, so the running sums stay small. On a board that keeps them inside
+# the small-integer range, so the loop doesn't allocate long integers.
+#----------------------------------------------------------------------------
+def normalized_rms_python(values):
+    n = len(values)
+    offset = values[0]
+    total = 0
+    squares = 0
+    for sample in values:
+        d = sample - offset
+        total += d
+        squares += d * d
+    # Bias relative to the offset; same as int(mean(values)) - offset
+    bias = int((total + n * offset) / n) - offset
+    return math.sqrt((squares - 2 * bias * total + n * bias * bias) / n)
+
+#----------------------------------------------------------------------------
+# The same result, computed with ulab/numpy array operations.
+#----------------------------------------------------------------------------
+if np is not None:
+    if hasattr(np, "float64"):
+        _FLOAT = np.float64
+    else:
+        _FLOAT = np.float
+
+    def normalized_rms_vector(values):
+        samples = np.array(values, dtype=_FLOAT)
+        samples = samples - int(np.mean(samples))
+        return math.sqrt(np.mean(samples * samples))
+
+    normalized_rms = normalized_rms_vector
+    RMS_BACKEND = "vector"
+else:
+    normalized_rms = normalized_rms_python
+    RMS_BACKEND = "python"
+
+#----------------------------------------------------------------------------
+# Tracks loudness over a sliding window of the most recent samples, with
+# attack and release thresholds for deciding when a sound starts and stops.
+#
+# Each new sample costs O(1): its deviation from the DC level is squared
+# and added to a running sum, and the square of the sample leaving the
+# window is subtracted. The DC level is followed by a one-pole IIR filter
+# (held in fixed point with 8 fractional bits), so slow bias drift doesn't
+# read as sound. Squares are stored shifted right by SQUARE_SHIFT bits so
+# the running sum stays inside a board's small-integer range.
+#
+# The tracker goes active when the RMS rises above the attack level and
+# stays active until it falls below the (lower) release level, so noise
+# hovering around one threshold can't flicker it on and off. flush() starts
+# the window again without losing that: an active tracker goes active again
+# once the window has refilled, if the new sound is above the release level.
+#----------------------------------------------------------------------------
+SQUARE_SHIFT = 8
+
+class LoudnessTracker:
+    def __init__(self, window=480, attack=5000, release=3500, dc_shift=10,
+                 dc_start=32768):
+        self.window = window
+        self.squares = array.array("L", [0] * window)
+        self.pos = 0
+        self.sum = 0
+        self.dc_shift = dc_shift
+        self.dc = dc_start << 8
+        self.active = False
+        # Set by flush() while active: samples left until the window has
+        # refilled and the release level decides
+        self.held = False
+        self.filling = 0
+        self.set_thresholds(attack, release)
+
+    # Thresholds are RMS levels in sample units, like normalized_rms().
+    # They're kept as windowed sums of shifted squares so the per-sample
+    # test needs no square root.
+    def set_thresholds(self, attack, release):
+        self.attack = attack
+        self.release = release
+        self.attack_sum = (attack * attack * self.window) >> SQUARE_SHIFT
+        self.release_sum = (release * release * self.window) >> SQUARE_SHIFT
+
+    # Add one sample. Returns True if this sample made the tracker go active.
+    def update(self, sample):
+        x = sample << 8
+        self.dc += (x - self.dc) >> self.dc_shift
+        d = (x - self.dc) >> 8
+        square = (d * d) >> SQUARE_SHIFT
+        pos = self.pos
+        self.sum += square - self.squares[pos]
+        self.squares[pos] = square
+        pos += 1
+        if pos == self.window:
+            pos = 0
+        self.pos = pos
+        if self.active:
+            if self.sum < self.release_sum:
+                self.active = False
+        elif self.sum > self.attack_sum:
+            self.active = True
+            self.held = False
+            return True
+        elif self.held:
+            self.filling -= 1
+            if self.filling == 0:
+                self.held = False
+                if self.sum >= self.release_sum:
+                    self.active = True
+                    return True
+        return False
+
+    # Add a block of samples, e.g. from PDMIn.record(). Returns True if the
+    # tracker went active at any point during the block.
+    def update_block(self, samples, count=None):
+        if count is None:
+            count = len(samples)
+        started = False
+        squares = self.squares
+        window = self.window
+        dc_shift = self.dc_shift
+        dc = self.dc
+        total = self.sum
+        pos = self.pos
+        active = self.active
+        held = self.held
+        filling = self.filling
+        attack_sum = self.attack_sum
+        release_sum = self.release_sum
+        for i in range(count):
+            x = samples[i] << 8
+            dc += (x - dc) >> dc_shift
+            d = (x - dc) >> 8
+            square = (d * d) >> SQUARE_SHIFT
+            total += square - squares[pos]
+            squares[pos] = square
+            pos += 1
+            if pos == window:
+                pos = 0
+            if active:
+                if total < release_sum:
+                    active = False
+            elif total > attack_sum:
+                active = True
+                held = False
+                started = True
+            elif held:
+                filling -= 1
+                if filling == 0:
+                    held = False
+                    if total >= release_sum:
+                        active = True
+                        started = True
+        self.dc = dc
+        self.sum = total
+        self.pos = pos
+        self.active = active
+        self.held = held
+        self.filling = filling
+        return started
+
+    # Forget the window, e.g. after a gap in the recording. The DC level is
+    # kept, since the bias doesn't change while we're not listening.
+    def clear(self):
+        self.flush()
+        self.active = False
+        self.held = False
+
+    # Forget the window's samples, e.g. ones that heard our own output, but
+    # not whether the sound was on: if it was, the tracker goes active again
+    # once the window has refilled with sound above the release level.
+    def flush(self):
+        squares = self.squares
+        for i in range(self.window):
+            squares[i] = 0
+        self.sum = 0
+        self.pos = 0
+        self.held = self.active or self.held
+        self.filling = self.window
+        self.active = False
+
+    # Current RMS over the window, in sample units
+    def rms(self):
+        return math.sqrt((self.sum << SQUARE_SHIFT) / self.window)
+
+    # Current DC level, in sample units
+    def dc_level(self):
+        return self.dc >> 8
+
+#----------------------------------------------------------------------------
+# Finds which of a set of note frequencies is being sounded, and how many
+# cents sharp or flat it is, using a bank of Goertzel filters: one per note,
+# plus a guard filter a semitone beyond each end of the range. Each filter
+# measures the signal's strength at a single frequency for a couple of
+# multiplies per sample, so the bank is much cheaper than an FFT when all we
+# want is a dozen or so notes.
+#
+# Samples are fed in as they're recorded with add_samples(), which averages
+# each group of `decimate` samples (16 kHz down to 4 kHz by default) into the
+# analysis block. When the block is full, analyze() removes the DC bias,
+# applies a Hann window, scales the block to 10 bits and runs the filters in
+# integer arithmetic with coefficients in 1/4096ths. The block is sized so
+# neighbouring filters are about one frequency bin apart, and the cents are
+# found by fitting a parabola through the log strengths of the strongest
+# filter and its neighbours.
+#----------------------------------------------------------------------------
+GOERTZEL_BITS = 12
+GOERTZEL_SAMPLE_BITS = 10
+
+class PitchDetector:
+    def __init__(self, frequencies, sample_rate=16000, decimate=4, min_rms=200):
+        self.notes = sorted(set(frequencies))
+        semitone = 2 ** (1 / 12)
+        self.filters = [self.notes[0] / semitone] + self.notes + [self.notes[-1] * semitone]
+        self.decimate = decimate
+        self.rate = sample_rate / decimate
+        self.min_rms = min_rms
+
+        # About one bin per semitone at the middle of the range
+        middle = self.notes[len(self.notes) // 2]
+        self.size = int(self.rate / (middle * (semitone - 1)) + 0.5)
+
+        scale = 1 << GOERTZEL_BITS
+        self.coeffs = array.array("l", [int(2 * math.cos(2 * math.pi * f / self.rate) * scale + 0.5)
+                                        for f in self.filters])
+        self.window = array.array("H", [int(255 * (0.5 - 0.5 * math.cos(2 * math.pi * i / (self.size - 1))) + 0.5)
+                                        for i in range(self.size)])
+        self.block = array.array("l", [0] * self.size)
+        self.windowed = array.array("l", [0] * self.size)
+        self.powers = [0.0] * len(self.filters)
+        self.reset()
+
+    # Start collecting a new block
+    def reset(self):
+        self.count = 0
+        self.partial = 0
+        self.partial_count = 0
+
+    # Add recorded samples to the analysis block. Returns True once the
+    # block is full and ready for analyze(); any extra samples are dropped.
+    def add_samples(self, samples, count=None):
+        if count is None:
+            count = len(samples)
+        block = self.block
+        size = self.size
+        decimate = self.decimate
+        filled = self.count
+        partial = self.partial
+        partial_count = self.partial_count
+        for i in range(count):
+            if filled == size:
+                break
+            partial += samples[i]
+            partial_count += 1
+            if partial_count == decimate:
+                block[filled] = partial
+                filled += 1
+                partial = 0
+                partial_count = 0
+        self.count = filled
+        self.partial = partial
+        self.partial_count = partial_count
+        return filled == size
+
+    #------------------------------------------------------------------------
+    # Analyze the collected block and start a new one. Returns the nearest
+    # note (one of the frequencies given to the constructor) and how far off
+    # it is in cents, or None if the block was too quiet to tell.
+    #------------------------------------------------------------------------
+    def analyze(self):
+        if self.count < self.size:
+            return None
+        self.reset()
+        size = self.size
+        block = self.block
+        windowed = self.windowed
+        window = self.window
+        decimate = self.decimate
+
+        # Remove the bias, check there's something to listen to, and window
+        bias = sum(block) // size
+        squares = 0
+        peak = 1
+        for i in range(size):
+            d = block[i] - bias
+            squares += d * d
+            d = (d * window[i]) >> 8
+            windowed[i] = d
+            if d > peak:
+                peak = d
+            elif -d > peak:
+                peak = -d
+        if math.sqrt(squares / size) / decimate < self.min_rms:
+            return None
+
+        # Scale to GOERTZEL_SAMPLE_BITS so the filter state stays small
+        limit = 1 << (GOERTZEL_SAMPLE_BITS - 1)
+        shift = 0
+        while (peak >> shift) >= limit:
+            shift += 1
+        if shift:
+            for i in range(size):
+                windowed[i] >>= shift
+
+        powers = self.powers
+        for f in range(len(self.coeffs)):
+            coeff = self.coeffs[f]
+            s1 = 0
+            s2 = 0
+            for i in range(size):
+                s0 = windowed[i] + ((coeff * s1) >> GOERTZEL_BITS) - s2
+                s2 = s1
+                s1 = s0
+            power = s1 * s1 + s2 * s2 - ((coeff * s1) >> GOERTZEL_BITS) * s2
+            powers[f] = math.log(power) if power > 0 else 0.0
+
+        # Strongest filter, not counting the guards at each end
+        best = 1
+        for f in range(2, len(powers) - 1):
+            if powers[f] > powers[best]:
+                best = f
+
+        # Fit a parabola through the strongest filter and its neighbours (the
+        # filters aren't evenly spaced, so in Hz rather than filter number)
+        # to find where the true peak lies between them
+        filters = self.filters
+        x0 = filters[best - 1]
+        x1 = filters[best]
+        x2 = filters[best + 1]
+        y0 = powers[best - 1]
+        y1 = powers[best]
+        y2 = powers[best + 1]
+        a = (x1 - x0) * (y1 - y2)
+        b = (x1 - x2) * (y1 - y0)
+        frequency = x1
+        if a != b:
+            frequency = x1 - 0.5 * ((x1 - x0) * a - (x1 - x2) * b) / (a - b)
+            frequency = max(x0, min(x2, frequency))
+
+        # Nearest note to that
+        nearest = self.notes[0]
+        for note in self.notes:
+            if abs(math.log(frequency / note)) < abs(math.log(frequency / nearest)):
+                nearest = note
+        return (nearest, 1200 * math.log(frequency / nearest) / math.log(2))
@@ -0,0 +1,102 @@
+##############################################################################
+#                 Gapless Streaming Audio Output                             #
+##############################################################################
+# AudioOut can only play a sample, so to play sound that's generated as it #
+# goes, AudioStream loops one RawSample over a buffer of two blocks and     #
+# rewrites each block once it has been played, while the other one plays. #
+# Playback never stops, so there are no gaps or clicks between blocks, and #
+# whatever is rendered into a block is heard as soon as playback reaches   #
+# it.                                                                        #
+#                                                                            #
+# AudioOut can't say where it's up to, so the position is worked out from  #
+# the time since playback started. Call update() often enough (at least    #
+# once a block) for it to keep ahead. If it falls behind, playback carries #
+# on through blocks that weren't rewritten, which is counted as an          #
+# underrun.                                                                  #
+#                                                                            #
+# The position is only as good as the agreement between the CPU clock and  #
+# the DAC's sample clock, and drift between them isn't corrected: it      #
+# builds up for as long as the stream plays. Once it reaches about half a #
+# block, blocks are rewritten while they're still playing, so restart the #
+# stream (stop() and start()) now and then if it runs for a long time.    #
+##############################################################################
+
+import array
+import time
+
+import audioio
+
+class AudioStream:
+    #------------------------------------------------------------------------
+    # render(buf, start, count) is called to write count samples into
+    # buf[start:start + count] for each block, just before it's needed.
+    #------------------------------------------------------------------------
+    def __init__(self, audio_out, render, block_size=256, sample_rate=8000):
+        self.audio_out = audio_out
+        self.render = render
+        self.block_size = block_size
+        self.sample_rate = sample_rate
+        self.block_ns = block_size * 1000000000 // sample_rate
+        self.buffer = array.array("H", [32768] * (2 * block_size))
+        self.started_ns = 0
+        self.next_block = 0
+        # The block being rendered, while render() is running
+        self.writing = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.blocks_written = 0
+        self.underruns = 0
+
+    # Which block playback is in now, counting from 0 at start()
+    def playing_block(self, now=None):
+        if now is None:
+            now = time.monotonic_ns()
+        return (now - self.started_ns) // self.block_ns
+
+    # When the given block starts playing
+    def block_start_ns(self, block):
+        return self.started_ns + block * self.block_ns
+
+    def write_block(self, block):
+        self.writing = block
+        self.render(self.buffer, (block % 2) * self.block_size, self.block_size)
+        self.blocks_written += 1
+
+    # Fill both blocks and start playing
+    def start(self):
+        self.write_block(0)
+        self.write_block(1)
+        self.next_block = 2
+        self.sample = audioio.RawSample(self.buffer, sample_rate=self.sample_rate)
+        self.audio_out.play(self.sample, loop=True)
+        self.started_ns = time.monotonic_ns()
+
+    def stop(self):
+        self.audio_out.stop()
+
+    #------------------------------------------------------------------------
+    # Rewrite any block that has finished playing. Returns how many seconds
+    # until the next one will have, which is how long the caller can wait
+    # before calling again.
+    #------------------------------------------------------------------------
+    def update(self):
+        now = time.monotonic_ns()
+        playing = self.playing_block(now)
+        if self.next_block <= playing:
+            # Playback has already reached blocks we didn't rewrite in time
+            self.underruns += playing - self.next_block + 1
+            self.next_block = playing + 1
+        # Each block can be rewritten once the one before it is playing,
+        # since that means the last time round it has finished
+        while self.next_block <= playing + 1:
+            self.write_block(self.next_block)
+            self.next_block += 1
+        wait = self.block_start_ns(self.next_block - 1) - time.monotonic_ns()
+        if wait < 0:
+            return 0
+        return wait / 1000000000
+
+    def print_stats(self, name="audio"):
+        print("%s: %d blocks written, %d underruns" %
+              (name, self.blocks_written, self.underruns))
@@ -0,0 +1 @@
+# Host-side benchmarks for the project's hot loops; see __main__.py.
@@ -0,0 +1,171 @@
+##############################################################################
+# Benchmark runner                                                           #
+#                                                                            #
+#   python3 -m benchmarks [--save] [--tolerance 0.5] [--strict-timing]       #
+#                         [--only TEXT]                                      #
+#                                                                            #
+# Runs each hot path under CPython with fixed inputs and reports:           #
+#                                                                            #
+#   ns/op    median time per operation over several timed runs             #
+#   peak B   tracemalloc's peak of memory allocated during one operation,  #
+#            including temporaries freed before it returned (the least    #
+#            over a few operations)                                        #
+#   blocks   tracemalloc blocks allocated during one operation and still  #
+#            alive afterwards (results, caches, leaks), again the least   #
+#            over a few operations                                         #
+#                                                                            #
+# Results are compared with benchmarks/baselines.json. Allocating more     #
+# than the baseline (beyond a block or a few bytes of slack) is a          #
+# regression and the run exits with status 1. Timing on a shared host is  #
+# too noisy to fail on, so running slower than the tolerance is only      #
+# reported, unless --strict-timing makes it a regression too. --save       #
+# records the current results as the new baselines.                        #
+##############################################################################
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import Simulation
+from benchmarks.hot_paths import BENCHMARKS, Unavailable
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Keep going until one timed run takes at least this long
+MIN_RUN_NS = 50000000
+REPEATS = 7
+
+# Operations measured for allocations. The same operation can allocate a
+# block more or less from one call to the next (an int cached or not, a
+# dict resized), so the least of a few is what's compared.
+ALLOC_RUNS = 3
+
+# Allow this much slack before calling a memory change a regression, since
+# small allocations round differently between runs
+PEAK_SLACK_BYTES = 64
+BLOCK_SLACK = 1
+
+def time_loops(operation, loops):
+    start = time.perf_counter_ns()
+    for _ in range(loops):
+        operation()
+    return time.perf_counter_ns() - start
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(operation):
+    operation()     # warm up any caches
+    loops = 1
+    while time_loops(operation, loops) < MIN_RUN_NS:
+        loops *= 2
+    typical = median([time_loops(operation, loops) for _ in range(REPEATS)])
+
+    peak_bytes = None
+    blocks = None
+    for _ in range(ALLOC_RUNS):
+        peak, count = measure_allocations(operation)
+        if peak_bytes is None or peak < peak_bytes:
+            peak_bytes = peak
+        if blocks is None or count < blocks:
+            blocks = count
+    return {"ns_per_op": typical // loops, "peak_bytes": peak_bytes, "blocks": blocks}
+
+# Peak bytes and surviving blocks allocated by one operation
+def measure_allocations(operation):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    blocks = sum(stat.count_diff for stat in
+                 after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "traceback")
+                 if stat.count_diff > 0)
+    return max(0, peak - base), blocks
+
+def slower(result, baseline, tolerance):
+    return result["ns_per_op"] > baseline["ns_per_op"] * (1 + tolerance)
+
+def regressions(result, baseline, tolerance, strict_timing=False):
+    found = []
+    if strict_timing and slower(result, baseline, tolerance):
+        found.append("slower")
+    if result["peak_bytes"] > baseline["peak_bytes"] * (1 + tolerance) + PEAK_SLACK_BYTES:
+        found.append("more memory")
+    if result["blocks"] > baseline["blocks"] + BLOCK_SLACK:
+        found.append("more allocations")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks")
+    parser.add_argument("--save", action="store_true", help="save results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown or memory growth, as a fraction (default 0.5)")
+    parser.add_argument("--strict-timing", action="store_true",
+                        help="fail on a slowdown too, instead of only reporting it")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    results = {}
+    failed = []
+    warned = []
+    print("%-44s %12s %9s %7s %9s" % ("benchmark", "ns/op", "peak B", "blocks", "vs base"))
+    with Simulation(record_pixels=False, record_pins=False, record_audio=False):
+        for name, setup in BENCHMARKS:
+            if args.only and args.only not in name:
+                continue
+            try:
+                operation = setup()
+            except Unavailable as e:
+                print("%-44s skipped: %s" % (name, e))
+                continue
+            result = measure(operation)
+            results[name] = result
+            baseline = baselines.get(name)
+            if baseline is None:
+                change = "new"
+            else:
+                change = "%+.0f%%" % (100.0 * result["ns_per_op"] / baseline["ns_per_op"] - 100)
+                problems = regressions(result, baseline, args.tolerance, args.strict_timing)
+                if problems:
+                    failed.append((name, problems))
+                    change += " !"
+                elif slower(result, baseline, args.tolerance):
+                    warned.append(name)
+                    change += " ?"
+            print("%-44s %12d %9d %7d %9s" % (name, result["ns_per_op"], result["peak_bytes"],
+                                              result["blocks"], change))
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("saved baselines to", BASELINES)
+        return 0
+
+    for name in warned:
+        print("slower than baseline (timing only, not failing): %s" % name)
+    for name, problems in failed:
+        print("REGRESSION: %s (%s)" % (name, ", ".join(problems)))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
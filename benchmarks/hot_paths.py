@@ -0,0 +1,258 @@
+##############################################################################
+# The hot paths being benchmarked
+##############################################################################
+# Each benchmark is a setup function, registered with @benchmark, that      #
+# prepares fixed inputs and returns a zero-argument callable for one        #
+# operation. Setups run inside a simulator.Simulation, so they can build    #
+# the scripts' objects on simulated hardware.                               #
+##############################################################################
+
+import array
+import contextlib
+import io
+import math
+import random
+
+from benchmarks.loader import load_definitions
+
+BENCHMARKS = []
+
+# Raised by a setup when what it measures isn't available here (e.g. an
+# optional library isn't installed); the runner skips it.
+class Unavailable(Exception):
+    pass
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+#----------------------------------------------------------------------------
+# Fixed pseudo-random microphone data, centred like PDMIn's 16-bit output
+#----------------------------------------------------------------------------
+def mic_samples(count, seed=1):
+    rng = random.Random(seed)
+    return array.array("H", [32768 + int(rng.gauss(0, 4000)) for _ in range(count)])
+
+#----------------------------------------------------------------------------
+# Microphone RMS (perfect_pitch_machine_v2.py), at the machine's block size
+# and two larger ones. The reference is the machine's original two-pass
+# version, kept here to show the speedup; the others check they give the
+# same answer before being timed.
+#----------------------------------------------------------------------------
+RMS_SIZES = (160, 1024, 4096)
+
+def reference_normalized_rms(values):
+    minbuf = int(sum(values) / len(values))
+    return math.sqrt(sum(float((sample - minbuf) * (sample - minbuf)) for sample in values) / len(values))
+
+def rms_benchmark(name, get_function):
+    for size in RMS_SIZES:
+        def setup(size=size):
+            function = get_function()
+            samples = mic_samples(size)
+            expected = reference_normalized_rms(samples)
+            if not math.isclose(function(samples), expected, rel_tol=1e-12):
+                raise AssertionError("%s gives %r, expected %r" % (name, function(samples), expected))
+            return lambda: function(samples)
+        benchmark("%s[%d]" % (name, size))(setup)
+
+def _vector_rms():
+    import audio_dsp
+    if audio_dsp.np is None:
+        raise Unavailable("no ulab or numpy")
+    return audio_dsp.normalized_rms_vector
+
+def _python_rms():
+    import audio_dsp
+    return audio_dsp.normalized_rms_python
+
+rms_benchmark("reference.two_pass_rms", lambda: reference_normalized_rms)
+rms_benchmark("audio_dsp.normalized_rms_python", _python_rms)
+rms_benchmark("audio_dsp.normalized_rms_vector", _vector_rms)
+
+#----------------------------------------------------------------------------
+# perfect_pitch_machine_v2.py
+#----------------------------------------------------------------------------
+
+# From the breath being detected to the note playing. The reference is the
+# machine's original path: build the waveform, then a new AudioOut for it.
+def reference_make_sine_wave(frequency):
+    length = 8000 // frequency
+    sine_wave = array.array("H", [0] * length)
+    for i in range(length):
+        sine_wave[i] = int(math.sin(math.pi * 2 * i / 18) * (2 ** 15) + 2 ** 15)
+    return sine_wave
+
+@benchmark("reference.trigger_note[440Hz]")
+def reference_trigger_note():
+    import audioio
+    import board
+    def trigger():
+        audio = audioio.AudioOut(board.SPEAKER)
+        audio.play(audioio.RawSample(reference_make_sine_wave(440)), loop=True)
+        audio.stop()
+        audio.deinit()
+    return trigger
+
+@benchmark("pitch.trigger_note[440Hz]")
+def pitch_trigger_note():
+    import audioio
+    import board
+    from wave_cache import WaveCache
+    audio = audioio.AudioOut(board.SPEAKER)
+    waves = WaveCache()
+    def trigger():
+        audio.play(waves.get(440, 8000), loop=True)
+        audio.stop()
+    return trigger
+
+# Building a note's table on a cache miss
+@benchmark("wave_cache.make_wavetable[440Hz]")
+def wave_make_wavetable():
+    from wave_cache import make_wavetable
+    return lambda: make_wavetable(440, 8000)
+
+# Feeding one recorded block into the sliding-window loudness tracker
+@benchmark("audio_dsp.LoudnessTracker.update_block[160]")
+def loudness_update_block():
+    from audio_dsp import LoudnessTracker
+    tracker = LoudnessTracker(window=480)
+    samples = mic_samples(160)
+    return lambda: tracker.update_block(samples)
+
+# Tuner mode's pitch detection on one analysis block, for each note range.
+# (tests/test_pitch_detector.py checks the readings.)
+def tone_samples(frequency, count, sample_rate=16000):
+    return array.array("H", [32768 + int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+                             for i in range(count)])
+
+def pitch_benchmark(name, lowest):
+    @benchmark("audio_dsp.PitchDetector.analyze[%s]" % name)
+    def setup():
+        from audio_dsp import PitchDetector
+        from note_table import NoteTable
+        frequencies = NoteTable.octaves(lowest).frequencies()
+        detector = PitchDetector(frequencies)
+        count = detector.size * detector.decimate
+        samples = tone_samples(frequencies[len(frequencies) // 2], count)
+        def run():
+            detector.add_samples(samples)
+            return detector.analyze()
+        return run
+
+# The pitch machine's ranges, Ab3-Ab4 and Ab4-Ab5
+pitch_benchmark("low", 56)
+pitch_benchmark("high", 68)
+
+#----------------------------------------------------------------------------
+# Colour wheel and rainbow frames (cp_neopixel_demo.py, metro_M0_demo.py)
+#----------------------------------------------------------------------------
+@benchmark("color_lut.wheel[x256]")
+def color_wheel():
+    from color_lut import wheel
+    def sweep():
+        for pos in range(256):
+            wheel(pos)
+    return sweep
+
+@benchmark("color_lut.wheel_into[x256]")
+def color_wheel_into():
+    from color_lut import wheel_into
+    buf = bytearray(3)
+    def sweep():
+        for pos in range(256):
+            wheel_into(buf, 0, pos)
+    return sweep
+
+@benchmark("pixel_animator.RainbowCycle.render[10px]")
+def rainbow_cycle_frame():
+    import board
+    from pixel_animator import Animator, RainbowCycle
+    animator = Animator(board.NEOPIXEL, 10, brightness=0.2)
+    effect = RainbowCycle()
+    effect.start(animator)
+    return lambda: effect.render(animator, 1234)
+
+#----------------------------------------------------------------------------
+# cpy_punk_console.py
+#----------------------------------------------------------------------------
+# The waveform work for one pulse. The reference is the console's original
+# buildWaveform(), which ran three math.sin calls per sample every pulse.
+def reference_build_waveform(frequency, sample_size=8000):
+    length = int(sample_size // frequency)
+    waveform = array.array("H", [0] * length)
+    for t in range(length):
+        v = (1.3 * math.sin(math.pi/length)*t)
+        v = v + ((1.1 * math.sin(math.pi/length)*(t*3)))
+        v = v + ((1.4 * math.sin(math.pi/length)*(t*5)))
+        waveform[t] = int(v)
+    return waveform
+
+@benchmark("reference.punk_build_waveform[440Hz]")
+def reference_punk_waveform():
+    return lambda: reference_build_waveform(440)
+
+# A pulse with the frequency knob left alone, and one where it has moved
+@benchmark("dds_synth.loop_sample[same]")
+def synth_same_frequency():
+    from dds_synth import Synth, harmonic_table
+    synth = Synth(harmonic_table())
+    synth.loop_sample(440)
+    return lambda: synth.loop_sample(440)
+
+# Streaming one 256-sample block (cpy_punk_console.py with STREAMING)
+@benchmark("dds_synth.Synth.fill[256]")
+def synth_fill_block():
+    from dds_synth import Synth, harmonic_table
+    synth = Synth(harmonic_table())
+    synth.set_frequency(440)
+    buf = array.array("H", [0] * 512)
+    return lambda: synth.fill(buf, 256, 256)
+
+@benchmark("dds_synth.loop_sample[changed]")
+def synth_changed_frequency():
+    from dds_synth import Synth, harmonic_table
+    synth = Synth(harmonic_table())
+    frequencies = [440, 445]
+    def pulse():
+        frequencies.reverse()
+        return synth.loop_sample(frequencies[0])
+    return pulse
+
+#----------------------------------------------------------------------------
+# cpy_touch_lock.py (includes the simulated touchio reads)
+#----------------------------------------------------------------------------
+@benchmark("touch_lock.scan_inputs")
+def touch_scan_inputs():
+    script = load_definitions("cpy_touch_lock.py")
+    with contextlib.redirect_stdout(io.StringIO()):
+        lock = script["CPYTouchLock"]("3472")
+    return lock.scan_inputs
+
+#----------------------------------------------------------------------------
+# One touch through the lock's code matcher, with one code enrolled and with
+# 64; a touch should cost the same either way.
+#----------------------------------------------------------------------------
+def matcher_benchmark(count):
+    def setup():
+        from code_matcher import CodeMatcher
+        from touch_scanner import code_masks
+        rng = random.Random(count)
+        codes = {"owner": "3472"}
+        while len(codes) < count:
+            code = "".join(str(rng.randint(1, 7)) for _ in range(4))
+            if code not in codes.values():
+                codes["user%d" % len(codes)] = code
+        matcher = CodeMatcher(codes)
+        touches = code_masks("3347235716243472")
+        position = [0]
+        def touch():
+            position[0] = (position[0] + 1) % len(touches)
+            return matcher.advance(touches[position[0]])
+        return touch
+    benchmark("code_matcher.advance[%d codes]" % count)(setup)
+
+matcher_benchmark(1)
+matcher_benchmark(64)
@@ -0,0 +1,37 @@
+##############################################################################
+# Load the functions and classes out of a script without running it
+##############################################################################
+# The scripts in this repository do their work in a top-level while True   #
+# loop, so they can't simply be imported. load_definitions() keeps only a  #
+# script's imports, function and class definitions and constant            #
+# assignments, and executes those. Call it inside a simulator.Simulation so #
+# the hardware imports resolve to the simulated modules.                    #
+##############################################################################
+
+import ast
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _is_constant(node):
+    try:
+        ast.literal_eval(node)
+    except ValueError:
+        return False
+    return True
+
+def load_definitions(script):
+    path = os.path.join(REPO_ROOT, script)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    kept = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+            kept.append(node)
+        elif (isinstance(node, ast.Assign) and _is_constant(node.value)
+                and all(isinstance(target, ast.Name) for target in node.targets)):
+            kept.append(node)
+    module = ast.Module(body=kept, type_ignores=[])
+    namespace = {"__name__": os.path.splitext(script)[0], "__file__": path}
+    exec(compile(module, path, "exec"), namespace)
+    return namespace
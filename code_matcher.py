@@ -0,0 +1,145 @@
+##############################################################################
+#                 Multi-Code Matcher for the Touch Lock                      #
+##############################################################################
+# Compiles any number of codes (see touch_scanner.code_masks) into a state  #
+# machine: a prefix trie of the codes, with every missing transition       #
+# filled in to go where matching would restart (the longest tail of what's #
+# been touched that still begins some code). Each touch is then a single  #
+# dict lookup however many codes there are, and a wrong touch doesn't       #
+# throw away an attempt that can still finish: with code 3472, touching   #
+# 3 3 4 7 2 opens the lock.                                                  #
+#                                                                            #
+# AuditLog keeps the last few unlocks (which code and when) in a fixed-size #
+# ring, so it never grows.                                                   #
+##############################################################################
+
+import array
+import time
+
+from touch_scanner import code_masks
+
+class CodeMatcher:
+    #------------------------------------------------------------------------
+    # codes is a dict of name -> code, e.g. {"tammy": "3472", "guest":
+    # "[34]12"}. Raises ValueError if a code is empty or badly written, or
+    # could never be matched, because it's the same as another code or
+    # another one is part of it.
+    #------------------------------------------------------------------------
+    def __init__(self, codes):
+        self.names = sorted(codes)
+        # Trie: transitions (touch mask -> state), depth and the code that
+        # ends at each state (-1 for none)
+        self.next = [{}]
+        self.depths = [0]
+        self.ends = [-1]
+        for index, name in enumerate(self.names):
+            masks = code_masks(codes[name])
+            if not masks:
+                raise ValueError("code for %s is empty" % name)
+            state = 0
+            for mask in masks:
+                if mask not in self.next[state]:
+                    self.next[state][mask] = len(self.next)
+                    self.next.append({})
+                    self.depths.append(self.depths[state] + 1)
+                    self.ends.append(-1)
+                state = self.next[state][mask]
+            if self.ends[state] >= 0:
+                raise ValueError("codes for %s and %s are the same" %
+                                 (self.names[self.ends[state]], name))
+            self.ends[state] = index
+        self.compile()
+        for index, name in enumerate(self.names):
+            self.check_reachable(index, codes[name])
+        self.reset()
+
+    #------------------------------------------------------------------------
+    # Fill in the missing transitions, breadth first, from each state's
+    # fallback: the state for the longest proper tail of its path that is
+    # also a path from the start.
+    #------------------------------------------------------------------------
+    def compile(self):
+        fallback = [0] * len(self.next)
+        queue = list(self.next[0].values())
+        i = 0
+        while i < len(queue):
+            state = queue[i]
+            i += 1
+            trie = self.next[state]
+            # Transitions that aren't in the trie go where the fallback's do
+            full = dict(self.next[fallback[state]])
+            for mask, child in trie.items():
+                fallback[child] = full.get(mask, 0)
+                queue.append(child)
+            # A code ending at the fallback also ends here
+            if self.ends[state] < 0:
+                self.ends[state] = self.ends[fallback[state]]
+            full.update(trie)
+            self.next[state] = full
+        # Don't keep the transitions back to the start; a miss means 0
+        for transitions in self.next:
+            for mask in [m for m, s in transitions.items() if s == 0]:
+                del transitions[mask]
+
+    # Feed a code through; it has to open with its own name on its last touch
+    def check_reachable(self, index, code):
+        self.reset()
+        masks = code_masks(code)
+        for step, mask in enumerate(masks):
+            matched = self.advance(mask)
+            if matched >= 0:
+                if matched != index or step != len(masks) - 1:
+                    raise ValueError("code for %s can never be entered: %s opens first" %
+                                     (self.names[index], self.names[matched]))
+                return
+
+    def reset(self):
+        self.state = 0
+
+    # How many touches of the current attempt still count
+    def depth(self):
+        return self.depths[self.state]
+
+    #------------------------------------------------------------------------
+    # Take one touch (a mask from TouchScanner). Returns the index in names
+    # of the code it completes, or -1.
+    #------------------------------------------------------------------------
+    def advance(self, mask):
+        state = self.next[self.state].get(mask, 0)
+        matched = self.ends[state]
+        if matched >= 0:
+            state = 0
+        self.state = state
+        return matched
+
+class AuditLog:
+    def __init__(self, size=16):
+        self.size = size
+        # Seconds since start-up, which fit the array for far longer than ms
+        self.times = array.array("L", [0] * size)
+        # Index into CodeMatcher.names, which can be more than 255
+        self.codes = array.array("H", [0] * size)
+        self.head = 0
+        self.count = 0
+
+    # Record that code (an index into CodeMatcher.names) unlocked, when
+    # seconds after start-up
+    def record(self, code, when=None):
+        if when is None:
+            when = time.monotonic_ns() // 1000000000
+        self.times[self.head] = when
+        self.codes[self.head] = code
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    # The nth most recent entry, as (code, time in seconds)
+    def entry(self, n):
+        i = (self.head - 1 - n) % self.size
+        return self.codes[i], self.times[i]
+
+    def print_log(self, names):
+        print("audit log: %d unlocks" % self.count)
+        for n in range(self.count):
+            code, when = self.entry(n)
+            print("  %8d s  %s" % (when, names[code]))
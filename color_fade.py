@@ -0,0 +1,171 @@
+##############################################################################
+#              Fixed-Point Colour Transitions for NeoPixels                  #
+##############################################################################
+# Fades smoothly between a list of keyframe colours using integer maths and #
+# precomputed tables, so working out each frame's colour costs a few       #
+# multiplies and shifts. Two ways to blend:                                 #
+#                                                                            #
+#   "linear" - keyframes are decoded to 12-bit linear light and blended    #
+#              there, which is how the LEDs actually mix light, so fades   #
+#              between colours don't dip or bloom in the middle.           #
+#   "hsv"    - keyframes are blended by hue (the short way round the       #
+#              colour wheel), saturation and value, then gamma corrected;  #
+#              good for sweeping through the rainbow.                      #
+#                                                                            #
+# Keyframes are (color, seconds) pairs: fade from color to the next         #
+# keyframe's over that many seconds. The last keyframe fades back to the    #
+# first, and the whole sequence repeats.                                     #
+##############################################################################
+
+import array
+
+from color_lut import DEFAULT_GAMMA, gamma_table
+
+# Fractions within a fade are in 1/4096ths
+FRAC_BITS = 12
+
+# Hue runs 0-1535: six 256-step sectors, red-yellow-green-cyan-blue-magenta
+HUE_RANGE = 6 * 256
+
+# Gamma-encoded 0-255 level to 12-bit linear light
+TO_LINEAR = array.array("H", [int(((i / 255) ** DEFAULT_GAMMA) * 4095 + 0.5)
+                              for i in range(256)])
+
+# Perceptual 0-255 level to the PWM level that displays it
+GAMMA = gamma_table(DEFAULT_GAMMA)
+
+#----------------------------------------------------------------------------
+# (r, g, b) to integer (hue 0-1535, saturation 0-255, value 0-255).
+#----------------------------------------------------------------------------
+def rgb_to_hsv(rgb):
+    r, g, b = rgb
+    hi = max(r, g, b)
+    lo = min(r, g, b)
+    if hi == 0:
+        return (0, 0, 0)
+    spread = hi - lo
+    s = spread * 255 // hi
+    if spread == 0:
+        h = 0
+    elif hi == r:
+        h = (256 * (g - b) // spread) % HUE_RANGE
+    elif hi == g:
+        h = 512 + 256 * (b - r) // spread
+    else:
+        h = 1024 + 256 * (r - g) // spread
+    return (h, s, hi)
+
+#----------------------------------------------------------------------------
+# Integer hue/saturation/value back to red, green and blue, written into a
+# 3-byte buffer.
+#----------------------------------------------------------------------------
+def hsv_into(buf, h, s, v):
+    sector = h >> 8
+    f = h & 0xFF
+    p = v * (255 - s) // 255
+    q = v * (255 - (s * f >> 8)) // 255
+    t = v * (255 - (s * (255 - f) >> 8)) // 255
+    if sector == 0:
+        buf[0], buf[1], buf[2] = v, t, p
+    elif sector == 1:
+        buf[0], buf[1], buf[2] = q, v, p
+    elif sector == 2:
+        buf[0], buf[1], buf[2] = p, v, t
+    elif sector == 3:
+        buf[0], buf[1], buf[2] = p, q, v
+    elif sector == 4:
+        buf[0], buf[1], buf[2] = t, p, v
+    else:
+        buf[0], buf[1], buf[2] = v, p, q
+
+class ColorFade:
+    def __init__(self, keyframes, mode="linear"):
+        if mode not in ("linear", "hsv"):
+            raise ValueError("mode must be 'linear' or 'hsv'")
+        self.mode = mode
+        self.count = len(keyframes)
+
+        # Segment start times and lengths, in milliseconds
+        self.starts = array.array("L")
+        self.lengths = array.array("L")
+        total = 0
+        for color, seconds in keyframes:
+            self.starts.append(total)
+            length = max(1, int(seconds * 1000))
+            self.lengths.append(length)
+            total += length
+        self.total_ms = total
+
+        # Keyframe colours, converted once to the space we blend in
+        self.points = array.array("H")
+        for color, seconds in keyframes:
+            if mode == "linear":
+                for channel in color:
+                    self.points.append(TO_LINEAR[channel])
+            else:
+                self.points.extend(rgb_to_hsv(color))
+
+        # Result buffer, reused every frame
+        self.rgb = bytearray(3)
+        self.segment = 0
+
+    #------------------------------------------------------------------------
+    # The colour t milliseconds into the sequence, as a 3-byte (r, g, b)
+    # buffer that's overwritten by the next call.
+    #------------------------------------------------------------------------
+    def color_at(self, t):
+        t %= self.total_ms
+
+        # Frames usually land in the same segment as last time, so start the
+        # search there
+        segment = self.segment
+        starts = self.starts
+        if t < starts[segment]:
+            segment = 0
+        while segment + 1 < self.count and t >= starts[segment + 1]:
+            segment += 1
+        self.segment = segment
+
+        frac = ((t - starts[segment]) << FRAC_BITS) // self.lengths[segment]
+        a = 3 * segment
+        b = 3 * ((segment + 1) % self.count)
+        points = self.points
+        rgb = self.rgb
+
+        if self.mode == "linear":
+            for channel in range(3):
+                start = points[a + channel]
+                level = start + (((points[b + channel] - start) * frac) >> FRAC_BITS)
+                rgb[channel] = level >> 4
+        else:
+            h0 = points[a]
+            s0 = points[a + 1]
+            v0 = points[a + 2]
+            h1 = points[b]
+            s1 = points[b + 1]
+            v1 = points[b + 2]
+            # Black has no hue or saturation of its own, and greys no hue, so
+            # fading to or from them borrows the other end's
+            if v0 == 0:
+                h0 = h1
+                s0 = s1
+            elif v1 == 0:
+                h1 = h0
+                s1 = s0
+            if s0 == 0:
+                h0 = h1
+            elif s1 == 0:
+                h1 = h0
+            dh = h1 - h0
+            if dh > HUE_RANGE // 2:
+                dh -= HUE_RANGE
+            elif dh < -HUE_RANGE // 2:
+                dh += HUE_RANGE
+            h = (h0 + ((dh * frac) >> FRAC_BITS)) % HUE_RANGE
+            s = s0 + (((s1 - s0) * frac) >> FRAC_BITS)
+            v = v0 + (((v1 - v0) * frac) >> FRAC_BITS)
+            hsv_into(rgb, h, s, v)
+            rgb[0] = GAMMA[rgb[0]]
+            rgb[1] = GAMMA[rgb[1]]
+            rgb[2] = GAMMA[rgb[2]]
+        return rgb
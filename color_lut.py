@@ -0,0 +1,77 @@
+##############################################################################
+#                 Precomputed Colour Tables for NeoPixels                    #
+##############################################################################
+# The colour wheel used by the NeoPixel demos, precomputed once into a      #
+# 768-byte table (three bytes per position, 0-255) so drawing a rainbow is  #
+# table reads only. make_wheel() builds variants with gamma correction,    #
+# brightness already applied, and/or the bytes in the strip's wire order    #
+# (GRB for most NeoPixels), for code that writes pixel buffers directly.    #
+##############################################################################
+
+WHEEL_SIZE = 256
+
+# Gamma for perceptually even fades on NeoPixels
+DEFAULT_GAMMA = 2.6
+
+#----------------------------------------------------------------------------
+# Colour wheel position (0-255) to (red, green, blue). The colours are a
+# transition r - g - b - back to r.
+#----------------------------------------------------------------------------
+def wheel_rgb(pos):
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+#----------------------------------------------------------------------------
+# 256-entry table mapping a linear 0-255 level to a gamma-corrected one.
+#----------------------------------------------------------------------------
+def gamma_table(gamma=DEFAULT_GAMMA):
+    table = bytearray(256)
+    for i in range(256):
+        table[i] = int(((i / 255) ** gamma) * 255 + 0.5)
+    return table
+
+#----------------------------------------------------------------------------
+# Build a 768-byte wheel table. gamma=None skips gamma correction,
+# brightness (0.0-1.0) is applied after it, and order gives the byte order
+# of each entry ("RGB", "GRB", ...).
+#----------------------------------------------------------------------------
+def make_wheel(gamma=None, brightness=1.0, order="RGB"):
+    if gamma is None:
+        levels = bytearray(range(256))
+    else:
+        levels = gamma_table(gamma)
+    scale = int(brightness * 256)
+    slots = (order.index("R"), order.index("G"), order.index("B"))
+    table = bytearray(3 * WHEEL_SIZE)
+    for pos in range(WHEEL_SIZE):
+        rgb = wheel_rgb(pos)
+        for channel in range(3):
+            table[3 * pos + slots[channel]] = (levels[rgb[channel]] * scale) >> 8
+    return table
+
+# The plain wheel, in RGB order with no correction
+WHEEL = make_wheel()
+
+#----------------------------------------------------------------------------
+# Copy the colour at a wheel position into buf[offset:offset + 3] without
+# allocating anything. pos is wrapped to 0-255.
+#----------------------------------------------------------------------------
+def wheel_into(buf, offset, pos, table=WHEEL):
+    i = (pos & 0xFF) * 3
+    buf[offset] = table[i]
+    buf[offset + 1] = table[i + 1]
+    buf[offset + 2] = table[i + 2]
+
+#----------------------------------------------------------------------------
+# The colour at a wheel position as a tuple, for code that assigns colours to
+# a NeoPixel object. pos is wrapped to 0-255.
+#----------------------------------------------------------------------------
+def wheel(pos, table=WHEEL):
+    i = (pos & 0xFF) * 3
+    return (table[i], table[i + 1], table[i + 2])
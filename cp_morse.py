@@ -1,7 +1,10 @@
 import board
 import time
-from digitalio import DigitalInOut, Direction
+from digitalio import DigitalInOut, Direction, Pull
 import neopixel
+import audioio
+import morse
+from morse import MorseKeyer, MorseReceiver
 
 ######################################################################
 #  CONFIGURATION - EDIT THESE AS APPROPRIATE TO CHANGE THE BEHAVIOR  # 
@@ -20,42 +23,79 @@ messages.append("Spoiler alert: Your brain weasels are definitely lying.")
 # How fast should we send it (words per minute)?
 morse_wpm = 20
 
+# Should we also sound the message on the speaker/A0, and at what pitch (Hz)?
+# Files pre-rendered with morse_to_wav.py are played from flash if they're on
+# the board; otherwise each dot and dash is sounded as the LED keys it.
+sidetone = False
+sidetone_hz = 600
+
+# Set to True to listen instead: key closures on receive_pin (to ground) are
+# decoded and printed, and the LED follows the key. The receiver adapts to
+# the sender's speed, starting from morse_wpm. (To listen to an analog
+# source instead, wrap an AnalogIn in morse.ThresholdInput.)
+receive_mode = False
+receive_pin = board.D2
+
 ######################################################################
 #              No user-servicable parts below this line              #
 ######################################################################
 
-# Morse code alphabet
-CODE = {'A': '.-',     'B': '-...',   'C': '-.-.', 
-        'D': '-..',    'E': '.',      'F': '..-.',
-        'G': '--.',    'H': '....',   'I': '..',
-        'J': '.---',   'K': '-.-',    'L': '.-..',
-        'M': '--',     'N': '-.',     'O': '---',
-        'P': '.--.',   'Q': '--.-',   'R': '.-.',
-        'S': '...',    'T': '-',      'U': '..-',
-        'V': '...-',   'W': '.--',    'X': '-..-',
-        'Y': '-.--',   'Z': '--..',
-        
-        '0': '-----',  '1': '.----',  '2': '..---',
-        '3': '...--',  '4': '....-',  '5': '.....',
-        '6': '-....',  '7': '--...',  '8': '---..',
-        '9': '----.',  
-
-        '&': '.-...',  ':': '---...', ',': '--..--',
-        '!': '-.-.--', '=': '-...-',  '.': '.-.-.-',
-        '-': '-....-', '+': '.-.-.',  '?': '..--.-',
-        '/': '-..-.',  '\'': '.----.', ':': '---...',
-        }
-
-dot_length = 1000 / (morse_wpm)   # In milliseconds
-dash_length = dot_length * 3
-char_space_length = dot_length
-word_space_length = dot_length * 5
-
 led = DigitalInOut(board.D13)
 led.direction = Direction.OUTPUT
 
 pixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.3, auto_write=False)
 
+# The pre-rendered file being played, if any; closed before the next opens
+sidetone_file = None
+
+if sidetone:
+    if hasattr(board, "SPEAKER_ENABLE"):
+        speaker_enable = DigitalInOut(board.SPEAKER_ENABLE)
+        speaker_enable.direction = Direction.OUTPUT
+        speaker_enable.value = True
+    audio = audioio.AudioOut(board.A0)
+    # Used for messages with no pre-rendered file
+    element_sidetone = morse.ElementSidetone(audio, morse_wpm, sidetone_hz)
+
+# Open the pre-rendered sidetone for a message; None if it isn't on the board
+def sidetone_sample(number):
+    global sidetone_file
+    if sidetone_file is not None:
+        audio.stop()
+        sidetone_file.close()
+        sidetone_file = None
+    try:
+        sidetone_file = open(morse.sidetone_filename(number, morse_wpm, sidetone_hz), "rb")
+    except OSError:
+        return None
+    return audioio.WaveFile(sidetone_file)
+
+# Compile every message up front so the send loop only replays schedules
+keyer = MorseKeyer(led, morse_wpm)
+for message in messages:
+    keyer.schedule(message)
+
+if receive_mode:
+    key_input = DigitalInOut(receive_pin)
+    key_input.direction = Direction.INPUT
+    key_input.pull = Pull.UP
+    receiver = MorseReceiver(morse_wpm, active_low=True)
+
+    print("**********************************************************************")
+    print("* Receiving on", receive_pin, "starting at", morse_wpm, "wpm")
+    print("**********************************************************************")
+    print("")
+
+    last_wpm = receiver.wpm
+    while True:
+        led.value = receiver.poll(key_input)
+        text = receiver.process()
+        if text:
+            print(text, end="")
+            if text[-1] == ' ' and receiver.wpm != last_wpm:
+                last_wpm = receiver.wpm
+                print("[%d wpm]" % last_wpm, end=" ")
+
 whichMessage = 0
 
 print("**********************************************************************")
@@ -72,26 +112,18 @@ while True:
     message = messages[whichMessage]
     print("Transmitting message", (whichMessage + 1), ":", message)
     
-    for c in message.upper():
-        if c == ' ':
-            time.sleep(word_space_length/1000)
+    # The audio and the LED follow the same schedule, started together
+    if sidetone:
+        sample = sidetone_sample(whichMessage + 1)
+        if sample is not None:
+            keyer.sidetone = None
+            audio.play(sample)
         else:
-            if c in CODE:
-                for mc in CODE[c]:
-                    if mc == '.':
-                        led.value = True
-                        time.sleep(dot_length/1000)
-                    elif mc == '-':
-                        led.value = True
-                        time.sleep(dash_length/1000)
-                    # Send an inter-character break
-                    led.value = False
-                    time.sleep(char_space_length/1000)
-            else:
-                print("Note: Undefined morse character", "'" + c + "'", "skipped")
-    
+            keyer.sidetone = element_sidetone
+    keyer.send(message)
+
     # Send inter-message break
-    print("End of message")
+    print("End of message (%0.1f wpm measured, %d wpm nominal)" % (keyer.measured_wpm(), morse_wpm))
     led.value = False
     time.sleep(2)
     
@@ -21,57 +21,162 @@ import time
 import neopixel
 import digitalio
 import analogio
-import array
-import math
 import audioio
 
+from dds_synth import Synth, harmonic_table
+from audio_stream import AudioStream
+from analog_control import AnalogControl
+
+# Stream the sound (gapless, with the knobs taking effect as it plays) rather
+# than playing one pulse at a time with playSound()
+STREAMING = True
+
+# Samples per streamed block. Knob changes are heard within about two blocks
+# (32 ms each at 256 samples).
+STREAM_BLOCK_SIZE = 256
+
+# Print the streaming stats this often, in seconds (0 for never)
+STATS_SECONDS = 0
+
 class CPPunkConsole:
     # Set up the hardware and get everything ready
     def __init__(self):
         # Set up hardware linkages
         self.pixels = neopixel.NeoPixel(board.D8, 8)
-        self.speaker_output  = analogio.AudioOut(board.A0)
-        self.frequency_input = analogio.AnalogIn(board.A1)
-        self.pulse_width_input = analogio.AnalogIn(board.A2)
+        self.speaker_output  = audioio.AudioOut(board.A0)
+        # The knobs, averaged and steadied so they only change when turned.
+        # Frequency from 50-650 Hz, in tenths of a Hz (averaged over more
+        # readings, for a finer deadband: steps of about 0.7 Hz)
+        self.frequency_input = AnalogControl(analogio.AnalogIn(board.A1), 500, 6500,
+                                             oversample=16, deadband=80)
+        # Pulse width from 50-150 ms
+        self.pulse_width_input = AnalogControl(analogio.AnalogIn(board.A2), 50, 150)
+        # Tempo (the time from the start of one pulse to the next) from 150-1000 ms
+        self.tempo_input = AnalogControl(analogio.AnalogIn(board.A3), 150, 1000)
+        # Volume from 0-15
+        self.volume_input = AnalogControl(analogio.AnalogIn(board.A6), 0, 15)
         self.pixelStatus(255, 0, 255)
         self.speaker_enable = digitalio.DigitalInOut(board.SPEAKER_ENABLE)
         self.speaker_enable.direction = digitalio.Direction.OUTPUT
         self.speaker_enable.value = True
+        # The waveform is computed once; notes just step through it
+        self.synth = Synth(harmonic_table(), sample_rate=8000)
 
     # Display a graduated color on the NeoPixels - used as a status indicator
-    def pixelStatus(red=255, green=255, blue=255, delay_ms=1000):
+    def pixelStatus(self, red=255, green=255, blue=255, delay_ms=1000):
         for i in range(8):
-            self.pixels[i] = (((red/25) * i), ((green/25) * i), ((blue / 25) * i))
+            self.pixels[i] = (int((red/25) * i), int((green/25) * i), int((blue / 25) * i))
         self.pixels.show()
-        sleep(delay_ms/1000)
+        time.sleep(delay_ms/1000)
         for i in range(8):
             self.pixels[i] =(0, 0, 0)
         self.pixels.show()
 
     # Read the analog inputs
-    def readAnalogInputs():
-        # Scale frequency from 50-650 Hz
-        frequency = (self.frequency_input.value / 109) + 50
-        # Scale duration from 50-150 ms
-        pulse_width = (self.duration_input.value / 6553) + 50
+    def readAnalogInputs(self):
+        self.frequency_input.update()
+        self.pulse_width_input.update()
+        frequency = self.frequency_input.value / 10
+        pulse_width = self.pulse_width_input.value
 
         return(frequency, pulse_width)
 
-    def playSound(sample_size=8000):
-        (frequency, pulse_width) = readAnalogInputs()
-        length = sample_size // frequency
-        waveform = array.array("H", [0] * length)
-        for t in range(length):
-            v = (1.3 * math.sin(math.pi/length)*t)
-            v = v + ((1.1 * math.sin(math.pi/length)*(t*3)))
-            v = v + ((1.4 * math.sin(math.pi/length)*(t*5)))
-            waveform[t] = int(v)
+    # Read all four knobs, for streaming
+    def readControls(self):
+        (frequency, pulse_width) = self.readAnalogInputs()
+        self.tempo_input.update()
+        self.volume_input.update()
+        return (frequency, pulse_width, self.tempo_input.value, self.volume_input.value)
+
+    # Play one pulse: the tone for pulse_width ms, then silence for the rest
+    # of the tempo, as stream() does. The synth only renders a new loop when
+    # the frequency knob has moved.
+    def playSound(self):
+        started = time.monotonic_ns()
+        (frequency, pulse_width) = self.readAnalogInputs()
+        self.tempo_input.update()
+        tempo = max(pulse_width, self.tempo_input.value)
+        wave_sample = self.synth.loop_sample(frequency)
 
         # Play that wave, baby!
         self.speaker_enable.value = True
-        wave_sample = audioio.RawSample(waveform)
-
-        audio.play(wave_sample, loop=True)  # keep playing the sample over and over
+        self.speaker_output.play(wave_sample, loop=True)  # keep playing the sample over and over
         time.sleep(pulse_width/1000)  # until...
-        audio.stop()  # we tell the board to stop
+        self.speaker_output.stop()  # we tell the board to stop
+        rest = started + tempo * 1000000 - time.monotonic_ns()
+        if rest > 0:
+            time.sleep(rest / 1000000000)  # until the next pulse
+
+    # Stream the sound forever. The knobs are read as each block is rendered,
+    # so changes are heard from the next block without stopping playback.
+    def stream(self, block_size=STREAM_BLOCK_SIZE):
+        self.controls = None
+        self.volume = None
+        self.pulse_position = 0  # samples into the current pulse
+        self.last_read_ns = 0
+        self.worst_latency_ns = 0
+        self.speaker_enable.value = True
+        self.streamer = AudioStream(self.speaker_output, self.renderBlock,
+                                    block_size=block_size, sample_rate=self.synth.sample_rate)
+        self.streamer.start()
+        stats_at = time.monotonic() + STATS_SECONDS
+        while True:
+            time.sleep(self.streamer.update())
+            if STATS_SECONDS and time.monotonic() >= stats_at:
+                self.printStats()
+                stats_at += STATS_SECONDS
+
+    # Render one block of pulses: the tone for pulse_width ms at the start of
+    # every tempo ms, and silence in between
+    def renderBlock(self, buf, start, count):
+        now = time.monotonic_ns()
+        controls = self.readControls()
+        (frequency, pulse_width, tempo, volume) = controls
+        if controls != self.controls:
+            # The knob could have moved any time since the last read, and it's
+            # heard when this block starts playing
+            if self.streamer.started_ns:
+                latency = self.streamer.block_start_ns(self.streamer.writing) - self.last_read_ns
+                if latency > self.worst_latency_ns:
+                    self.worst_latency_ns = latency
+            self.controls = controls
+        self.last_read_ns = now
+
+        if volume != self.volume:
+            self.synth.set_volume(volume / 15)
+            self.volume = volume
+        self.synth.set_frequency(frequency)
+
+        rate = self.synth.sample_rate
+        pulse_samples = int(pulse_width * rate) // 1000
+        period_samples = max(pulse_samples, int(tempo * rate) // 1000)
+        position = self.pulse_position
+        end = start + count
+        i = start
+        while i < end:
+            if position < pulse_samples:
+                n = min(pulse_samples - position, end - i)
+                self.synth.fill(buf, n, i)
+            else:
+                n = min(period_samples - position, end - i)
+                for j in range(i, i + n):
+                    buf[j] = 32768
+            i += n
+            position += n
+            if position >= period_samples:
+                position = 0
+        self.pulse_position = position
+
+    def printStats(self):
+        self.streamer.print_stats("punk console")
+        print("worst knob-to-sound latency: %d ms" % (self.worst_latency_ns // 1000000))
 
+#============================================================================
+# Kick off the app
+#============================================================================
+console = CPPunkConsole()
+if STREAMING:
+    console.stream()
+else:
+    while True:
+        console.playSound()
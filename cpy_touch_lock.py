@@ -35,127 +35,169 @@
 import board
 import touchio
 import time
-import neopixel
+
+from code_matcher import AuditLog, CodeMatcher
+from pixel_animator import Animator, Blink
+from touch_sampler import TouchSampler
+from touch_scanner import TouchScanner, mask_name
+
+# How often the touch inputs are scanned
+POLL_NS = 10000000
+
+# How long each scan may spend measuring pads. If they don't all fit, the
+# rest are measured on the next scans, round-robin.
+TOUCH_BUDGET_US = 4000
+
+STARTUP_COLORS = [(255, 0, 0), (255, 255, 0), (0, 255, 0), (0, 255, 255),
+                  (0, 0, 255), (255, 0, 255)]
 
 class CPYTouchLock:
     #------------------------------------------------------------------------
     # Set up the hardware and internal state.
     #
+    # Each digit of the combination is one touch of that pad. Digits in
+    # square brackets are touched together, so "3[47]2" is 3, then 4 and 7
+    # at once, then 2. To let several people in with their own codes, pass
+    # codes instead, as a dict of name -> combination; the audit log then
+    # shows whose code opened the lock.
+    #
     # NOTE: No checking is done on the combination to ensure that the digits
     # it contains match the button configuration of the device.
     #------------------------------------------------------------------------
-    def __init__(self, combination="1234"):
+    def __init__(self, combination="1234", codes=None):
         # Set up our internal state
-        self.combination = combination
-        self.current_pos = 0
+        if codes is None:
+            codes = {"default": combination}
+        self.matcher = CodeMatcher(codes)
+        self.audit_log = AuditLog()
         self.num_pixels = 10
 
         # Set up the NeoPixels. We use colored blink codes to display status.
-        self.pixels = neopixel.NeoPixel(board.D8, self.num_pixels)
+        # They run in the background from the event loop, so touches aren't
+        # missed while they play, and a new touch cuts them short.
+        self.pixels = Animator(board.D8, self.num_pixels)
+        self.startup_blink = Blink(STARTUP_COLORS)
+        self.match_blink = Blink([(0, 255, 0)])
+        self.wrong_blink = Blink([(255, 0, 0)] * 3)
+        self.unlock_blink = Blink([(0, 0, 255)] * 5, on=0.3, off=0.3)
+        self.worst_loop_ns = 0
 
         # Set up the capacitive touch inputs. We save the touchio objects in an
-        # array to simplify scanning them.
+        # array to simplify scanning them. The sampler calibrates each pad's
+        # threshold from its untouched reading and keeps adjusting it as the
+        # reading drifts.
         touch_inputs = [board.A1, board.A2, board.A3, board.A4, board.A5,
                 board.A6, board.A7]
         self.inputs = [None]
         for i in touch_inputs:
-            self.inputs = self.inputs + touchio.TouchIn(i)
+            self.inputs.append(touchio.TouchIn(i))
+        self.sampler = TouchSampler(self.inputs, budget_us=TOUCH_BUDGET_US)
+        self.scanner = TouchScanner(self.inputs, sampler=self.sampler)
 
         # Blink the neopixels to indicate that initialization is done.
-        blink_status(255,0,0, num_blinks=1, blink_duration=0.25)
-        blink_status(255,255,0, num_blinks=1, blink_duration=0.25)
-        blink_status(0,255,0, num_blinks=1, blink_duration=0.25)
-        blink_status(0,255,255, num_blinks=1, blink_duration=0.25)
-        blink_status(0,0,255, num_blinks=1, blink_duration=0.25)
-        blink_status(255,0,255, num_blinks=1, blink_duration=0.25)
+        self.blink_status(self.startup_blink)
 
         print("CPYTouchLock initialized with", len(touch_inputs)+1, "inputs")
 
     #------------------------------------------------------------------------
     # Scan the touch inputs and look for touches.
     #
-    # The result is a list of all the touch inputs being touched. This version of
-    # the lock treats multiple inputs as an error condition which resets the input
-    # state.
-    #
-    # Implementing "chorded" combinations is left as an exercise to the reader. :-)
-    #------------------------------------------------------------------------
-    def scan_inputs():
-        result_set = []
-        for index, input_ob in enumerate(self.inputs):
-            if input_ob is not None and input_ob.value:
-                result_set = result_set + str(index)
-        if len(result_set) > 0:
-            print("scan_inputs(): active input set is", result_set)
-        return result_set
+    # The result is a bitmask (bit n for input n) of a touch that has just
+    # finished, or 0 if none has. A touch counts once however long it's held,
+    # and touching several inputs at once gives all of their bits (a chord).
+    #------------------------------------------------------------------------
+    def scan_inputs(self):
+        touch = self.scanner.scan()
+        if touch:
+            print("scan_inputs(): touch", mask_name(touch), "scan took",
+                  self.scanner.last_scan_ns // 1000, "us, worst",
+                  self.scanner.worst_scan_ns // 1000, "us")
+        return touch
 
     #------------------------------------------------------------------------
-    # Blink the NeoPixels to indicate status.
+    # Start blinking the NeoPixels to indicate status. This returns straight
+    # away; the event loop keeps the blinks going.
     #------------------------------------------------------------------------
-    def blink_status(red_val, grn_val, blu_val, num_blinks=5, blink_duration=0.25):
-        for i in range(num_blinks):
-            for i in range(self.num_pixels):
-                self.pixels[i] = (red_val, grn_val, blu_val)
-            time.sleep(blink_duration)
-            for i in range(self.num_pixels):
-                self.pixels[i] = (0, 0, 0)
-            time.sleep(blink_duration)
+    def blink_status(self, blink):
+        self.pixels.begin(blink)
 
     #------------------------------------------------------------------------
-    # Reset the input state after a successful unlock or an incorrect digit.
+    # Signal an incorrect touch. The matcher keeps whatever part of the
+    # attempt could still be the start of a code.
     #------------------------------------------------------------------------
-    def reset_input_state():
-        print("reset_input_state(): resetting")
-        self.current_pos = 0
-        blink_status(255, 0, 0, 3)
+    def reset_input_state(self):
+        print("reset_input_state(): resetting,", self.matcher.depth(), "touches still count")
+        self.blink_status(self.wrong_blink)
 
     #------------------------------------------------------------------------
     # Activate whatever hardware is requ9ired to unlock the device.
     #------------------------------------------------------------------------
-    def do_unlock_hardware():
+    def do_unlock_hardware(self):
         print("do_unlock_hardware(): no hardware configured")
 
     #------------------------------------------------------------------------
     # Handle a successful unlock (and then call do_unlock_hardware() to actually
     # unlock the device.
     #------------------------------------------------------------------------
-    def do_unlock():
-        print("do_unlock(): successful unlock")
-        blink_status(0, 0, 255, num_blinks=5, blink_duration=0.3)
+    def do_unlock(self, code):
+        print("do_unlock(): successful unlock by", self.matcher.names[code])
+        self.audit_log.record(code)
+        self.audit_log.print_log(self.matcher.names)
+        self.blink_status(self.unlock_blink)
         self.do_unlock_hardware()
-        self.current_pos = 0
-
-    #------------------------------------------------------------------------
-    # Check the result set returned from scan_inputs() and handle the digit(s)
-    # pressed.
-    #------------------------------------------------------------------------
-    def check_and_process_input(result_set):
-        print("check_and_process_input()", "result_set length=", len(result_set))
-        if len(result_set) > 1:
-            print("check_and_process_input()", "multiple buttons pressed; resetting input state")
-            reset_input_state()
-        if result_set[0] == self.combination[self.current_pos]:
-            print("check_and_process_input()", "Digit", self.current_pos, "matched combination")
-            current_pos = current_pos + 1
-            print("check_and_process_input()", "current_pos is now", current_pos)
-            blink_status(0, 255, 0, num_blinks=1)
-            if current_pos > (len(combination)-1):
-                do_unlock()
+        self.print_stats()
+
+    #------------------------------------------------------------------------
+    # Feed the touch returned from scan_inputs() to the code matcher.
+    #------------------------------------------------------------------------
+    def check_and_process_input(self, touch):
+        if touch == 0:
+            return
+        depth = self.matcher.depth()
+        code = self.matcher.advance(touch)
+        if code >= 0:
+            self.do_unlock(code)
+        elif self.matcher.depth() > depth:
+            print("check_and_process_input()", "touch", mask_name(touch), "matched; depth is now",
+                  self.matcher.depth())
+            self.blink_status(self.match_blink)
         else:
-            print("check_and_process_input()", "")
-            reset_input_state()
+            print("check_and_process_input()", "wrong touch", mask_name(touch))
+            self.reset_input_state()
+
+    def print_stats(self):
+        self.scanner.print_stats("print_stats(): touch")
+        self.sampler.print_stats("print_stats(): touch pads")
+        print("print_stats(): worst loop %d us, worst LED frame %d us" %
+              (self.worst_loop_ns // 1000, self.pixels.worst_frame_ns // 1000))
 
     #------------------------------------------------------------------------
-    # App event loop.
+    # App event loop. Scans every POLL_NS, however long the work in between
+    # took, and keeps the status blinks going.
     #------------------------------------------------------------------------
-    def run():
+    def run(self):
         print("run(): starting event loop")
+        next_poll = time.monotonic_ns()
         while True:
-            input_set = scan_inputs()
-            check_and_process_input(input_set)
-            time.sleep(0.01)
+            started = time.monotonic_ns()
+            touch = self.scan_inputs()
+            if self.scanner.pressed:
+                # Someone's touching the lock; stop any blinks so the
+                # feedback for this touch isn't lost behind the last one's
+                self.pixels.stop()
+            self.check_and_process_input(touch)
+            self.pixels.update()
+
+            now = time.monotonic_ns()
+            if now - started > self.worst_loop_ns:
+                self.worst_loop_ns = now - started
+            next_poll += POLL_NS
+            if next_poll > now:
+                time.sleep((next_poll - now) / 1000000000)
+            else:
+                next_poll = now
 
 #============================================================================
 # Kick off the app
 #============================================================================
-CPyTouchLock.new("3472").run()
+CPYTouchLock(codes={"owner": "3472"}).run()
@@ -0,0 +1,133 @@
+##############################################################################
+#                 Wavetable Synthesizer (DDS)                                #
+##############################################################################
+# One cycle of the waveform is computed once, into a TABLE_SIZE-entry       #
+# table, and notes are played by stepping through it with a phase          #
+# accumulator: a PHASE_BITS-bit number that advances by a fixed step each   #
+# sample, whose top TABLE_BITS bits pick the table entry. The step sets the #
+# frequency exactly, at a fixed sample rate, so changing note is a matter   #
+# of a new step rather than any trigonometry. Volume is an integer gain    #
+# applied as samples are filled, so it can change just as cheaply.         #
+#                                                                            #
+# For looping with AudioOut, loop_sample() renders just enough whole cycles #
+# to repeat cleanly within a cent of the frequency, and reuses the last     #
+# loop it rendered while the frequency stays within that cent.              #
+##############################################################################
+
+import array
+import math
+
+import audioio
+
+from wave_cache import CENTS_TOLERANCE, table_size
+
+# The phase accumulator is this many bits; one cycle is 1 << PHASE_BITS.
+# The top TABLE_BITS of it pick the table entry.
+PHASE_BITS = 24
+TABLE_BITS = 8
+TABLE_SIZE = 1 << TABLE_BITS
+PHASE_MASK = (1 << PHASE_BITS) - 1
+INDEX_SHIFT = PHASE_BITS - TABLE_BITS
+
+# Volume gain is in 1/256ths; full volume leaves the table as it is
+GAIN_BITS = 8
+FULL_GAIN = 1 << GAIN_BITS
+
+# The punk console's tone: odd harmonics 1, 3 and 5, as (harmonic, weight)
+PUNK_HARMONICS = ((1, 1.3), (3, 1.1), (5, 1.4))
+
+#----------------------------------------------------------------------------
+# One cycle of a mix of harmonics, as 16-bit unsigned samples. The sine is
+# computed once; the harmonics are read from it at 3x, 5x, ... the speed
+# and mixed with weights in 1/256ths, then scaled to fill volume (0.0-1.0).
+#----------------------------------------------------------------------------
+def harmonic_table(harmonics=PUNK_HARMONICS, volume=1.0):
+    sine = array.array("h", [int(math.sin(2 * math.pi * i / TABLE_SIZE) * 32767)
+                             for i in range(TABLE_SIZE)])
+    weights = [(h, int(w * 256)) for h, w in harmonics]
+    mixed = array.array("l", [0] * TABLE_SIZE)
+    peak = 1
+    for i in range(TABLE_SIZE):
+        v = 0
+        for h, w in weights:
+            v += sine[(h * i) & (TABLE_SIZE - 1)] * w
+        mixed[i] = v
+        if abs(v) > peak:
+            peak = abs(v)
+    amplitude = int(32767 * volume)
+    table = array.array("H", [0] * TABLE_SIZE)
+    for i in range(TABLE_SIZE):
+        table[i] = 32768 + mixed[i] * amplitude // peak
+    return table
+
+class Synth:
+    def __init__(self, table, sample_rate=8000, max_length=1024, tolerance=CENTS_TOLERANCE):
+        self.table = table
+        self.sample_rate = sample_rate
+        self.max_length = max_length
+        self.tolerance = tolerance
+        # Frequency ratios within tolerance cents either way
+        self.ratio_high = 2 ** (tolerance / 1200)
+        self.ratio_low = 1 / self.ratio_high
+        self.step = 0
+        self.phase = 0
+        self.gain = FULL_GAIN
+        # Two loop buffers, so one can be rendered while the other plays
+        self.loops = [array.array("H", [0] * max_length) for _ in range(2)]
+        self.current = 1
+        self.sample = None
+        self.sample_hz = 0
+        self.renders = 0
+        self.reuses = 0
+
+    # Phase step for a frequency at this synth's sample rate
+    def step_for(self, hz):
+        return int(hz * (1 << PHASE_BITS) / self.sample_rate + 0.5)
+
+    def set_frequency(self, hz):
+        self.step = self.step_for(hz)
+
+    # Scale the table's volume (0.0-1.0) as it's played
+    def set_volume(self, volume):
+        self.gain = int(volume * FULL_GAIN + 0.5)
+
+    #------------------------------------------------------------------------
+    # Fill buf[start:start + count] with the next samples at the current
+    # frequency, carrying on from where the last fill() left off.
+    #------------------------------------------------------------------------
+    def fill(self, buf, count=None, start=0):
+        if count is None:
+            count = len(buf) - start
+        table = self.table
+        step = self.step
+        phase = self.phase
+        gain = self.gain
+        if gain == FULL_GAIN:
+            for i in range(start, start + count):
+                buf[i] = table[phase >> INDEX_SHIFT]
+                phase = (phase + step) & PHASE_MASK
+        else:
+            for i in range(start, start + count):
+                buf[i] = 32768 + (((table[phase >> INDEX_SHIFT] - 32768) * gain) >> GAIN_BITS)
+                phase = (phase + step) & PHASE_MASK
+        self.phase = phase
+
+    #------------------------------------------------------------------------
+    # A RawSample that loops at hz. Only renders when hz has moved more than
+    # the tolerance from the last one.
+    #------------------------------------------------------------------------
+    def loop_sample(self, hz):
+        if self.sample is not None and self.ratio_low <= hz / self.sample_hz <= self.ratio_high:
+            self.reuses += 1
+            return self.sample
+        cycles, length = table_size(hz, self.sample_rate, self.tolerance, self.max_length)
+        self.current = 1 - self.current
+        loop = self.loops[self.current]
+        # The step that fits exactly `cycles` cycles into `length` samples
+        self.step = (cycles << PHASE_BITS) // length
+        self.phase = 0
+        self.fill(loop, length)
+        self.sample = audioio.RawSample(memoryview(loop)[:length], sample_rate=self.sample_rate)
+        self.sample_hz = hz
+        self.renders += 1
+        return self.sample
@@ -0,0 +1,146 @@
+##############################################################################
+#              Debounced Buttons and Switches, as Events                     #
+##############################################################################
+# InputEvents polls a set of digital inputs without ever sleeping. Each     #
+# input has a small state machine: a change only counts once the reading   #
+# has held steady for settle_ms, and then produces a PRESS or RELEASE      #
+# event. Held inputs can also produce a LONG_PRESS after long_press_ms,    #
+# and REPEAT events every repeat_ms after repeat_delay_ms, for stepping    #
+# through values by holding a button.                                        #
+#                                                                            #
+# Events wait in a fixed-size queue until the main loop takes them with    #
+# get(). If the queue fills up, new events are dropped and counted.        #
+#                                                                            #
+# Times are in ms and wrap at 32 bits (about every 49.7 days), so they fit #
+# the queue's array; compare them with ms_diff(), never directly.          #
+##############################################################################
+
+import array
+import time
+
+PRESS = 1
+RELEASE = 2
+LONG_PRESS = 3
+REPEAT = 4
+
+EVENT_NAMES = {PRESS: "press", RELEASE: "release", LONG_PRESS: "long press", REPEAT: "repeat"}
+
+# Event times wrap at 32 bits
+MS_MASK = 0xFFFFFFFF
+MS_HALF = 0x80000000
+
+def now_ms():
+    return (time.monotonic_ns() // 1000000) & MS_MASK
+
+# How many ms later is than earlier (negative if it's before), across a wrap
+def ms_diff(later, earlier):
+    return ((later - earlier + MS_HALF) & MS_MASK) - MS_HALF
+
+class DebouncedInput:
+    def __init__(self, name, pin, active_high=True, settle_ms=20, long_press_ms=None,
+                 repeat_delay_ms=None, repeat_ms=None):
+        self.name = name
+        self.pin = pin
+        self.active_high = active_high
+        self.settle_ms = settle_ms
+        self.long_press_ms = long_press_ms
+        self.repeat_delay_ms = repeat_delay_ms
+        self.repeat_ms = repeat_ms
+        now = now_ms()
+        # The input starts in whatever state it's in, without an event
+        self.reading = self.read()
+        self.pressed = self.reading
+        self.changed_at = now
+        self.pressed_at = now
+        self.next_repeat = 0
+        self.long_sent = False
+
+    # True if the input is being pressed (or the switch is on) right now,
+    # before debouncing
+    def read(self):
+        return self.pin.value == self.active_high
+
+    #------------------------------------------------------------------------
+    # Check the input, passing any events to queue.add().
+    #------------------------------------------------------------------------
+    def update(self, queue, now):
+        reading = self.read()
+        if reading != self.reading:
+            self.reading = reading
+            self.changed_at = now
+        elif reading != self.pressed and ms_diff(now, self.changed_at) >= self.settle_ms:
+            self.pressed = reading
+            if reading:
+                self.pressed_at = now
+                self.long_sent = False
+                if self.repeat_delay_ms is not None:
+                    self.next_repeat = (now + self.repeat_delay_ms) & MS_MASK
+                queue.add(self.name, PRESS, now)
+            else:
+                queue.add(self.name, RELEASE, now)
+            return
+
+        if self.pressed:
+            if (self.long_press_ms is not None and not self.long_sent and
+                    ms_diff(now, self.pressed_at) >= self.long_press_ms):
+                self.long_sent = True
+                queue.add(self.name, LONG_PRESS, now)
+            if self.repeat_delay_ms is not None and ms_diff(now, self.next_repeat) >= 0:
+                self.next_repeat = (self.next_repeat + self.repeat_ms) & MS_MASK
+                # Don't try to catch up on repeats we were too busy to send
+                if ms_diff(self.next_repeat, now) <= 0:
+                    self.next_repeat = (now + self.repeat_ms) & MS_MASK
+                queue.add(self.name, REPEAT, now)
+
+class InputEvents:
+    def __init__(self, size=8):
+        self.inputs = []
+        self.by_name = {}
+        self.size = size
+        self.names = [None] * size
+        self.kinds = bytearray(size)
+        self.times = array.array("L", [0] * size)
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+
+    # Watch a DigitalInOut; the options are DebouncedInput's. Returns the
+    # DebouncedInput, whose .pressed is the current debounced state.
+    def add_input(self, name, pin, **options):
+        watched = DebouncedInput(name, pin, **options)
+        self.inputs.append(watched)
+        self.by_name[name] = watched
+        return watched
+
+    def pressed(self, name):
+        return self.by_name[name].pressed
+
+    # Check every input. Call this as often as possible from the main loop.
+    def update(self):
+        now = now_ms()
+        for watched in self.inputs:
+            watched.update(self, now)
+
+    def add(self, name, kind, when):
+        if self.count == self.size:
+            self.dropped += 1
+            return
+        i = (self.head + self.count) % self.size
+        self.names[i] = name
+        self.kinds[i] = kind
+        self.times[i] = when & MS_MASK
+        self.count += 1
+
+    # The oldest waiting event as (name, kind, time in ms from now_ms()), or
+    # None
+    def get(self):
+        if self.count == 0:
+            return None
+        i = self.head
+        self.head = (i + 1) % self.size
+        self.count -= 1
+        return (self.names[i], self.kinds[i], self.times[i])
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
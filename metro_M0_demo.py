@@ -9,13 +9,19 @@ from analogio import AnalogIn
 import audioio
 import touchio
 import simpleio
+from color_lut import wheel
+from pixel_buffer import DirtyPixels
+from analog_control import AnalogControl
+from touch_sampler import TouchSampler
+from task_scheduler import Scheduler
 
 # keyboard support
 from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
 
-# One pixel connected internally!
-dot = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
+# One pixel connected internally! Both it and the strip below only get
+# pushed when their colours change.
+dot = DirtyPixels(neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2, auto_write=False))
 
 # Built in red LED
 led = DigitalInOut(board.D13)
@@ -24,11 +30,13 @@ led.direction = Direction.OUTPUT
 # Analog audio output on A0, using two audio files
 audiofiles = ["rimshot.wav", "laugh.wav"]
 
-# Analog input on A1
-analog1in = AnalogIn(board.A1)
+# Analog input on A1, read in hundredths of a volt (0-3.30 V), averaged and
+# steadied so the reading doesn't jitter
+analog1in = AnalogControl(AnalogIn(board.A1), 0, 330)
 
-# Capacitive touch on A2
-touch = touchio.TouchIn(board.A2)
+# Capacitive touch on A2, with a threshold that follows the pad's untouched
+# reading as it drifts. It's measured once per loop, by touch.sample().
+touch = TouchSampler([touchio.TouchIn(board.A2)])
 
 # Digital input with pullup on D2, D3, and D4
 buttons = []
@@ -43,7 +51,10 @@ servo = simpleio.Servo(board.D5)
 
 # NeoPixel strip (of 16 LEDs) connected on D6
 NUMPIXELS = 16
-neopixels = neopixel.NeoPixel(board.D6, NUMPIXELS, brightness=0.2, auto_write=False)
+neopixels = DirtyPixels(neopixel.NeoPixel(board.D6, NUMPIXELS, brightness=0.2, auto_write=False))
+
+# Each strip pixel's position on the colour wheel, relative to the swirl
+swirl_offsets = bytearray(int(p * 256 / NUMPIXELS) for p in range(NUMPIXELS))
 
 # Used if we do HID output, see below
 kbd = Keyboard()
@@ -51,78 +62,104 @@ kbd = Keyboard()
 ######################### HELPERS ##############################
 
 # Helper to convert analog input to voltage
-def getVoltage(pin):
-    return (pin.value * 3.3) / 65536
-
-# Helper to give us a nice color swirl
-def wheel(pos):
-    # Input a value 0 to 255 to get a color value.
-    # The colours are a transition r - g - b - back to r.
-    if (pos < 0):
-        return [0, 0, 0]
-    if (pos > 255):
-        return [0, 0, 0]
-    if (pos < 85):
-        return [int(pos * 3), int(255 - (pos*3)), 0]
-    elif (pos < 170):
-        pos -= 85
-        return [int(255 - pos*3), 0, int(pos*3)]
-    else:
-        pos -= 170
-        return [0, int(pos*3), int(255 - pos*3)]
+def getVoltage(control):
+    control.update()
+    return control.value / 100
+
+# Start playing a file. The audio task notices when it has finished, so
+# everything else keeps running while it plays.
+playing = None
+playing_file = None
 
 def play_file(filename):
+    global playing, playing_file
+    if playing is not None:
+        return
     print("")
     print("----------------------------------")
     print("playing file "+filename)
-    f = open(filename, "rb")
-    a = audioio.AudioOut(board.A0, f)
-    a.play()
-    while a.playing:
-        pass
-    print("finished")
-    print("----------------------------------")
-    
-######################### MAIN LOOP ##############################
+    playing_file = open(filename, "rb")
+    playing = audioio.AudioOut(board.A0, playing_file)
+    playing.play()
 
-i = 0
-while True:
-  # spin internal LED around! autoshow is on
-  dot[0] = wheel(i & 255)
+######################### TASKS ##############################
+# Each of these runs at its own rate, from the scheduler below. They share
+# what they read through these globals, and the status task prints it.
 
-  # also make the neopixels swirl around
+i = 0
+voltage = 0.0
+touched = 0
+pressed = ""
+
+# spin internal LED around, and make the neopixels swirl around too
+def swirl():
+  global i
+  dot[0] = wheel(i)
+  dot.show()
   for p in range(NUMPIXELS):
-      idx = int ((p * 256 / NUMPIXELS) + i)
-      neopixels[p] = wheel(idx & 255)
+      neopixels[p] = wheel(swirl_offsets[p] + i)
   neopixels.show()
+  i = (i+1) % 256  # run from 0 to 255
 
-  # Read analog voltage on A1
-  print("A1: %0.2f" % getVoltage(analog1in), end="\t")
+# Read analog voltage on A1
+def read_analog():
+  global voltage
+  voltage = getVoltage(analog1in)
 
-  # use A2 as capacitive touch to turn on internal LED
-  print("A2 touch: %d" % touch.raw_value, end="\t")
-  if touch.value:
-      print("A2 touched!", end ="\t")
-  led.value = touch.value
+# use A2 as capacitive touch to turn on internal LED
+def read_touch():
+  global touched
+  touched = touch.sample()
+  led.value = touched
 
+def read_buttons():
+  global pressed
+  pressed = ""
   if not buttons[0].value:
-      print("Button D2 pressed!", end ="\t")
+      pressed += "Button D2 pressed!\t"
       # optional! uncomment below & save to have it sent a keypress
       #kbd.press(Keycode.A)
       #kbd.release_all()
 
   if not buttons[1].value:
-      print("Button D3 pressed!", end ="\t")
+      pressed += "Button D3 pressed!\t"
       play_file(audiofiles[0])
 
   if not buttons[2].value:
-      print("Button D4 pressed!", end ="\t")
+      pressed += "Button D4 pressed!\t"
       play_file(audiofiles[1])
 
-  # sweep a servo from 0-180 degrees (map from 0-255)
+# sweep a servo from 0-180 degrees (map from 0-255)
+def sweep_servo():
   servo.angle = simpleio.map_range(i, 0, 255, 0, 180)
-  
-  i = (i+1) % 256  # run from 0 to 255
-  #time.sleep(0.01) # make bigger to slow down
 
-  print("")
\ No newline at end of file
+# Tidy up once a file has finished playing
+def check_audio():
+  global playing, playing_file
+  if playing is not None and not playing.playing:
+      playing.deinit()
+      playing_file.close()
+      playing = None
+      playing_file = None
+      print("finished")
+      print("----------------------------------")
+
+def print_status():
+  print("A1: %0.2f" % voltage, end="\t")
+  print("A2 touch: %d" % touch.raw[0], end="\t")
+  if touched:
+      print("A2 touched!", end ="\t")
+  print(pressed)
+
+######################### MAIN LOOP ##############################
+
+scheduler = Scheduler()
+scheduler.add("swirl", swirl, 50)
+scheduler.add("analog", read_analog, 20)
+scheduler.add("touch", read_touch, 50)
+scheduler.add("buttons", read_buttons, 50)
+scheduler.add("servo", sweep_servo, 50)
+scheduler.add("audio", check_audio, 20)
+scheduler.add("status", print_status, 5)
+scheduler.add("stats", scheduler.print_stats, 0.1)
+scheduler.run()
\ No newline at end of file
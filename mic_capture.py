@@ -0,0 +1,113 @@
+##############################################################################
+#                 Continuous Microphone Capture Pipeline                     #
+##############################################################################
+# PDMIn.record() blocks until its buffer is full, and nothing is recorded  #
+# between calls, so any time a script spends sleeping is audio it never    #
+# hears. MicCapture records into a ring of preallocated blocks and hands   #
+# each one, in order, to every consumer (a function taking the block) that #
+# has been added, like a loudness tracker or a pitch detector.              #
+#                                                                            #
+# Recording blocks, so nothing is recorded while consumers run either.     #
+# pump() records one block and processes it straight away, which is what  #
+# scripts call from their main loop, and wait() pumps in place of          #
+# time.sleep() while the audio output or NeoPixels are busy. capture()    #
+# and process() can also be called separately, to record a few blocks     #
+# back to back (up to one per buffer) and process them together after.   #
+#                                                                            #
+# Each block lost is counted once: as an overrun if it was recorded but    #
+# overwritten before it was processed, or as dropped if nobody was         #
+# recording when it would have been.                                         #
+##############################################################################
+
+import array
+import time
+
+class MicCapture:
+    def __init__(self, mic, block_size=160, buffers=2, sample_rate=16000):
+        self.mic = mic
+        self.block_size = block_size
+        self.block_ns = block_size * 1000000000 // sample_rate
+        self.buffers = [array.array("H", [0] * block_size) for _ in range(buffers)]
+        self.consumers = []
+        self.next_write = 0
+        self.next_read = 0
+        self.waiting = 0
+        self.last_end = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.blocks_captured = 0
+        self.blocks_processed = 0
+        self.overruns = 0
+        self.dropped_blocks = 0
+
+    # Add a function to be called with each recorded block
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+    #------------------------------------------------------------------------
+    # Record the next block. If every buffer is still waiting to be
+    # processed, the oldest is overwritten.
+    #------------------------------------------------------------------------
+    def capture(self):
+        count = len(self.buffers)
+        if self.waiting == count:
+            self.overruns += 1
+            self.next_read = (self.next_read + 1) % count
+            self.waiting -= 1
+
+        started = time.monotonic_ns()
+        if self.last_end is not None:
+            self.dropped_blocks += (started - self.last_end) // self.block_ns
+        buf = self.buffers[self.next_write]
+        self.mic.record(buf, self.block_size)
+        self.last_end = time.monotonic_ns()
+
+        self.next_write = (self.next_write + 1) % count
+        self.waiting += 1
+        self.blocks_captured += 1
+        return buf
+
+    # Hand every waiting block to the consumers, oldest first. Returns how
+    # many blocks there were.
+    def process(self):
+        handled = 0
+        while self.waiting:
+            buf = self.buffers[self.next_read]
+            for consumer in self.consumers:
+                consumer(buf)
+            self.next_read = (self.next_read + 1) % len(self.buffers)
+            self.waiting -= 1
+            handled += 1
+        self.blocks_processed += handled
+        return handled
+
+    # Record a block and process it. Returns the block.
+    def pump(self):
+        buf = self.capture()
+        self.process()
+        return buf
+
+    # Keep capturing for the given number of seconds, in place of
+    # time.sleep(). Whatever's left at the end that's too short for a whole
+    # block is slept.
+    def wait(self, seconds):
+        deadline = time.monotonic_ns() + int(seconds * 1000000000)
+        while deadline - time.monotonic_ns() >= self.block_ns:
+            self.pump()
+        remaining = deadline - time.monotonic_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1000000000)
+
+    # Forget when the last block ended, e.g. before stopping on purpose, so
+    # the pause isn't counted as dropped blocks
+    def pause(self):
+        self.last_end = None
+
+    def print_stats(self, name="mic"):
+        print("%s: %d blocks captured, %d processed, %d overruns, %d dropped" %
+              (name, self.blocks_captured, self.blocks_processed,
+               self.overruns, self.dropped_blocks))
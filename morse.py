@@ -0,0 +1,595 @@
+##############################################################################
+#                  Morse Code Helpers for CircuitPython                      #
+##############################################################################
+# Shared by cp_morse.py. Messages are compiled once into a run-length keying #
+# schedule: an array('H') of alternating key-down / key-up durations, in    #
+# dot units, starting with key-down. Timing follows the PARIS standard      #
+# (dot = 1 unit, dash = 3, element gap = 1, character gap = 3, word gap = 7) #
+# so a schedule is independent of the sending speed and can be replayed at #
+# any wpm.                                                                   #
+##############################################################################
+
+import array
+import math
+import time
+
+# Only ElementSidetone needs audioio; morse_to_wav.py uses the rest on a host
+try:
+    import audioio
+except ImportError:
+    audioio = None
+
+# Morse code alphabet, packed one byte per symbol and indexed by
+# ord(c) - CODE_FIRST. Each code is a 1 "length" bit followed by one bit per
+# element, most significant first, 0 for a dot and 1 for a dash; so 'A' (.-)
+# is 0b101 and 'S' (...) is 0b1000. 0 means the character has no code.
+#
+#   A .-     B -...   C -.-.   D -..    E .      F ..-.   G --.    H ....
+#   I ..     J .---   K -.-    L .-..   M --     N -.     O ---    P .--.
+#   Q --.-   R .-.    S ...    T -      U ..-    V ...-   W .--    X -..-
+#   Y -.--   Z --..   0 -----  1 .----  2 ..---  3 ...--  4 ....-  5 .....
+#   6 -....  7 --...  8 ---..  9 ----.  & .-...  : ---... , --..-- ! -.-.--
+#   = -...-  . .-.-.- - -....- + .-.-.  ? ..--.. / -..-.  ' .----.
+CODE_FIRST = 32
+CODE = (b"\x00\x6b\x00\x00\x00\x00\x28\x5e"    #  !"#$%&'
+        b"\x00\x00\x00\x2a\x73\x61\x55\x32"    # ()*+,-./
+        b"\x3f\x2f\x27\x23\x21\x20\x30\x38"    # 01234567
+        b"\x3c\x3e\x78\x00\x00\x31\x00\x4c"    # 89:;<=>?
+        b"\x00\x05\x18\x1a\x0c\x02\x12\x0e"    # @ABCDEFG
+        b"\x10\x04\x17\x0d\x14\x07\x06\x0f"    # HIJKLMNO
+        b"\x16\x1d\x0a\x08\x03\x09\x11\x0b"    # PQRSTUVW
+        b"\x19\x1b\x1c")                   # XYZ
+
+# Reverse index from packed code back to the character code, 0 if unused
+DECODE = bytearray(256)
+for _i, _code in enumerate(CODE):
+    if _code:
+        DECODE[_code] = _i + CODE_FIRST
+
+# Returned by decode() for element groups that aren't in the table
+UNKNOWN_CHAR = '*'
+
+# Element and gap lengths, in dot units
+DOT_UNITS = 1
+DASH_UNITS = 3
+ELEMENT_GAP_UNITS = 1
+CHAR_GAP_UNITS = 3
+WORD_GAP_UNITS = 7
+
+# The standard word "PARIS " is 50 dot units long, so one dot lasts
+# 60 / (50 * wpm) seconds.
+NS_PER_DOT_AT_1_WPM = 1200000000
+
+# Sidetone defaults. Each tone element fades in and out over RAMP_MS so it
+# doesn't click.
+SIDETONE_HZ = 600
+SIDETONE_SAMPLE_RATE = 8000
+SIDETONE_VOLUME = 0.5
+SIDETONE_RAMP_MS = 5
+
+# Silence level and peak swing for each sample type render_sidetone() can
+# produce: unsigned 8-bit (WaveFile and RawSample), unsigned 16-bit
+# (RawSample) and signed 16-bit (.wav files)
+SAMPLE_FORMATS = {"B": (128, 127), "H": (32768, 32767), "h": (0, 32767)}
+
+# MorseReceiver estimates the sender's speed from this many marks before it
+# starts decoding
+CALIBRATION_MARKS = 6
+
+# Sleep until we're this close to a deadline, then spin for the remainder.
+# time.sleep() only has millisecond resolution on most boards.
+SPIN_NS = 2000000
+
+#----------------------------------------------------------------------------
+# Look up the packed code for a character; 0 if it can't be sent.
+#----------------------------------------------------------------------------
+def encode(c):
+    i = ord(c.upper()) - CODE_FIRST
+    if 0 <= i < len(CODE):
+        return CODE[i]
+    return 0
+
+#----------------------------------------------------------------------------
+# Number of elements in a packed code.
+#----------------------------------------------------------------------------
+def code_length(code):
+    length = 0
+    while code > 1:
+        code >>= 1
+        length += 1
+    return length
+
+#----------------------------------------------------------------------------
+# Expand a packed code into its '.'/'-' string, e.g. 0b101 -> '.-'.
+#----------------------------------------------------------------------------
+def code_elements(code):
+    result = ""
+    for i in range(code_length(code) - 1, -1, -1):
+        if (code >> i) & 1:
+            result += '-'
+        else:
+            result += '.'
+    return result
+
+#----------------------------------------------------------------------------
+# Look up the character for a packed code; UNKNOWN_CHAR if there isn't one.
+#----------------------------------------------------------------------------
+def decode_code(code):
+    if 0 < code < 256 and DECODE[code]:
+        return chr(DECODE[code])
+    return UNKNOWN_CHAR
+
+#----------------------------------------------------------------------------
+# Turn keyed elements back into text. Characters are separated by a space
+# and words by a '/' (or by two or more spaces), so
+# ".. / .- -- / .... . .-. ." decodes to "I AM HERE".
+#----------------------------------------------------------------------------
+def decode(elements):
+    text = ""
+    code = 1
+    spaces = 0
+    for mc in elements:
+        if mc == '.' or mc == '-':
+            if spaces > 1 and len(text) > 0 and text[-1] != ' ':
+                text += ' '
+            spaces = 0
+            code = (code << 1) | (mc == '-')
+        else:
+            if code > 1:
+                text += decode_code(code)
+                code = 1
+            if mc == '/':
+                spaces = 2
+            elif mc == ' ':
+                spaces += 1
+    if code > 1:
+        text += decode_code(code)
+    return text
+
+#----------------------------------------------------------------------------
+# Compile a message into a keying schedule. Characters missing from CODE are
+# reported once here rather than every time the message is sent.
+#----------------------------------------------------------------------------
+def compile_schedule(message):
+    schedule = array.array("H")
+    gap = 0
+    for c in message.upper():
+        if c == ' ':
+            if len(schedule) > 0:
+                gap = WORD_GAP_UNITS
+            continue
+        code = encode(c)
+        if code == 0:
+            print("Note: Undefined morse character", "'" + c + "'", "skipped")
+            continue
+        if len(schedule) > 0:
+            schedule.append(gap)
+        length = code_length(code)
+        for i in range(length - 1, -1, -1):
+            if i < length - 1:
+                schedule.append(ELEMENT_GAP_UNITS)
+            if (code >> i) & 1:
+                schedule.append(DASH_UNITS)
+            else:
+                schedule.append(DOT_UNITS)
+        gap = CHAR_GAP_UNITS
+    # Finish with a word gap so back-to-back messages stay separated and the
+    # schedule always holds whole key-down/key-up pairs.
+    if len(schedule) > 0:
+        schedule.append(WORD_GAP_UNITS)
+    return schedule
+
+#----------------------------------------------------------------------------
+# Keys an output (anything with a boolean .value, e.g. a DigitalInOut) from
+# compiled schedules. Schedules are cached per message, and each transition
+# is timed against an absolute monotonic_ns() deadline so that print and
+# loop overhead never accumulates over the length of a message. Set
+# sidetone to an ElementSidetone to sound each element as it's keyed.
+#----------------------------------------------------------------------------
+class MorseKeyer:
+    def __init__(self, key, wpm=20, sidetone=None):
+        self.key = key
+        self.sidetone = sidetone
+        self.schedules = {}
+        self.elapsed_ns = 0
+        self.nominal_ns = 0
+        self.set_wpm(wpm)
+
+    def set_wpm(self, wpm):
+        self.wpm = wpm
+        self.dot_ns = NS_PER_DOT_AT_1_WPM // wpm
+
+    # Return the cached schedule for a message, compiling it on first use.
+    def schedule(self, message):
+        schedule = self.schedules.get(message)
+        if schedule is None:
+            schedule = compile_schedule(message)
+            self.schedules[message] = schedule
+        return schedule
+
+    # Send a message and return the measured sending speed in wpm.
+    def send(self, message):
+        schedule = self.schedule(message)
+        key = self.key
+        sidetone = self.sidetone
+        dot_ns = self.dot_ns
+        keyed = True
+        start = deadline = time.monotonic_ns()
+        for units in schedule:
+            key.value = keyed
+            if keyed and sidetone is not None:
+                sidetone.play(units)
+            deadline += units * dot_ns
+            wait_until_ns(deadline)
+            keyed = not keyed
+        key.value = False
+        self.elapsed_ns = time.monotonic_ns() - start
+        self.nominal_ns = deadline - start
+        return self.measured_wpm()
+
+    # Speed actually achieved by the last send(), scaled from the nominal
+    # speed by how long the message should have taken versus how long it did.
+    def measured_wpm(self):
+        if self.elapsed_ns <= 0:
+            return 0.0
+        return self.wpm * self.nominal_ns / self.elapsed_ns
+
+#----------------------------------------------------------------------------
+# Block until time.monotonic_ns() reaches the given deadline.
+#----------------------------------------------------------------------------
+def wait_until_ns(deadline):
+    remaining = deadline - time.monotonic_ns()
+    if remaining > SPIN_NS:
+        time.sleep((remaining - SPIN_NS) / 1000000000)
+    while time.monotonic_ns() < deadline:
+        pass
+
+#----------------------------------------------------------------------------
+# Current time in microseconds, wrapped to 32 bits to match the receiver's
+# edge buffer.
+#----------------------------------------------------------------------------
+def now_us():
+    return (time.monotonic_ns() // 1000) & 0xFFFFFFFF
+
+#----------------------------------------------------------------------------
+# Turns an AnalogIn (e.g. a light sensor watching a blinking LED, or an
+# envelope detector on a receiver's audio) into something with a boolean
+# .value, using separate on and off thresholds so noise near the crossing
+# point doesn't produce extra edges.
+#----------------------------------------------------------------------------
+class ThresholdInput:
+    def __init__(self, analog_in, on_threshold=40000, off_threshold=24000):
+        self.analog_in = analog_in
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.keyed = False
+
+    @property
+    def value(self):
+        reading = self.analog_in.value
+        if self.keyed:
+            if reading < self.off_threshold:
+                self.keyed = False
+        elif reading > self.on_threshold:
+            self.keyed = True
+        return self.keyed
+
+#----------------------------------------------------------------------------
+# Decodes Morse code from key edges as they arrive.
+#
+# Edges go into a ring buffer with record_edge() (or poll(), which reads an
+# input and records any change), and process() drains the buffer, sorts each
+# mark and space into a dot/dash or element/character/word gap, and returns
+# any characters completed since the last call. Timestamps are 32-bit
+# microsecond counts, so the receiver can be driven from recorded edges on
+# a host as easily as from a pin.
+#
+# After a reset() the first CALIBRATION_MARKS marks are held back and the
+# dot length is estimated from them (see _calibrate()) before they're
+# decoded, so a sender at any speed decodes from the first character. The
+# estimate then follows the sender as it drifts, by up to about a third
+# either way per element.
+#----------------------------------------------------------------------------
+class MorseReceiver:
+    def __init__(self, wpm=20, buffer_size=64, active_low=False,
+                 min_mark_us=5000):
+        self.edge_times = array.array("L", [0] * buffer_size)
+        self.edge_levels = bytearray(buffer_size)
+        # Edges held back until the speed has been estimated
+        self.calibration_times = array.array("L", [0] * (4 * CALIBRATION_MARKS))
+        self.calibration_levels = bytearray(4 * CALIBRATION_MARKS)
+        self.head = 0
+        self.tail = 0
+        self.dropped_edges = 0
+        self.active_low = active_low
+        self.min_mark_us = min_mark_us
+        self.dot_us = NS_PER_DOT_AT_1_WPM // 1000 // wpm
+        self.reset()
+
+    # Forget any partly received character and start listening afresh.
+    def reset(self):
+        self.head = self.tail
+        self.keyed = False
+        self.in_mark = False
+        self.space_start = now_us()
+        self.mark_start = self.space_start
+        self.code = 1
+        # 0 = within a character, 1 = character finished, 2 = word finished
+        self.gap_state = 2
+        self.text = ""
+        self.calibrating = True
+        self.calibration_count = 0
+        self.calibration_marks = 0
+
+    # The sender's speed, as currently estimated.
+    @property
+    def wpm(self):
+        return NS_PER_DOT_AT_1_WPM // 1000 // self.dot_us
+
+    # Record a key edge. This only writes to the ring buffer, so it's cheap
+    # enough to call from a tight polling loop.
+    def record_edge(self, timestamp, keyed):
+        next_head = (self.head + 1) % len(self.edge_times)
+        if next_head == self.tail:
+            self.dropped_edges += 1
+            return
+        self.edge_times[self.head] = timestamp & 0xFFFFFFFF
+        self.edge_levels[self.head] = keyed
+        self.head = next_head
+
+    # Read an input with a boolean .value and record an edge if it changed.
+    # Returns the (active-high) key state.
+    def poll(self, key_input):
+        keyed = bool(key_input.value) != self.active_low
+        if keyed != self.keyed:
+            self.keyed = keyed
+            self.record_edge(now_us(), keyed)
+        return keyed
+
+    # Decode any buffered edges and return the characters completed since
+    # the last call. Passing the current time lets a trailing character or
+    # word space complete without waiting for the next key-down.
+    def process(self, timestamp=None):
+        edge_times = self.edge_times
+        edge_levels = self.edge_levels
+        while self.tail != self.head:
+            self._edge(edge_times[self.tail], edge_levels[self.tail])
+            self.tail = (self.tail + 1) % len(edge_times)
+        if timestamp is None:
+            timestamp = now_us()
+        if self.calibrating:
+            self._calibration_timeout(timestamp)
+        if not self.calibrating and not self.in_mark:
+            self._space((timestamp - self.space_start) & 0xFFFFFFFF)
+        text = self.text
+        self.text = ""
+        return text
+
+    # Decode a complete list of (timestamp, keyed) edges, e.g. a recording,
+    # and return the text. The final character is flushed.
+    def feed(self, edges):
+        text = ""
+        timestamp = 0
+        for timestamp, keyed in edges:
+            self.record_edge(timestamp, keyed)
+            text += self.process(timestamp)
+        if self.calibrating:
+            self._calibrate()
+        return text + self.process(timestamp + WORD_GAP_UNITS * self.dot_us)
+
+    def _edge(self, timestamp, keyed):
+        if self.calibrating:
+            self._calibration_edge(timestamp, keyed)
+        else:
+            self._decode_edge(timestamp, keyed)
+
+    # Hold an edge back until there are enough marks to estimate the speed
+    def _calibration_edge(self, timestamp, keyed):
+        n = self.calibration_count
+        if n == 0 and not keyed:
+            return
+        if n and keyed == self.calibration_levels[n - 1]:
+            return
+        self.calibration_times[n] = timestamp
+        self.calibration_levels[n] = keyed
+        self.calibration_count = n + 1
+        if not keyed and (timestamp - self.calibration_times[n - 1]) & 0xFFFFFFFF >= self.min_mark_us:
+            self.calibration_marks += 1
+        if self.calibration_marks >= CALIBRATION_MARKS or \
+           self.calibration_count == len(self.calibration_times):
+            self._calibrate()
+
+    # A short message shouldn't wait forever for more marks: once the key
+    # has been up for a word gap's worth of the shortest mark, go with what
+    # there is
+    def _calibration_timeout(self, timestamp):
+        n = self.calibration_count
+        if self.calibration_marks == 0 or self.calibration_levels[n - 1]:
+            return
+        shortest = 0xFFFFFFFF
+        for i in range(1, n, 2):
+            mark = (self.calibration_times[i] - self.calibration_times[i - 1]) & 0xFFFFFFFF
+            if self.min_mark_us <= mark < shortest:
+                shortest = mark
+        if (timestamp - self.calibration_times[n - 1]) & 0xFFFFFFFF > WORD_GAP_UNITS * shortest:
+            self._calibrate()
+
+    #------------------------------------------------------------------------
+    # Estimate the dot length from the held-back marks, then decode them.
+    #
+    # If the longest mark is at least twice the shortest, there are dots and
+    # dashes: marks are split at the geometric mean of the two and the dot
+    # length is their total length over their total units. If they're all
+    # alike, the gaps between them decide: element gaps are one unit, so
+    # marks at least twice the shortest gap are dashes, and otherwise dots.
+    # A single mark can only be compared with the previous estimate.
+    #------------------------------------------------------------------------
+    def _calibrate(self):
+        times = self.calibration_times
+        count = self.calibration_count
+        self.calibrating = False
+        marks = []
+        gaps = []
+        last_end = None
+        for i in range(1, count, 2):
+            mark = (times[i] - times[i - 1]) & 0xFFFFFFFF
+            if mark < self.min_mark_us:
+                continue
+            if last_end is not None:
+                gaps.append((times[i - 1] - last_end) & 0xFFFFFFFF)
+            marks.append(mark)
+            last_end = times[i]
+        if marks:
+            shortest = min(marks)
+            longest = max(marks)
+            if longest >= 2 * shortest:
+                units = 0
+                for mark in marks:
+                    units += DASH_UNITS if mark * mark > shortest * longest else DOT_UNITS
+            elif gaps:
+                units = len(marks) * (DASH_UNITS if shortest >= 2 * min(gaps) else DOT_UNITS)
+            else:
+                units = DASH_UNITS if 4 * shortest > 7 * self.dot_us else DOT_UNITS
+            self.dot_us = max(1, sum(marks) // units)
+        for i in range(count):
+            self._decode_edge(times[i], self.calibration_levels[i])
+
+    def _decode_edge(self, timestamp, keyed):
+        if keyed:
+            if not self.in_mark:
+                self._space((timestamp - self.space_start) & 0xFFFFFFFF)
+                self.mark_start = timestamp
+                self.in_mark = True
+            return
+        if not self.in_mark:
+            return
+        self.in_mark = False
+        duration = (timestamp - self.mark_start) & 0xFFFFFFFF
+        if duration < self.min_mark_us:
+            # A glitch; carry on timing the space it interrupted
+            return
+        if duration > 2 * self.dot_us:
+            self.code = (self.code << 1) | 1
+            sample = duration // DASH_UNITS
+        else:
+            self.code = self.code << 1
+            sample = duration
+        # Limit how far one sloppy element can move the estimate
+        if sample > 2 * self.dot_us:
+            sample = 2 * self.dot_us
+        elif sample < self.dot_us // 2:
+            sample = self.dot_us // 2
+        self.dot_us += (sample - self.dot_us) // 4
+        if self.code > 0xFF:
+            # Longer than anything in the table; keep it unmatchable
+            self.code = 0x100
+        self.space_start = timestamp
+        self.gap_state = 0
+
+    def _space(self, duration):
+        if self.gap_state == 0 and duration > 2 * self.dot_us:
+            self.text += decode_code(self.code)
+            self.code = 1
+            self.gap_state = 1
+        if self.gap_state == 1 and duration > 5 * self.dot_us:
+            self.text += ' '
+            self.gap_state = 2
+
+#----------------------------------------------------------------------------
+# Expand a schedule into the (timestamp, keyed) edges that keying it at the
+# given speed would produce. Handy for exercising MorseReceiver on a host.
+#----------------------------------------------------------------------------
+def schedule_edges(schedule, wpm, start=0):
+    dot_us = NS_PER_DOT_AT_1_WPM // 1000 // wpm
+    edges = []
+    timestamp = start
+    keyed = True
+    for units in schedule:
+        edges.append((timestamp, keyed))
+        timestamp += units * dot_us
+        keyed = not keyed
+    return edges
+
+#----------------------------------------------------------------------------
+# Number of samples render_sidetone() produces for a schedule.
+#----------------------------------------------------------------------------
+def sidetone_length(schedule, wpm, sample_rate=SIDETONE_SAMPLE_RATE):
+    return sum(schedule) * (sample_rate * 60 // (50 * wpm))
+
+#----------------------------------------------------------------------------
+# Render a whole schedule into one buffer of audio: a sine sidetone while the
+# key is down and silence while it's up, with raised-cosine attack and decay
+# ramps on every element. Played with audioio.RawSample (or saved as a .wav
+# and played with audioio.WaveFile), the DAC does all the timing.
+#----------------------------------------------------------------------------
+def render_sidetone(schedule, wpm, sample_rate=SIDETONE_SAMPLE_RATE,
+                    tone_hz=SIDETONE_HZ, volume=SIDETONE_VOLUME,
+                    ramp_ms=SIDETONE_RAMP_MS, typecode="B"):
+    silence, peak = SAMPLE_FORMATS[typecode]
+    dot_samples = sample_rate * 60 // (50 * wpm)
+    samples = array.array(typecode, bytes(sidetone_length(schedule, wpm, sample_rate) *
+                                          array.array(typecode).itemsize))
+
+    # One cycle of the tone, scaled for volume, indexed by the top 8 bits of
+    # a 16-bit phase accumulator
+    amplitude = int(peak * volume)
+    cycle = array.array("h", [int(math.sin(2 * math.pi * i / 256) * amplitude)
+                              for i in range(256)])
+    phase_step = (tone_hz << 16) // sample_rate
+
+    # Envelope for the attack ramp (in reverse for the decay), in Q15
+    ramp = max(1, sample_rate * ramp_ms // 1000)
+    envelope = array.array("H", [int((1 - math.cos(math.pi * i / ramp)) * 16384)
+                                 for i in range(ramp)])
+
+    pos = 0
+    keyed = True
+    for units in schedule:
+        count = units * dot_samples
+        if keyed:
+            ramp_len = min(ramp, count // 2)
+            phase = 0
+            for i in range(count):
+                value = cycle[phase >> 8]
+                if i < ramp_len:
+                    value = (value * envelope[i]) >> 15
+                elif i >= count - ramp_len:
+                    value = (value * envelope[count - 1 - i]) >> 15
+                samples[pos + i] = silence + value
+                phase = (phase + phase_step) & 0xFFFF
+        else:
+            for i in range(pos, pos + count):
+                samples[i] = silence
+        pos += count
+        keyed = not keyed
+    return samples
+
+#----------------------------------------------------------------------------
+# Sidetone for MorseKeyer that renders just one dot and one dash up front
+# (a couple of KB at 20 wpm, however long the messages are) and starts the
+# matching one on audio_out each time the key goes down, so the tone follows
+# the keyer's own timing.
+#----------------------------------------------------------------------------
+class ElementSidetone:
+    def __init__(self, audio_out, wpm, tone_hz=SIDETONE_HZ,
+                 sample_rate=SIDETONE_SAMPLE_RATE, volume=SIDETONE_VOLUME):
+        if audioio is None:
+            raise RuntimeError("audioio isn't available here")
+        self.audio_out = audio_out
+        self.samples = {}
+        for units in (DOT_UNITS, DASH_UNITS):
+            buffer = render_sidetone([units], wpm, sample_rate, tone_hz, volume)
+            self.samples[units] = audioio.RawSample(buffer, sample_rate=sample_rate)
+
+    # Sound an element units long
+    def play(self, units):
+        sample = self.samples.get(units)
+        if sample is not None:
+            self.audio_out.play(sample)
+
+#----------------------------------------------------------------------------
+# File name for a pre-rendered message, so cp_morse.py can find what
+# morse_to_wav.py wrote. Messages are numbered from 1.
+#----------------------------------------------------------------------------
+def sidetone_filename(number, wpm, tone_hz=SIDETONE_HZ):
+    return "morse_%d_%dwpm_%dhz.wav" % (number, wpm, tone_hz)
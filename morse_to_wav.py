@@ -0,0 +1,76 @@
+##############################################################################
+#              Pre-render cp_morse.py messages to .wav files                 #
+##############################################################################
+# Runs on a host computer, not the board. Reads the messages and speed from #
+# cp_morse.py (or takes messages on the command line), renders each one to #
+# an 8-bit mono .wav sidetone in a single pass, and writes them where       #
+# cp_morse.py expects to find them. Copy the files to the CIRCUITPY drive   #
+# and cp_morse.py will stream them from flash with audioio.WaveFile instead #
+# of rendering into RAM.                                                     #
+#                                                                            #
+#   python3 morse_to_wav.py [--wpm 20] [--tone 600] [--out DIR] [message...] #
+##############################################################################
+
+import argparse
+import ast
+import os
+import wave
+
+import morse
+
+#----------------------------------------------------------------------------
+# Pull the messages and morse_wpm setting out of cp_morse.py without running
+# it (it needs the board hardware).
+#----------------------------------------------------------------------------
+def read_config(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    messages = []
+    wpm = 20
+    for node in tree.body:
+        if (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Attribute)
+                and node.value.func.attr == "append"
+                and isinstance(node.value.func.value, ast.Name)
+                and node.value.func.value.id == "messages"):
+            messages.append(ast.literal_eval(node.value.args[0]))
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id == "morse_wpm"):
+            wpm = ast.literal_eval(node.value)
+    return messages, wpm
+
+def write_wav(path, samples, sample_rate):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(samples.itemsize)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Render Morse messages to .wav sidetones")
+    parser.add_argument("messages", nargs="*",
+                        help="messages to render (default: the ones in cp_morse.py)")
+    parser.add_argument("--config", default=os.path.join(here, "cp_morse.py"))
+    parser.add_argument("--wpm", type=int, help="speed (default: morse_wpm from cp_morse.py)")
+    parser.add_argument("--tone", type=int, default=morse.SIDETONE_HZ)
+    parser.add_argument("--rate", type=int, default=morse.SIDETONE_SAMPLE_RATE)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+
+    messages, wpm = read_config(args.config)
+    if args.messages:
+        messages = args.messages
+    if args.wpm:
+        wpm = args.wpm
+
+    for number, message in enumerate(messages, 1):
+        schedule = morse.compile_schedule(message)
+        samples = morse.render_sidetone(schedule, wpm, args.rate, args.tone)
+        path = os.path.join(args.out, morse.sidetone_filename(number, wpm, args.tone))
+        write_wav(path, samples, args.rate)
+        print("%s: %0.1f s, %d bytes" % (path, len(samples) / args.rate, len(samples)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+##############################################################################
+#                 Equal-Temperament Note Tables                              #
+##############################################################################
+# Builds a run of notes from MIDI note numbers (60 is middle C, 69 is A4)  #
+# and the frequency of A4, instead of typing frequencies in by hand. Each   #
+# note gets one entry (enharmonics like C#/Db aren't repeated), spelt the  #
+# usual way: C C# D Eb E F F# G Ab A Bb B.                                   #
+#                                                                            #
+# Everything is kept in packed arrays: frequency in 1/256ths of a Hz, and   #
+# the NeoPixel and colour (natural, sharp or flat) that show it. Looking a  #
+# note up by index only reads the arrays, so it doesn't allocate.           #
+##############################################################################
+
+import array
+
+# Frequencies are stored in 1/256ths of a Hz
+FREQ_BITS = 8
+
+# Colour index of each note
+NATURAL = 0
+SHARP = 1
+FLAT = 2
+
+LETTERS = "CDEFGAB"
+
+# Each semitone from C as (letter index, colour)
+SPELLING = (
+    (0, NATURAL), (0, SHARP), (1, NATURAL), (2, FLAT), (2, NATURAL), (3, NATURAL),
+    (3, SHARP), (4, NATURAL), (5, FLAT), (5, NATURAL), (6, FLAT), (6, NATURAL),
+)
+
+ACCIDENTALS = ("", "#", "b")
+
+# The Circuit Playground Express pixel that shows each letter, C to B
+LETTER_PIXELS = (1, 2, 3, 4, 5, 9, 0)
+
+#----------------------------------------------------------------------------
+# The frequency in Hz of a MIDI note number
+#----------------------------------------------------------------------------
+def midi_to_hz(note, a4=440.0):
+    return a4 * 2 ** ((note - 69) / 12)
+
+#----------------------------------------------------------------------------
+# A note's name and octave, like "C#4"
+#----------------------------------------------------------------------------
+def note_name(note):
+    letter, color = SPELLING[note % 12]
+    return "%s%s%d" % (LETTERS[letter], ACCIDENTALS[color], note // 12 - 1)
+
+class NoteTable:
+    def __init__(self, lowest, count, a4=440.0, letter_pixels=LETTER_PIXELS):
+        self.lowest = lowest
+        self.count = count
+        self.a4 = a4
+        self.letter_pixels = letter_pixels
+        self.freqs = array.array("L", [0] * count)
+        self.pixels = bytearray(count)
+        self.colors = bytearray(count)
+        for i in range(count):
+            hz = midi_to_hz(lowest + i, a4)
+            self.freqs[i] = int(hz * (1 << FREQ_BITS) + 0.5)
+            letter, color = SPELLING[(lowest + i) % 12]
+            self.pixels[i] = letter_pixels[letter]
+            self.colors[i] = color
+
+    #------------------------------------------------------------------------
+    # The table covering a number of octaves starting at a given note, e.g.
+    # NoteTable.octaves(56, 1) for Ab3 up to and including Ab4.
+    #------------------------------------------------------------------------
+    @classmethod
+    def octaves(cls, lowest, octaves=1, **options):
+        return cls(lowest, 12 * octaves + 1, **options)
+
+    # The same run of notes, some octaves higher (or lower, if negative)
+    def shifted(self, octaves):
+        return NoteTable(self.lowest + 12 * octaves, self.count, self.a4,
+                         self.letter_pixels)
+
+    def __len__(self):
+        return self.count
+
+    def midi(self, i):
+        return self.lowest + i
+
+    # Frequency in Hz
+    def frequency(self, i):
+        return self.freqs[i] / (1 << FREQ_BITS)
+
+    # Frequency in 1/256ths of a Hz
+    def frequency_fixed(self, i):
+        return self.freqs[i]
+
+    def pixel(self, i):
+        return self.pixels[i]
+
+    # NATURAL, SHARP or FLAT
+    def color(self, i):
+        return self.colors[i]
+
+    def name(self, i):
+        return note_name(self.lowest + i)
+
+    # All the frequencies in Hz, as a list (e.g. for PitchDetector)
+    def frequencies(self):
+        return [self.frequency(i) for i in range(self.count)]
+
+    # Index of the note closest to a frequency in Hz
+    def nearest(self, hz):
+        target = int(hz * (1 << FREQ_BITS))
+        freqs = self.freqs
+        best = 0
+        for i in range(1, self.count):
+            # Notes are evenly spaced in pitch, so compare ratios: the nearer
+            # note is the one whose ratio to the target is closer to 1
+            if freqs[i] * freqs[i - 1] <= target * target:
+                best = i
+        return best
@@ -20,17 +20,46 @@
 import board
 import neopixel
 import time
+from pixel_buffer import DirtyPixels
+from color_fade import ColorFade
 
 pixel_pin = board.NEOPIXEL
 num_pixels = 1
 
-pixels = neopixel.NeoPixel(pixel_pin, num_pixels, brightness=0.2, auto_write=False)
+pixels = DirtyPixels(neopixel.NeoPixel(pixel_pin, num_pixels, brightness=0.2, auto_write=False))
+
+# Colours to fade between, and how many seconds to take fading from each one
+# to the next. After the last one it fades back to the first and repeats.
+keyframes = [
+    ((255, 0, 0), 3),
+    ((255, 255, 0), 3),
+    ((0, 255, 0), 3),
+    ((0, 255, 255), 3),
+    ((0, 0, 255), 3),
+    ((255, 0, 255), 3),
+]
+
+# "hsv" sweeps round the colour wheel; "linear" blends the light directly
+fade_mode = "hsv"
+
+# How many times a second to update the colour
+frames_per_second = 50
+
+fade = ColorFade(keyframes, fade_mode)
+frame_ns = 1000000000 // frames_per_second
+start = next_frame = time.monotonic_ns()
 
 while True:
-    for pixel_red in range(255, 0, -10):
-        for pixel_green in range(0, 255, 10):
-            for pixel_blue in range(0, 255, 10):        
-                pixels[0] = (pixel_red, pixel_green, pixel_blue)
-                pixels.show()
-                time.sleep(0.1)
-    
\ No newline at end of file
+    color = fade.color_at((next_frame - start) // 1000000)
+    for i in range(num_pixels):
+        pixels[i] = color
+    pixels.show()
+
+    next_frame += frame_ns
+    delay = next_frame - time.monotonic_ns()
+    if delay > 0:
+        time.sleep(delay / 1000000000)
+    else:
+        next_frame = time.monotonic_ns()
+
+    
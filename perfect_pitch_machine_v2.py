@@ -35,8 +35,6 @@
 #import neccesarry libraries
 ##############################################################################
 
-import array
-import math
 import time
 
 import board
@@ -45,6 +43,12 @@ from   digitalio import DigitalInOut, Direction, Pull
 import digitalio
 import audioio
 import neopixel
+from pixel_buffer import DirtyPixels
+from audio_dsp import LoudnessTracker, PitchDetector
+from wave_cache import WaveCache
+from mic_capture import MicCapture
+from input_events import InputEvents, PRESS, RELEASE, REPEAT
+from note_table import NoteTable
 
 ##############################################################################
 # Global Variables
@@ -53,72 +57,93 @@ import neopixel
 # Threshhold for loudness of sound needed to trigger current pitch
 blowThresshold = 5000
 
-# debounce time, how long the debounce time should be to prevent multiple button triggers in one press
-debounceTime = 0.2
+# Once triggered, the loudness has to drop below this before the note stops
+# retriggering, so breath noise hovering around blowThresshold doesn't flicker
+releaseThresshold = 3500
+
+# debounce time, how long (in seconds) a button or switch has to hold steady before a press or release counts
+debounceTime = 0.02
+
+# hold a button down for repeatDelay seconds and it keeps moving the pitch every repeatTime seconds
+repeatDelay = 0.5
+repeatTime = 0.15
 
 # pitch length, how many seconds we want the note to sound when triggered
 pitchLength = 1
 
+# how much memory (in bytes) to keep note waveforms in, so they don't have to be
+# rebuilt every time a note plays. Each note takes 150-700 bytes.
+waveCacheBytes = 4096
+
+# print how long it takes from a breath being detected to the note sounding
+showLatency = False
+
 # neopixel brightness
 pixelBrightness = 0.1
 
+# tuner mode, switched on and off by pressing both buttons together. Instead of
+# playing notes, the machine listens and lights up the nearest note, with a
+# meter showing whether it's flat, in tune or sharp
+tuner_mode = False
+
+# how many cents off a note can be and still count as in tune
+inTuneCents = 10
+
+# the NeoPixels used for the tuner's flat / in tune / sharp meter (no note uses them)
+TUNER_PIXELS = (6, 7, 8)
+
 # the number of samples taken per second in Hertz
 SAMPLERATE = 8000
 
 # how many samples we're collecting
 NUM_SAMPLES = 160
 
+# how many of the most recent samples the loudness is measured over (30 ms
+# at 16 kHz), so a single noisy block isn't enough to trigger a note
+LOUDNESS_WINDOW = 3 * NUM_SAMPLES
+
 # the frequency of the note being played
 FREQUENCY = 0
 
 ##############################################################################
-# set up note values in Hz. Find frequency values at
-# <https://pages.mtu.edu/~suits/notefreqs.html>.
-#
-# Unexpected results may occurif pitch_frequencies_low, pitch_frequencies_high,
-# and led_color_data are not all the same length.
+# set up the notes. They're worked out from MIDI note numbers (60 is middle C,
+# 69 is A4) and the frequency of A4, and each NeoPixel shows a letter of the
+# scale: green when it's natural, red for sharps and blue for flats.
 ##############################################################################
 
-# Ab3, A3, As3, BB3, B3, C4. C4. Db4, D4, Ds4. Eb4. E4. F4. Fs4. Gb4, G4, Gs4
-pitch_frequencies_low  = [208, 223, 233, 233, 247, 262, 277, 277, 294,
-                          311, 311, 330, 349, 370, 370, 392, 415]
+# the frequency of A4 in Hz, which all the other notes are tuned to
+A4_FREQUENCY = 440
+
+# the lowest note of each range the slide switch selects. 56 is Ab3, so the low
+# range runs from Ab3 to Ab4 and the high range from Ab4 to Ab5. Any MIDI notes
+# will do, for ranges in other octaves.
+range_lowest_notes = [56, 68]
 
-# Ab4, A4, As4, BB4, B4, C5. C5. Db5, D5, Ds5. Eb5. E5. F5. Fs5. Gb5, G5, Gs5
-pitch_frequencies_high = [415, 440, 466, 466, 494, 523, 554, 554, 587,
-                          622, 622, 659, 698, 739, 739, 783, 830]
+# how many notes there are in each range (13 is a whole octave, top note included)
+NOTES_PER_RANGE = 13
+
+note_tables = [NoteTable(lowest, NOTES_PER_RANGE, a4=A4_FREQUENCY)
+               for lowest in range_lowest_notes]
 
 # Define constants for the LED colors we want to use
 COLOR_SHARP   = (255, 0, 0)
 COLOR_NATURAL = (0, 255, 0)
 COLOR_FLAT    = (0, 0, 255)
 
-# Which NeoPixel and color to light up for each note. The length of led_color_data
-# should match the length of pitch_frequencies_low and pitch_frequencies_high
-led_color_data = [
-    {"pixel": 9, "color": COLOR_FLAT},
-    {"pixel": 9, "color": COLOR_NATURAL},
-    {"pixel": 9, "color": COLOR_SHARP},
-    {"pixel": 0, "color": COLOR_FLAT},
-    {"pixel": 0, "color": COLOR_NATURAL},
-    {"pixel": 1, "color": COLOR_NATURAL},
-    {"pixel": 1, "color": COLOR_SHARP},
-    {"pixel": 2, "color": COLOR_FLAT},
-    {"pixel": 2, "color": COLOR_NATURAL},
-    {"pixel": 2, "color": COLOR_SHARP},
-    {"pixel": 3, "color": COLOR_FLAT},
-    {"pixel": 3, "color": COLOR_NATURAL},
-    {"pixel": 4, "color": COLOR_NATURAL},
-    {"pixel": 4, "color": COLOR_SHARP},
-    {"pixel": 5, "color": COLOR_FLAT},
-    {"pixel": 5, "color": COLOR_NATURAL},
-    {"pixel": 5, "color": COLOR_SHARP},
-]
+# The color for each of note_table's NATURAL, SHARP and FLAT
+note_colors = (COLOR_NATURAL, COLOR_SHARP, COLOR_FLAT)
 
 # The currently selected note range
 note_range = 0  # 0 = low, 1 = high
 
-# Prepare an array to record the mic samples into
-samples = array.array('H', [0] * NUM_SAMPLES)
+# Keep track of the loudness across blocks of samples
+loudness = LoudnessTracker(window=LOUDNESS_WINDOW, attack=blowThresshold, release=releaseThresshold)
+
+# Pitch detectors for the tuner, one for each note range
+tuners = [PitchDetector(table.frequencies()) for table in note_tables]
+
+# The waveforms for notes that have been played
+waves = WaveCache(max_bytes=waveCacheBytes)
 
 # Create a counter for tracking button presses
 # Declared outside scope of while loop so it doesn't get reset to 0 at the beginnning of every loop!
@@ -128,8 +153,9 @@ counter = 0
 # Set up board IO
 ##############################################################################
 
-# Set up the NeoPixels (brightness can be between 0 and 1)
-pixels = neopixel.NeoPixel(board.NEOPIXEL, 10, brightness= pixelBrightness)
+# Set up the NeoPixels (brightness can be between 0 and 1). The wrapper only
+# pushes to the strip when the colours have actually changed.
+pixels = DirtyPixels(neopixel.NeoPixel(board.NEOPIXEL, 10, brightness= pixelBrightness, auto_write=False))
 
 # Program the two buttons on the board to be able to move up and down pitches
 buttonD = DigitalInOut(board.BUTTON_A) # button A is the down button
@@ -150,20 +176,76 @@ range_switch = DigitalInOut(board.D7)
 range_switch.direction = Direction.INPUT
 range_switch.pull = Pull.UP
 
+# Turn the buttons and switch into press/release events, without ever waiting on them
+debounce_ms = int(debounceTime * 1000)
+events = InputEvents()
+events.add_input("down", buttonD, settle_ms=debounce_ms,
+                 repeat_delay_ms=int(repeatDelay * 1000), repeat_ms=int(repeatTime * 1000))
+events.add_input("up", buttonU, settle_ms=debounce_ms,
+                 repeat_delay_ms=int(repeatDelay * 1000), repeat_ms=int(repeatTime * 1000))
+events.add_input("range", range_switch, settle_ms=debounce_ms)
+
+# Start in the range the switch is set to
+if events.pressed("range"):
+    note_range = 1
+
 # Set up a PWM imput for sampling the microphone
 mic = audiobusio.PDMIn(board.MICROPHONE_CLOCK, board.MICROPHONE_DATA, sample_rate=16000, bit_depth=16)
 
+# Record the mic in blocks of NUM_SAMPLES, into two buffers that take turns, and
+# keep recording while we wait for buttons to debounce and notes to finish
+capture = MicCapture(mic, block_size=NUM_SAMPLES, buffers=2, sample_rate=16000)
+
+# Set up the speaker output once, rather than every time a note plays
+audio = audioio.AudioOut(board.SPEAKER)
+
+##############################################################################
+# Show the tuner's reading: the nearest note's pixel and colour, and how far
+# off it is on the meter (brighter the further off it is)
+##############################################################################
+
+def show_tuning(reading, notes):
+    pixels.fill((0, 0, 0))
+    if reading is None:  # too quiet to tell
+        return
+    frequency, cents = reading
+    note = notes.nearest(frequency)
+    pixels[notes.pixel(note)] = note_colors[notes.color(note)]
+    level = min(255, 64 + int(abs(cents)) * 4)
+    if cents < -inTuneCents:
+        pixels[TUNER_PIXELS[0]] = (0, 0, level)
+    elif cents > inTuneCents:
+        pixels[TUNER_PIXELS[2]] = (level, 0, 0)
+    else:
+        pixels[TUNER_PIXELS[1]] = (0, 255, 0)
+
 ##############################################################################
-# Helper math functions for working with the microphone
+# Called with each block of samples from the mic. In tuner mode it goes to the
+# pitch detector, which needs a few blocks before it has enough to analyze;
+# otherwise to the loudness tracker that listens for breath.
 ##############################################################################
 
-# Remove DC bias before computing RMS.
-def normalized_rms(values):
-    minbuf = int(mean(values))
-    return math.sqrt(sum(float((sample - minbuf) * (sample - minbuf)) for sample in values) / len(values))
+def listen(block):
+    if tuner_mode:
+        if tuners[note_range].add_samples(block):
+            show_tuning(tuners[note_range].analyze(), note_tables[note_range])
+    else:
+        loudness.update_block(block)
 
-def mean(values):
-    return (sum(values) / len(values))
+capture.add_consumer(listen)
+
+# Check the buttons with every block too, so presses are caught even while a note plays
+def poll_inputs(block):
+    events.update()
+
+capture.add_consumer(poll_inputs)
+
+# Set when both buttons are pressed together, until they're both let go
+both_buttons = False
+
+# The note before the last button press, so a press that turns out to be half of
+# pressing both buttons can be undone
+previous_counter = counter
 
 ##############################################################################
 #Taking and analyzing input from the microphone (The hard part...)
@@ -171,49 +253,58 @@ def mean(values):
 ##############################################################################
 
 while True:
-    if range_switch.value == True:
-        note_range = 1
-    else:
-        note_range = 0
-
-    #We begin regcording samples from the board's mic
-    mic.record(samples, len(samples))
-    magnitude = normalized_rms(samples)
-
-    if buttonU.value == True:  # If Up button is pushed then move up a pitch
-        pixels.fill((0, 0, 0)) #turn all neopixels off
-        counter += 1 #increase the counter by 1
-        time.sleep(debounceTime) #to ensure button isn't triggered multiple times in one press we must "debounce" the button by creating a short delay after pressing it
-    elif buttonD.value == True: #Do the same for the down button
-        pixels.fill((0, 0, 0)) # If Down button is pushed then move down a pitch
-        counter -= 1 #decrease counter by one
-        time.sleep(debounceTime) #debounce button
-
-    if counter > (len(pitch_frequencies_low) - 1):
-        counter = 0
-    elif counter < 0:
-        counter = (len(pitch_frequencies_low) - 1)
-
-    if note_range == 0:
-        FREQUENCY = pitch_frequencies_low[counter]
-    else:
-        FREQUENCY = pitch_frequencies_high[counter]
-
-    pixels[led_color_data[counter]["pixel"]] = led_color_data[counter]["color"]
+    #We begin regcording samples from the board's mic, and pass them on to listen() and poll_inputs()
+    capture.pump()
+
+    event = events.get()
+    while event is not None:
+        name, kind, when = event
+        if name == "range":  # The slide switch selects the note range
+            note_range = 1 if kind == PRESS else 0
+            tuners[note_range].reset()
+        elif both_buttons:  # Ignore the buttons until both have been let go
+            if kind == RELEASE and not events.pressed("up") and not events.pressed("down"):
+                both_buttons = False
+        elif kind == PRESS and events.pressed("up") and events.pressed("down"):
+            # Both buttons switch tuner mode on and off, and put back the note
+            # the first of them moved to
+            both_buttons = True
+            counter = previous_counter
+            tuner_mode = not tuner_mode
+            pixels.fill((0, 0, 0))
+            tuners[note_range].reset()
+            loudness.clear()
+        elif kind == PRESS or kind == REPEAT:
+            if kind == PRESS:
+                previous_counter = counter
+            pixels.fill((0, 0, 0)) #turn all neopixels off
+            if name == "up":  # If Up button is pushed then move up a pitch
+                counter += 1
+            else:  # If Down button is pushed then move down a pitch
+                counter -= 1
+            counter %= NOTES_PER_RANGE  # wrap around at either end
+        event = events.get()
+
+    notes = note_tables[note_range]
+    FREQUENCY = notes.frequency(counter)
+
+    if tuner_mode:
+        pixels.show()  # listen() has already drawn the tuner's reading
+        continue
+
+    pixels[notes.pixel(counter)] = note_colors[notes.color(counter)]
 
     # Any time we get a sound with a magnitude greater than the value of blowThresshold, trigger the
-    # current pitch (can be changed at top where it is defined)
-    if magnitude > blowThresshold:
-        length = SAMPLERATE // FREQUENCY #create length of sample
-        sine_wave = array.array("H", [0] * length) # create an array for a sine wave
-        for i in range(length):
-            sine_wave[i] = int(math.sin(math.pi * 2 * i / 18) * (2 ** 15) + 2 ** 15) # fill the array with values
-
-        audio = audioio.AudioOut(board.SPEAKER)
-        sine_wave_sample = audioio.RawSample(sine_wave)
-        audio.play(sine_wave_sample, loop=True)  # Play the sample
-        time.sleep(pitchLength)  # Play for length of pitchLength
+    # current pitch (can be changed at top where it is defined), and keep retriggering it until the
+    # sound drops below releaseThresshold. After each note the tracker starts its window again, since
+    # the mic heard the note itself, and only the breath heard since decides whether to retrigger.
+    if loudness.active:
+        triggered = time.monotonic_ns()
+        audio.play(waves.get(FREQUENCY, SAMPLERATE), loop=True)  # Play the note's waveform
+        if showLatency:
+            print("%d Hz: %d us from breath to sound" % (FREQUENCY, (time.monotonic_ns() - triggered) // 1000))
+        capture.wait(pitchLength)  # Play for length of pitchLength, still listening
         audio.stop()  # we tell the board to stop
-        audio.deinit()
+        loudness.flush()  # the mic heard the note itself, so only listen to what comes next
 
     pixels.show() #show the desired neopixel light up on board
\ No newline at end of file
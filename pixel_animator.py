@@ -0,0 +1,296 @@
+##############################################################################
+#              Framebuffer NeoPixel Animation Engine                         #
+##############################################################################
+# Effects draw each frame into a preallocated bytearray, already in the     #
+# strip's wire order and with brightness applied, and the whole frame goes  #
+# out in a single neopixel_write() call. Effects are drawn from the time    #
+# since they started rather than a frame count, so when a frame runs long  #
+# the animator skips ahead (counting the dropped frames) and the effect     #
+# keeps to its intended speed.                                               #
+#                                                                            #
+# play() runs an effect to the end. To keep doing other things while one    #
+# runs, begin() it and call update() from the main loop instead; begin()    #
+# or stop() cut the current effect short.                                   #
+##############################################################################
+
+import time
+
+import digitalio
+import neopixel_write
+
+from color_lut import make_wheel
+
+class Animator:
+    def __init__(self, pin, num_pixels, brightness=1.0, fps=50, order="GRB"):
+        self.pin = digitalio.DigitalInOut(pin)
+        self.pin.direction = digitalio.Direction.OUTPUT
+        self.num_pixels = num_pixels
+        self.buf = bytearray(3 * num_pixels)
+        # What's currently on the strip, so unchanged frames aren't resent
+        self.sent = bytearray(3 * num_pixels)
+        self.order = (order.index("R"), order.index("G"), order.index("B"))
+        self.scale = int(brightness * 256)
+        self.wheel = make_wheel(brightness=brightness, order=order)
+        self.frame_ns = 1000000000 // fps
+        self.fps = fps
+        self.black = self.color((0, 0, 0))
+        # The effect started with begin(), if it's still running
+        self.effect = None
+        self.effect_started_ns = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = 0
+        self.pushes_performed = 0
+        self.pushes_skipped = 0
+        self.dropped_frames = 0
+        self.busy_ns = 0
+        self.worst_frame_ns = 0
+        self.elapsed_ns = 0
+
+    # Convert an (r, g, b) tuple into 3 bytes in wire order, with brightness
+    # applied. Effects do this once up front and reuse the result.
+    def color(self, rgb):
+        wire = bytearray(3)
+        for channel in range(3):
+            wire[self.order[channel]] = (rgb[channel] * self.scale) >> 8
+        return wire
+
+    # Set pixels start..end-1 to a colour from color().
+    def fill(self, wire, start=0, end=None):
+        if end is None:
+            end = self.num_pixels
+        buf = self.buf
+        c0 = wire[0]
+        c1 = wire[1]
+        c2 = wire[2]
+        for i in range(3 * start, 3 * end, 3):
+            buf[i] = c0
+            buf[i + 1] = c1
+            buf[i + 2] = c2
+
+    # Send the frame, unless it's identical to what's already on the strip.
+    # Returns True if it was sent.
+    def show(self, force=False):
+        if self.buf == self.sent and not force:
+            self.pushes_skipped += 1
+            return False
+        neopixel_write.neopixel_write(self.pin, self.buf)
+        self.sent[:] = self.buf
+        self.pushes_performed += 1
+        return True
+
+    # Run one effect to completion at the target frame rate.
+    def play(self, effect):
+        effect.start(self)
+        frame_ns = self.frame_ns
+        duration_ns = effect.duration_ms * 1000000
+        start = time.monotonic_ns()
+        frame = 0
+        while frame * frame_ns < duration_ns:
+            began = time.monotonic_ns()
+            effect.render(self, frame * frame_ns // 1000000)
+            self.show()
+            finished = time.monotonic_ns()
+
+            busy = finished - began
+            self.busy_ns += busy
+            if busy > self.worst_frame_ns:
+                self.worst_frame_ns = busy
+            self.frames += 1
+
+            # Wait for the next frame's slot, or if we've already missed it,
+            # skip straight to the frame for the current time.
+            frame += 1
+            due = start + frame * frame_ns
+            if finished < due:
+                time.sleep((due - finished) / 1000000000)
+            else:
+                current = (finished - start) // frame_ns
+                if current > frame:
+                    self.dropped_frames += current - frame
+                    frame = current
+        self.elapsed_ns += time.monotonic_ns() - start
+
+    # Start an effect without waiting for it, replacing any that's running
+    def begin(self, effect):
+        effect.start(self)
+        self.effect = effect
+        self.effect_started_ns = time.monotonic_ns()
+        self.update()
+
+    # Cut the running effect short, blanking the strip if clear is set
+    def stop(self, clear=True):
+        if self.effect is None:
+            return
+        self.effect = None
+        if clear:
+            self.fill(self.black)
+            self.show()
+
+    #------------------------------------------------------------------------
+    # Draw and send the begin()'d effect's frame for the current time, if it
+    # has changed. Returns True while the effect is still running.
+    #------------------------------------------------------------------------
+    def update(self):
+        effect = self.effect
+        if effect is None:
+            return False
+        began = time.monotonic_ns()
+        t = (began - self.effect_started_ns) // 1000000
+        if t >= effect.duration_ms:
+            self.effect = None
+            t = effect.duration_ms - 1
+        effect.render(self, t)
+        self.show()
+        busy = time.monotonic_ns() - began
+        self.busy_ns += busy
+        if busy > self.worst_frame_ns:
+            self.worst_frame_ns = busy
+        self.frames += 1
+        return self.effect is not None
+
+    # Frames actually shown per second over everything played so far
+    def measured_fps(self):
+        if self.elapsed_ns <= 0:
+            return 0.0
+        return self.frames * 1000000000 / self.elapsed_ns
+
+    # Fraction of the elapsed time spent drawing and writing frames
+    def load(self):
+        if self.elapsed_ns <= 0:
+            return 0.0
+        return self.busy_ns / self.elapsed_ns
+
+    def print_stats(self, name):
+        print("%s: %0.1f fps (target %d), %d dropped, worst frame %0.1f ms, %d%% busy, %d of %d frames unchanged" %
+              (name, self.measured_fps(), self.fps, self.dropped_frames,
+               self.worst_frame_ns / 1000000, int(self.load() * 100),
+               self.pushes_skipped, self.frames))
+
+##############################################################################
+# Effects
+#
+# Each effect has a name and a duration_ms, a start() method called with the
+# Animator before the first frame, and a render() method that draws the
+# frame for t milliseconds into the effect.
+##############################################################################
+
+CIRCLE_COLORS = [
+    (0x10, 0, 0),       # red
+    (0x10, 0x10, 0),    # yellow
+    (0, 0x10, 0),       # green
+    (0, 0x10, 0x10),    # aqua
+    (0, 0, 0x10),       # blue
+    (0x10, 0, 0x10),    # purple
+    (0, 0, 0),          # black
+]
+
+FLASH_COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)]
+
+#----------------------------------------------------------------------------
+# Light the pixels one at a time in each colour in turn, holding each full
+# circle for a moment.
+#----------------------------------------------------------------------------
+class SimpleCircle:
+    name = "Simple Circle"
+
+    def __init__(self, wait=0.05, hold=1.0, colors=CIRCLE_COLORS):
+        self.step_ms = int(wait * 1000)
+        self.hold_ms = int(hold * 1000)
+        self.colors = colors
+
+    def start(self, animator):
+        self.wire = [animator.color(c) for c in self.colors]
+        self.black = animator.color((0, 0, 0))
+        self.segment_ms = animator.num_pixels * self.step_ms + self.hold_ms
+        self.duration_ms = len(self.colors) * self.segment_ms
+
+    def render(self, animator, t):
+        which = t // self.segment_ms
+        lit = min(animator.num_pixels, (t % self.segment_ms) // self.step_ms + 1)
+        animator.fill(self.wire[which], 0, lit)
+        if which > 0:
+            animator.fill(self.wire[which - 1], lit)
+        else:
+            animator.fill(self.black, lit)
+
+#----------------------------------------------------------------------------
+# Flash the whole strip through a list of colours.
+#----------------------------------------------------------------------------
+class Flash:
+    name = "Flash"
+
+    def __init__(self, wait=0.25, colors=FLASH_COLORS):
+        self.step_ms = int(wait * 1000)
+        self.colors = colors
+
+    def start(self, animator):
+        self.wire = [animator.color(c) for c in self.colors]
+        self.duration_ms = len(self.colors) * self.step_ms
+
+    def render(self, animator, t):
+        animator.fill(self.wire[t // self.step_ms])
+
+#----------------------------------------------------------------------------
+# Run the colour wheel along the strip. Rainbow puts neighbouring pixels one
+# wheel position apart and RainbowCycle spreads the whole wheel across the
+# strip; speed is how far the pattern turns per step.
+#----------------------------------------------------------------------------
+class Rainbow:
+    name = "Rainbow"
+
+    def __init__(self, duration=2.55, steps=255, speed=1):
+        self.duration_ms = int(duration * 1000)
+        self.steps = steps
+        self.speed = speed
+
+    def offsets(self, animator):
+        return bytearray(i & 0xFF for i in range(animator.num_pixels))
+
+    def start(self, animator):
+        self.pixel_offsets = self.offsets(animator)
+
+    def render(self, animator, t):
+        shift = (t * self.steps // self.duration_ms) * self.speed
+        buf = animator.buf
+        wheel = animator.wheel
+        offsets = self.pixel_offsets
+        for p in range(animator.num_pixels):
+            i = ((offsets[p] + shift) & 0xFF) * 3
+            o = 3 * p
+            buf[o] = wheel[i]
+            buf[o + 1] = wheel[i + 1]
+            buf[o + 2] = wheel[i + 2]
+
+class RainbowCycle(Rainbow):
+    name = "Rainbow Cycle"
+
+    def __init__(self, duration=2.55, steps=255, speed=10):
+        Rainbow.__init__(self, duration, steps, speed)
+
+    def offsets(self, animator):
+        n = animator.num_pixels
+        return bytearray((i * 256 // n) & 0xFF for i in range(n))
+
+#----------------------------------------------------------------------------
+# Blink the whole strip once in each of a list of colours, on for `on`
+# seconds and then off for `off`.
+#----------------------------------------------------------------------------
+class Blink:
+    name = "Blink"
+
+    def __init__(self, colors, on=0.25, off=0.25):
+        self.colors = colors
+        self.on_ms = int(on * 1000)
+        self.period_ms = self.on_ms + int(off * 1000)
+        self.duration_ms = len(colors) * self.period_ms
+
+    def start(self, animator):
+        self.wire = [animator.color(c) for c in self.colors]
+
+    def render(self, animator, t):
+        if t % self.period_ms < self.on_ms:
+            animator.fill(self.wire[t // self.period_ms])
+        else:
+            animator.fill(animator.black)
@@ -0,0 +1,91 @@
+##############################################################################
+#              NeoPixel Wrapper That Skips Unchanged Frames                  #
+##############################################################################
+# Every NeoPixel show() is a bit-banged transfer that blocks interrupts for #
+# about 30 us per pixel. DirtyPixels tracks the range of pixels written     #
+# since the last push, and on show() compares the frame against a copy of  #
+# what was last pushed, so show() only reaches the strip when the colours  #
+# actually changed (setting a pixel and then setting it back doesn't      #
+# count). The wrapped NeoPixel should be created with auto_write=False.    #
+##############################################################################
+
+# Approximate time to push one RGB pixel at 800 kHz
+PUSH_US_PER_PIXEL = 30
+
+class DirtyPixels:
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.n = len(pixels)
+        self.shadow = bytearray(3 * self.n)
+        self.sent = bytearray(3 * self.n)
+        self.pushes_performed = 0
+        self.pushes_skipped = 0
+        # Start dirty so the first show() always reaches the strip
+        self.dirty_start = 0
+        self.dirty_end = self.n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        i = 3 * index
+        return (self.shadow[i], self.shadow[i + 1], self.shadow[i + 2])
+
+    # Accepts (r, g, b) tuples/lists or 0xRRGGBB ints, like NeoPixel does.
+    def __setitem__(self, index, color):
+        if isinstance(color, int):
+            r = (color >> 16) & 0xFF
+            g = (color >> 8) & 0xFF
+            b = color & 0xFF
+        else:
+            r, g, b = color[0], color[1], color[2]
+        if index < 0:
+            index += self.n
+        i = 3 * index
+        shadow = self.shadow
+        if shadow[i] == r and shadow[i + 1] == g and shadow[i + 2] == b:
+            return
+        shadow[i] = r
+        shadow[i + 1] = g
+        shadow[i + 2] = b
+        self.pixels[index] = (r, g, b)
+        if self.dirty_start >= self.dirty_end:
+            self.dirty_start = index
+            self.dirty_end = index + 1
+        elif index < self.dirty_start:
+            self.dirty_start = index
+        elif index >= self.dirty_end:
+            self.dirty_end = index + 1
+
+    def fill(self, color):
+        for i in range(self.n):
+            self[i] = color
+
+    @property
+    def dirty(self):
+        return self.dirty_start < self.dirty_end
+
+    # Push to the strip if anything changed since the last push. Returns
+    # True if it did.
+    def show(self):
+        if self.dirty_start >= self.dirty_end:
+            self.pushes_skipped += 1
+            return False
+        if self.pushes_performed > 0 and self.shadow == self.sent:
+            self.dirty_start = self.dirty_end = 0
+            self.pushes_skipped += 1
+            return False
+        self.pixels.show()
+        self.sent[:] = self.shadow
+        self.pushes_performed += 1
+        self.dirty_start = self.dirty_end = 0
+        return True
+
+    # Roughly how much bus time skipping unchanged pushes has saved so far
+    def bus_time_saved_us(self):
+        return self.pushes_skipped * self.n * PUSH_US_PER_PIXEL
+
+    def print_stats(self, name="pixels"):
+        print("%s: %d pushes, %d skipped, ~%d ms of bus time saved" %
+              (name, self.pushes_performed, self.pushes_skipped,
+               self.bus_time_saved_us() // 1000))
@@ -0,0 +1,20 @@
+##############################################################################
+#                 Host-Side CircuitPython Hardware Simulator                 #
+##############################################################################
+# Stand-ins for board, digitalio, analogio, audioio, audiobusio, touchio,   #
+# neopixel, neopixel_write, simpleio and adafruit_hid, so the scripts in    #
+# this repository can run (and be profiled and tested) on a Linux or Mac   #
+# host. Time is virtual: time.sleep() returns immediately and moves the     #
+# clock on. Every pixel frame, pin change and audio sample is recorded, and #
+# analog, touch, button and microphone inputs can be scripted.              #
+#                                                                            #
+# From the command line:                                                     #
+#                                                                            #
+#   python3 -m simulator cp_morse.py --seconds 3600                          #
+#                                                                            #
+# From Python, see simulator.simulation.Simulation.                          #
+##############################################################################
+
+from simulator.clock import SimulationTimeout, VirtualClock
+from simulator.recorder import Recorder
+from simulator.simulation import Simulation, active
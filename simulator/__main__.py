@@ -0,0 +1,50 @@
+##############################################################################
+# Run a script in the simulator:                                             #
+#                                                                            #
+#   python3 -m simulator SCRIPT [--seconds N] [--quiet]                      #
+#           [--input PIN=0|1] [--analog PIN=VALUE] [--touch PIN]             #
+##############################################################################
+
+import argparse
+import contextlib
+import io
+
+from simulator.simulation import Simulation
+
+def pin_setting(text):
+    name, _, value = text.partition("=")
+    return name, value
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m simulator",
+                                     description="Run a CircuitPython script on simulated hardware")
+    parser.add_argument("script")
+    parser.add_argument("--seconds", type=float, default=60,
+                        help="device time to simulate (default 60)")
+    parser.add_argument("--quiet", action="store_true", help="hide the script's output")
+    parser.add_argument("--input", type=pin_setting, action="append", default=[],
+                        metavar="PIN=0|1", help="hold a digital input high or low")
+    parser.add_argument("--analog", type=pin_setting, action="append", default=[],
+                        metavar="PIN=VALUE", help="set an analog input (0-65535)")
+    parser.add_argument("--touch", action="append", default=[], metavar="PIN",
+                        help="hold a touch pad touched")
+    args = parser.parse_args()
+
+    sim = Simulation()
+    for name, value in args.input:
+        sim.set_input(name, value not in ("0", "", "false", "False"))
+    for name, value in args.analog:
+        sim.set_analog(name, int(value))
+    for name in args.touch:
+        sim.set_touch(name, True)
+
+    if args.quiet:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.run_script(args.script, args.seconds)
+    else:
+        sim.run_script(args.script, args.seconds)
+    print("")
+    print(sim.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+##############################################################################
+# Virtual clock
+##############################################################################
+# Stands in for time.sleep(), time.monotonic() and friends while a script   #
+# runs in the simulator. Sleeping just moves the clock forward, so an hour  #
+# of device time passes as fast as the script's own Python can run. Reading #
+# the clock and talking to simulated hardware also advance it by roughly    #
+# what those operations cost on an M0, so busy-wait loops still make        #
+# progress and timing measurements come out in the right ballpark.          #
+##############################################################################
+
+# Approximate cost of common operations on a SAMD21, in nanoseconds
+CLOCK_READ_NS = 1000
+PIN_ACCESS_NS = 2000
+ANALOG_READ_NS = 15000
+TOUCH_MEASURE_NS = 500000
+NEOPIXEL_NS_PER_BYTE = 10000
+
+# Wall-clock time the simulated board "boots" at, for time.time()
+EPOCH = 1546300800
+
+# Raised inside the script when the simulation's time limit is reached.
+# Derived from BaseException so a script's own "except Exception" handlers
+# don't swallow it.
+class SimulationTimeout(BaseException):
+    pass
+
+class VirtualClock:
+    def __init__(self, limit_ns=None, read_cost_ns=CLOCK_READ_NS):
+        self.now_ns = 0
+        self.limit_ns = limit_ns
+        self.read_cost_ns = read_cost_ns
+        self.sleep_ns = 0
+
+    def advance(self, ns):
+        self.now_ns += int(ns)
+        if self.limit_ns is not None and self.now_ns >= self.limit_ns:
+            self.now_ns = self.limit_ns
+            raise SimulationTimeout()
+
+    @property
+    def seconds(self):
+        return self.now_ns / 1000000000
+
+    # Replacements for the time module functions
+
+    def sleep(self, seconds):
+        ns = int(seconds * 1000000000)
+        if ns > 0:
+            self.sleep_ns += ns
+            self.advance(ns)
+
+    def monotonic_ns(self):
+        self.advance(self.read_cost_ns)
+        return self.now_ns
+
+    def monotonic(self):
+        return self.monotonic_ns() / 1000000000
+
+    def time(self):
+        return EPOCH + self.monotonic_ns() // 1000000000
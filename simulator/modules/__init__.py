@@ -0,0 +1,2 @@
+# Stand-in CircuitPython modules. Simulation installs these in sys.modules
+# under their real names while a script runs.
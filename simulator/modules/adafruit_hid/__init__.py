@@ -0,0 +1 @@
+# Simulated adafruit_hid package; key presses are recorded as events.
@@ -0,0 +1,24 @@
+from simulator.simulation import active
+
+class Keyboard:
+    def __init__(self, devices=None):
+        self.pressed = set()
+
+    def press(self, *keycodes):
+        for keycode in keycodes:
+            self.pressed.add(keycode)
+            sim = active()
+            sim.recorder.event(sim.clock.now_ns, "key press", keycode)
+
+    def release(self, *keycodes):
+        for keycode in keycodes:
+            self.pressed.discard(keycode)
+            sim = active()
+            sim.recorder.event(sim.clock.now_ns, "key release", keycode)
+
+    def release_all(self):
+        self.release(*sorted(self.pressed))
+
+    def send(self, *keycodes):
+        self.press(*keycodes)
+        self.release_all()
@@ -0,0 +1,48 @@
+# Simulated adafruit_hid.keycode, with the usual USB HID usage IDs.
+
+class Keycode:
+    A = 4
+    B = 5
+    C = 6
+    D = 7
+    E = 8
+    F = 9
+    G = 10
+    H = 11
+    I = 12
+    J = 13
+    K = 14
+    L = 15
+    M = 16
+    N = 17
+    O = 18
+    P = 19
+    Q = 20
+    R = 21
+    S = 22
+    T = 23
+    U = 24
+    V = 25
+    W = 26
+    X = 27
+    Y = 28
+    Z = 29
+    ONE = 30
+    TWO = 31
+    THREE = 32
+    FOUR = 33
+    FIVE = 34
+    SIX = 35
+    SEVEN = 36
+    EIGHT = 37
+    NINE = 38
+    ZERO = 39
+    ENTER = 40
+    ESCAPE = 41
+    BACKSPACE = 42
+    TAB = 43
+    SPACE = 44
+    LEFT_CONTROL = 224
+    LEFT_SHIFT = 225
+    LEFT_ALT = 226
+    LEFT_GUI = 227
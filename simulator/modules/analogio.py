@@ -0,0 +1,50 @@
+# Simulated analogio. AnalogIn reads the value injected with
+# Simulation.set_analog(); AnalogOut writes are recorded.
+
+from simulator.clock import ANALOG_READ_NS, PIN_ACCESS_NS
+from simulator.simulation import active, pin_name
+
+class AnalogIn:
+    def __init__(self, pin):
+        self.name = pin_name(pin)
+        self.reference_voltage = 3.3
+
+    @property
+    def value(self):
+        sim = active()
+        sim.clock.advance(ANALOG_READ_NS)
+        return sim.analog_input(self.name)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+class AnalogOut:
+    def __init__(self, pin):
+        self.name = pin_name(pin)
+        self._value = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        sim = active()
+        sim.clock.advance(PIN_ACCESS_NS)
+        self._value = int(value) & 0xFFFF
+        sim.output(self.name, self._value)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,25 @@
+# Simulated audiobusio.PDMIn. record() fills the buffer from the signal given
+# to Simulation.set_mic() and takes as long as the real recording would.
+
+from simulator.simulation import active
+
+class PDMIn:
+    def __init__(self, clock_pin, data_pin, sample_rate=16000, bit_depth=8,
+                 mono=True, oversample=64, startup_delay=0.11):
+        self.sample_rate = sample_rate
+        self.bit_depth = bit_depth
+
+    def record(self, destination, destination_length):
+        sim = active()
+        sim.mic_samples(destination, destination_length, self.sample_rate, self.bit_depth)
+        sim.clock.advance(destination_length * 1000000000 // self.sample_rate)
+        return destination_length
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,98 @@
+# Simulated audioio. Playback takes no CPU; AudioOut just notes what was
+# played and when, and reports playing until the sample would have ended.
+
+import wave
+
+from simulator.clock import CLOCK_READ_NS
+from simulator.simulation import active, pin_name
+from simulator.modules.board import Pin
+
+class RawSample:
+    def __init__(self, buffer, channel_count=1, sample_rate=8000):
+        self.buffer = buffer
+        self.channel_count = channel_count
+        self.sample_rate = sample_rate
+
+    def samples(self):
+        return self.buffer
+
+    def deinit(self):
+        pass
+
+class WaveFile:
+    def __init__(self, file, buffer=None):
+        with wave.open(file) as w:
+            self.sample_rate = w.getframerate()
+            self.channel_count = w.getnchannels()
+            self.bits_per_sample = 8 * w.getsampwidth()
+            self.data = w.readframes(w.getnframes())
+
+    def samples(self):
+        if self.bits_per_sample == 8:
+            return list(self.data)
+        return [int.from_bytes(self.data[i:i + 2], "little", signed=True)
+                for i in range(0, len(self.data), 2)]
+
+    def deinit(self):
+        pass
+
+class AudioOut:
+    # CircuitPython 2.x took the sample (or an open .wav file) as the second
+    # argument; later versions take an optional right channel pin there.
+    def __init__(self, left_channel, right_channel=None, quiescent_value=0x8000):
+        self.name = pin_name(left_channel)
+        self.sample = None
+        if right_channel is not None and not isinstance(right_channel, Pin):
+            if hasattr(right_channel, "read"):
+                right_channel = WaveFile(right_channel)
+            self.sample = right_channel
+        self.loop = False
+        self.started_ns = 0
+        self.ends_ns = 0
+        self.is_playing = False
+        self.paused = False
+
+    def play(self, sample=None, loop=False):
+        if sample is None:
+            sample = self.sample
+        sim = active()
+        if self.is_playing:
+            self.stop()
+        samples = sample.samples()
+        self.loop = loop
+        self.started_ns = sim.clock.now_ns
+        self.ends_ns = self.started_ns + len(samples) * 1000000000 // (
+            sample.sample_rate * sample.channel_count)
+        self.is_playing = True
+        sim.recorder.audio(self.started_ns, self.name, "play",
+                           sample.sample_rate, samples, loop)
+
+    @property
+    def playing(self):
+        sim = active()
+        sim.clock.advance(CLOCK_READ_NS)
+        if self.is_playing and not self.loop and sim.clock.now_ns >= self.ends_ns:
+            self.is_playing = False
+        return self.is_playing
+
+    def stop(self):
+        sim = active()
+        if self.is_playing:
+            self.is_playing = False
+            sim.recorder.audio(sim.clock.now_ns, self.name, "stop")
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def deinit(self):
+        if self.is_playing:
+            self.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,20 @@
+# Simulated board: the pins of a Circuit Playground Express and a Metro M0
+# Express, so scripts for either will run.
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+PIN_NAMES = (
+    ["D%d" % i for i in range(14)] + ["A%d" % i for i in range(12)] +
+    ["NEOPIXEL", "SPEAKER", "SPEAKER_ENABLE", "BUTTON_A", "BUTTON_B",
+     "SLIDE_SWITCH", "MICROPHONE_CLOCK", "MICROPHONE_DATA", "LIGHT",
+     "TEMPERATURE", "REMOTEIN", "IR_TX", "IR_RX", "IR_PROXIMITY",
+     "SDA", "SCL", "SCK", "MOSI", "MISO", "TX", "RX", "LED"]
+)
+
+for _name in PIN_NAMES:
+    globals()[_name] = Pin(_name)
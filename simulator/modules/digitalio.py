@@ -0,0 +1,73 @@
+# Simulated digitalio. Inputs read whatever the simulation has been told
+# (or the pull resistor's level); output changes are recorded.
+
+from simulator.clock import PIN_ACCESS_NS
+from simulator.simulation import active, pin_name
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.name = pin_name(pin)
+        self._direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self._value = False
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @direction.setter
+    def direction(self, direction):
+        self._direction = direction
+        if direction == Direction.OUTPUT:
+            self.pull = None
+            active().output(self.name, self._value)
+
+    @property
+    def value(self):
+        sim = active()
+        sim.clock.advance(PIN_ACCESS_NS)
+        if self._direction == Direction.OUTPUT:
+            return self._value
+        return sim.digital_input(self.name, self.pull)
+
+    @value.setter
+    def value(self, value):
+        if self._direction != Direction.OUTPUT:
+            raise AttributeError("Cannot set value when direction is input.")
+        sim = active()
+        sim.clock.advance(PIN_ACCESS_NS)
+        value = bool(value)
+        if value != self._value:
+            self._value = value
+            sim.output(self.name, value)
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self._value = bool(value)
+        self.drive_mode = drive_mode
+        self.direction = Direction.OUTPUT
+
+    def switch_to_input(self, pull=None):
+        self._direction = Direction.INPUT
+        self.pull = pull
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
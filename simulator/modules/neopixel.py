@@ -0,0 +1,76 @@
+# Simulated neopixel library. Each show() records the frame (as RGB bytes,
+# after brightness) and takes as long as pushing it down the wire would.
+
+from simulator.clock import NEOPIXEL_NS_PER_BYTE
+from simulator.simulation import active, pin_name
+
+RGB = (0, 1, 2)
+GRB = (1, 0, 2)
+RGBW = (0, 1, 2, 3)
+GRBW = (1, 0, 2, 3)
+
+class NeoPixel:
+    def __init__(self, pin, n, bpp=3, brightness=1.0, auto_write=True, pixel_order=None):
+        self.name = pin_name(pin)
+        self.n = n
+        self.bpp = bpp
+        self.auto_write = auto_write
+        self._brightness = min(max(brightness, 0.0), 1.0)
+        self._pixels = [(0,) * bpp] * n
+
+    def _color(self, value):
+        if isinstance(value, int):
+            return ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF) + (0,) * (self.bpp - 3)
+        value = tuple(int(c) for c in value)
+        if len(value) != self.bpp:
+            raise ValueError("Expected tuple of length %d" % self.bpp)
+        return value
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, v in zip(range(*index.indices(self.n)), value):
+                self._pixels[i] = self._color(v)
+        else:
+            self._pixels[index] = self._color(value)
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color):
+        color = self._color(color)
+        self._pixels = [color] * self.n
+        if self.auto_write:
+            self.show()
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        self._brightness = min(max(brightness, 0.0), 1.0)
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        sim = active()
+        frame = bytearray()
+        for pixel in self._pixels:
+            for c in pixel:
+                frame.append(int(c * self._brightness))
+        sim.recorder.pixels(sim.clock.now_ns, self.name, frame)
+        sim.clock.advance(len(frame) * NEOPIXEL_NS_PER_BYTE)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,9 @@
+# Simulated neopixel_write. The buffer is recorded as-is (wire order).
+
+from simulator.clock import NEOPIXEL_NS_PER_BYTE
+from simulator.simulation import active
+
+def neopixel_write(digitalinout, buf):
+    sim = active()
+    sim.recorder.pixels(sim.clock.now_ns, digitalinout.name, buf)
+    sim.clock.advance(len(buf) * NEOPIXEL_NS_PER_BYTE)
@@ -0,0 +1,31 @@
+# Simulated simpleio: map_range() as in the real library, and a Servo whose
+# angle changes are recorded as pin events.
+
+from simulator.clock import PIN_ACCESS_NS
+from simulator.simulation import active, pin_name
+
+def map_range(x, in_min, in_max, out_min, out_max):
+    mapped = (x - in_min) * (out_max - out_min) / (in_max - in_min) + out_min
+    if out_min <= out_max:
+        return max(min(mapped, out_max), out_min)
+    return min(max(mapped, out_max), out_min)
+
+class Servo:
+    def __init__(self, pin, min_pulse=0.5, max_pulse=2.5):
+        self.name = pin_name(pin)
+        self._angle = None
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, angle):
+        sim = active()
+        sim.clock.advance(PIN_ACCESS_NS)
+        if angle != self._angle:
+            self._angle = angle
+            sim.output(self.name, angle)
+
+    def deinit(self):
+        pass
@@ -0,0 +1,30 @@
+# Simulated touchio. raw_value comes from Simulation.set_touch() or
+# set_touch_raw(); like the real thing, the threshold starts 100 above the
+# reading taken when the pad is set up, and every read costs a measurement.
+
+from simulator.clock import TOUCH_MEASURE_NS
+from simulator.simulation import active, pin_name
+
+class TouchIn:
+    def __init__(self, pin):
+        self.name = pin_name(pin)
+        self.threshold = active().touch_raw(self.name) + 100
+
+    @property
+    def raw_value(self):
+        sim = active()
+        sim.clock.advance(TOUCH_MEASURE_NS)
+        return sim.touch_raw(self.name)
+
+    @property
+    def value(self):
+        return self.raw_value > self.threshold
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,63 @@
+##############################################################################
+# Recorder
+##############################################################################
+# Everything the simulated hardware does is logged here, stamped with the   #
+# virtual time in nanoseconds, so tests can check what a script did and    #
+# when.                                                                      #
+##############################################################################
+
+class Recorder:
+    def __init__(self, pixels=True, pins=True, audio=True):
+        self.record_pixels = pixels
+        self.record_pins = pins
+        self.record_audio = audio
+        self.clear()
+
+    def clear(self):
+        # (time_ns, pin name, bytes): RGB bytes for NeoPixel objects after
+        # brightness, raw wire-order bytes for neopixel_write()
+        self.pixel_frames = []
+        # (time_ns, pin name, value): digital outputs, DAC writes and servo
+        # angles
+        self.pin_events = []
+        # (time_ns, pin name, event, sample rate, samples, loop); event is
+        # "play" or "stop" (samples is None for stops)
+        self.audio_events = []
+        # (time_ns, event, detail): anything else worth knowing about, e.g.
+        # HID key presses
+        self.events = []
+
+    def pixels(self, t, pin, data):
+        if self.record_pixels:
+            self.pixel_frames.append((t, pin, bytes(data)))
+
+    def pin(self, t, pin, value):
+        if self.record_pins:
+            self.pin_events.append((t, pin, value))
+
+    def audio(self, t, pin, event, sample_rate=None, samples=None, loop=False):
+        if self.record_audio:
+            if samples is not None:
+                samples = list(samples)
+            self.audio_events.append((t, pin, event, sample_rate, samples, loop))
+
+    def event(self, t, event, detail=None):
+        self.events.append((t, event, detail))
+
+    # Transitions recorded for one pin, as (time_ns, value)
+    def transitions(self, pin):
+        return [(t, v) for t, p, v in self.pin_events if p == pin]
+
+    # Frames recorded for one pixel pin, as (time_ns, bytes)
+    def frames(self, pin):
+        return [(t, d) for t, p, d in self.pixel_frames if p == pin]
+
+    # All audio samples played, with the time each play started
+    def audio_plays(self, pin=None):
+        return [e for e in self.audio_events
+                if e[2] == "play" and (pin is None or e[1] == pin)]
+
+    def summary(self):
+        return "%d pixel frames, %d pin events, %d audio plays, %d other events" % (
+            len(self.pixel_frames), len(self.pin_events),
+            len(self.audio_plays()), len(self.events))
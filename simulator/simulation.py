@@ -0,0 +1,205 @@
+##############################################################################
+# Simulation
+##############################################################################
+# Ties the virtual clock, the recorder and the injected inputs together,    #
+# and swaps the stand-in hardware modules into sys.modules while a script   #
+# runs. Typical use from a test:                                             #
+#                                                                            #
+#   sim = Simulation()                                                       #
+#   sim.set_input("BUTTON_B", lambda t: 1.0 <= t < 1.05)                     #
+#   sim.set_mic(lambda t: 0.5 * math.sin(2 * math.pi * 440 * t))             #
+#   sim.run_script("perfect_pitch_machine_v2.py", seconds=5)                 #
+#   print(sim.recorder.audio_plays())                                        #
+#                                                                            #
+# Inputs can be constants or functions of the virtual time in seconds.      #
+# Pins can be given as board pin objects or by name ("A1", "BUTTON_B").    #
+##############################################################################
+
+import importlib
+import os
+import runpy
+import sys
+import time
+
+from simulator.clock import VirtualClock, SimulationTimeout
+from simulator.recorder import Recorder
+
+# Module name -> stand-in module
+STAND_INS = {
+    "board": "simulator.modules.board",
+    "digitalio": "simulator.modules.digitalio",
+    "analogio": "simulator.modules.analogio",
+    "audioio": "simulator.modules.audioio",
+    "audiobusio": "simulator.modules.audiobusio",
+    "touchio": "simulator.modules.touchio",
+    "neopixel": "simulator.modules.neopixel",
+    "neopixel_write": "simulator.modules.neopixel_write",
+    "simpleio": "simulator.modules.simpleio",
+    "adafruit_hid": "simulator.modules.adafruit_hid",
+    "adafruit_hid.keyboard": "simulator.modules.adafruit_hid.keyboard",
+    "adafruit_hid.keycode": "simulator.modules.adafruit_hid.keycode",
+}
+
+# time module functions replaced by the virtual clock
+PATCHED_TIME = ("sleep", "monotonic", "monotonic_ns", "time")
+
+# Raw touchio reading for an untouched pad, and how far a touch raises it
+TOUCH_BASELINE = 1000
+TOUCH_DELTA = 500
+
+_active = None
+
+#----------------------------------------------------------------------------
+# The running simulation, for the stand-in modules to talk to.
+#----------------------------------------------------------------------------
+def active():
+    if _active is None:
+        raise RuntimeError("simulated hardware used outside a simulator.Simulation")
+    return _active
+
+def pin_name(pin):
+    if isinstance(pin, str):
+        return pin
+    return pin.name
+
+class Simulation:
+    def __init__(self, record_pixels=True, record_pins=True, record_audio=True):
+        self.clock = VirtualClock()
+        self.recorder = Recorder(record_pixels, record_pins, record_audio)
+        self.digital_inputs = {}
+        self.analog_inputs = {}
+        self.touch_inputs = {}
+        self.mic = None
+        self.outputs = {}
+        self.wall_seconds = 0.0
+        self._saved_modules = {}
+        self._saved_time = {}
+
+    #------------------------------------------------------------------------
+    # Input injection
+    #------------------------------------------------------------------------
+
+    # Level seen on a digital input (True/False or a function of time)
+    def set_input(self, pin, value):
+        self.digital_inputs[pin_name(pin)] = value
+
+    # AnalogIn reading, 0-65535 (or a function of time)
+    def set_analog(self, pin, value):
+        self.analog_inputs[pin_name(pin)] = value
+
+    # Whether a touch pad is being touched (or a function of time)
+    def set_touch(self, pin, touched):
+        if callable(touched):
+            self.touch_inputs[pin_name(pin)] = lambda t: (
+                TOUCH_BASELINE + TOUCH_DELTA if touched(t) else TOUCH_BASELINE)
+        else:
+            self.set_touch_raw(pin, TOUCH_BASELINE + TOUCH_DELTA if touched else TOUCH_BASELINE)
+
+    # Raw touchio reading for a pad (or a function of time)
+    def set_touch_raw(self, pin, raw_value):
+        self.touch_inputs[pin_name(pin)] = raw_value
+
+    # Microphone signal: a function of time returning -1.0 to 1.0, or an
+    # iterable of raw sample values that are used in order (then silence).
+    def set_mic(self, source):
+        if callable(source):
+            self.mic = source
+        else:
+            self.mic = iter(source)
+
+    #------------------------------------------------------------------------
+    # Used by the stand-in modules
+    #------------------------------------------------------------------------
+
+    def _value(self, source):
+        if callable(source):
+            return source(self.clock.seconds)
+        return source
+
+    def digital_input(self, name, pull):
+        if name in self.digital_inputs:
+            return bool(self._value(self.digital_inputs[name]))
+        return pull == "UP"
+
+    def analog_input(self, name):
+        return int(self._value(self.analog_inputs.get(name, 0))) & 0xFFFF
+
+    def touch_raw(self, name):
+        return int(self._value(self.touch_inputs.get(name, TOUCH_BASELINE)))
+
+    # Fill a buffer with microphone samples starting at the current time
+    def mic_samples(self, buffer, count, sample_rate, bit_depth):
+        midpoint = 1 << (bit_depth - 1)
+        peak = midpoint - 1
+        start = self.clock.seconds
+        if self.mic is None:
+            for i in range(count):
+                buffer[i] = midpoint
+        elif callable(self.mic):
+            for i in range(count):
+                level = max(-1.0, min(1.0, self.mic(start + i / sample_rate)))
+                buffer[i] = midpoint + int(level * peak)
+        else:
+            for i in range(count):
+                buffer[i] = next(self.mic, midpoint)
+
+    def output(self, name, value):
+        self.outputs[name] = value
+        self.recorder.pin(self.clock.now_ns, name, value)
+
+    #------------------------------------------------------------------------
+    # Running scripts
+    #------------------------------------------------------------------------
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("a simulation is already running")
+        _active = self
+        for name, module in STAND_INS.items():
+            self._saved_modules[name] = sys.modules.get(name)
+            sys.modules[name] = importlib.import_module(module)
+        for name in PATCHED_TIME:
+            self._saved_time[name] = getattr(time, name)
+            setattr(time, name, getattr(self.clock, name))
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        for name, function in self._saved_time.items():
+            setattr(time, name, function)
+        for name, module in self._saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        self._saved_time = {}
+        self._saved_modules = {}
+        _active = None
+        return False
+
+    # Run a script (as __main__) for up to the given number of seconds of
+    # device time, or until it finishes. Returns the recorder.
+    def run_script(self, path, seconds=None):
+        if seconds is None:
+            self.clock.limit_ns = None
+        else:
+            self.clock.limit_ns = self.clock.now_ns + int(seconds * 1000000000)
+        script_dir = os.path.dirname(os.path.abspath(path))
+        sys.path.insert(0, script_dir)
+        wall_start = time.perf_counter()
+        try:
+            with self:
+                runpy.run_path(path, run_name="__main__")
+        except SimulationTimeout:
+            pass
+        finally:
+            self.wall_seconds += time.perf_counter() - wall_start
+            sys.path.remove(script_dir)
+            self.clock.limit_ns = None
+        return self.recorder
+
+    def summary(self):
+        return "%0.1f s of device time in %0.2f s (%0.1f s asleep); %s" % (
+            self.clock.seconds, self.wall_seconds,
+            self.clock.sleep_ns / 1000000000, self.recorder.summary())
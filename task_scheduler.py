@@ -0,0 +1,174 @@
+##############################################################################
+#                 Cooperative Periodic Task Scheduler                        #
+##############################################################################
+# Runs a set of tasks, each a function called at its own rate, from one     #
+# loop. Every task has a deadline (when it's next due); the scheduler runs #
+# whichever due task has the earliest deadline, then sleeps until the next #
+# one, so a slow task only delays the others instead of setting the pace  #
+# for all of them. Tasks must return promptly: anything that takes a while #
+# should be started by one run and checked on by later ones.                #
+#                                                                            #
+# For each task it records:                                                  #
+#   - jitter: how late each run started after its deadline                  #
+#   - overruns: runs of its own that took longer than its period           #
+#   - skipped: its deadlines that had passed again before it got to run,   #
+#     whether it was slow itself or others held it up. Deadlines missed    #
+#     are skipped rather than run late in a burst.                          #
+#   - delayed: other tasks' deadlines that came due while it was running,  #
+#     which points at the task holding the others up                        #
+# and for the scheduler as a whole, the fraction of the time it was idle.   #
+#                                                                            #
+# run() is the scheduler's own loop and needs only time, so it works on a  #
+# board. On a host with asyncio, run_asyncio() drives the same tasks from  #
+# an asyncio event loop instead, so they can share it with other code.     #
+##############################################################################
+
+import time
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+class Task:
+    def __init__(self, name, function, hz):
+        self.name = name
+        self.function = function
+        self.period_ns = int(1000000000 / hz)
+        # When the task is next due
+        self.deadline_ns = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.delayed = 0
+        self.total_jitter_ns = 0
+        self.worst_jitter_ns = 0
+        self.busy_ns = 0
+        self.worst_run_ns = 0
+
+class Scheduler:
+    def __init__(self):
+        self.tasks = []
+        self.started_ns = time.monotonic_ns()
+
+    # Run function() hz times a second, starting one period from now.
+    # Returns the Task.
+    def add(self, name, function, hz):
+        task = Task(name, function, hz)
+        task.deadline_ns = time.monotonic_ns() + task.period_ns
+        self.tasks.append(task)
+        return task
+
+    def reset_stats(self):
+        self.started_ns = time.monotonic_ns()
+        for task in self.tasks:
+            task.reset_stats()
+
+    #------------------------------------------------------------------------
+    # Run one task that's due, and work out its next deadline
+    #------------------------------------------------------------------------
+    def run_task(self, task, now):
+        jitter = now - task.deadline_ns
+        task.total_jitter_ns += jitter
+        if jitter > task.worst_jitter_ns:
+            task.worst_jitter_ns = jitter
+        task.runs += 1
+        task.function()
+        finished = time.monotonic_ns()
+        busy = finished - now
+        task.busy_ns += busy
+        if busy > task.worst_run_ns:
+            task.worst_run_ns = busy
+        if busy > task.period_ns:
+            task.overruns += 1
+        # Other tasks' deadlines that passed while this one had the CPU
+        for other in self.tasks:
+            if other is not task and now < other.deadline_ns <= finished:
+                task.delayed += (finished - other.deadline_ns) // other.period_ns + 1
+
+        task.deadline_ns += task.period_ns
+        if finished > task.deadline_ns:
+            # Missed the next deadline; skip to the first one still ahead
+            missed = (finished - task.deadline_ns) // task.period_ns + 1
+            task.skipped += missed
+            task.deadline_ns += missed * task.period_ns
+
+    #------------------------------------------------------------------------
+    # Run the due task with the earliest deadline, if any is due. Returns
+    # how many seconds until the next deadline (0 if one is already due).
+    #------------------------------------------------------------------------
+    def run_once(self):
+        now = time.monotonic_ns()
+        earliest = None
+        for task in self.tasks:
+            if earliest is None or task.deadline_ns < earliest.deadline_ns:
+                earliest = task
+        if earliest is None:
+            return 0
+        if earliest.deadline_ns <= now:
+            self.run_task(earliest, now)
+            now = time.monotonic_ns()
+            for task in self.tasks:
+                if task.deadline_ns < earliest.deadline_ns:
+                    earliest = task
+        wait = earliest.deadline_ns - now
+        if wait <= 0:
+            return 0
+        return wait / 1000000000
+
+    # Run the tasks, forever or for a number of seconds
+    def run(self, seconds=None):
+        if seconds is not None:
+            end = time.monotonic_ns() + int(seconds * 1000000000)
+        while seconds is None or time.monotonic_ns() < end:
+            wait = self.run_once()
+            if wait > 0:
+                time.sleep(wait)
+
+    #------------------------------------------------------------------------
+    # Run the tasks from an asyncio event loop, forever or for a number of
+    # seconds. Each task reschedules itself with call_later() after it runs.
+    #------------------------------------------------------------------------
+    def run_asyncio(self, seconds=None):
+        if asyncio is None:
+            raise RuntimeError("asyncio isn't available here; use run()")
+        loop = asyncio.new_event_loop()
+
+        def schedule(task):
+            wait = task.deadline_ns - time.monotonic_ns()
+            loop.call_later(max(wait, 0) / 1000000000, step, task)
+
+        def step(task):
+            self.run_task(task, time.monotonic_ns())
+            schedule(task)
+
+        for task in self.tasks:
+            schedule(task)
+        if seconds is not None:
+            loop.call_later(seconds, loop.stop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    # Fraction of the time since the stats were reset not spent in tasks
+    def idle(self):
+        elapsed = time.monotonic_ns() - self.started_ns
+        if elapsed <= 0:
+            return 1.0
+        busy = 0
+        for task in self.tasks:
+            busy += task.busy_ns
+        return 1 - busy / elapsed
+
+    def print_stats(self, name="scheduler"):
+        print("%s: %d%% idle" % (name, int(self.idle() * 100)))
+        for task in self.tasks:
+            average = task.total_jitter_ns // task.runs if task.runs else 0
+            print("  %-8s %5d runs, jitter %d us average / %d us worst, worst run %d us, "
+                  "%d overruns, %d skipped, delayed others %d times" %
+                  (task.name, task.runs, average // 1000, task.worst_jitter_ns // 1000,
+                   task.worst_run_ns // 1000, task.overruns, task.skipped, task.delayed))
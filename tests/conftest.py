@@ -0,0 +1,14 @@
+##############################################################################
+# Host tests                                                                 #
+#                                                                            #
+#   python3 -m pytest tests                                                  #
+#                                                                            #
+# The scripts' helper modules are imported straight from the repository     #
+# root. Tests that need hardware run inside a simulator.Simulation, which  #
+# provides board, touchio and the rest, and a virtual clock.               #
+##############################################################################
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
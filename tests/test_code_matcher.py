@@ -0,0 +1,41 @@
+##############################################################################
+# Touch lock codes: parsing and matching                                     #
+##############################################################################
+
+import pytest
+
+from code_matcher import CodeMatcher
+from touch_scanner import code_masks
+
+def enter(matcher, code):
+    matched = -1
+    for mask in code_masks(code):
+        matched = matcher.advance(mask)
+    return matched
+
+def test_code_masks():
+    assert code_masks("3472") == [8, 16, 128, 4]
+    assert code_masks("3[47]2") == [8, 16 | 128, 4]
+
+@pytest.mark.parametrize("code", ["3[4", "3]4", "[]", "3[]4", "[3[4]]", "3a4"])
+def test_code_masks_rejects_bad_codes(code):
+    with pytest.raises(ValueError):
+        code_masks(code)
+
+@pytest.mark.parametrize("code", ["", "3[4"])
+def test_matcher_rejects_bad_codes(code):
+    with pytest.raises(ValueError):
+        CodeMatcher({"owner": "3472", "bad": code})
+
+def test_matcher_rejects_codes_that_cant_be_entered():
+    with pytest.raises(ValueError):
+        CodeMatcher({"a": "3472", "b": "3472"})
+    with pytest.raises(ValueError):
+        CodeMatcher({"a": "47", "b": "3472"})
+
+def test_matches_after_a_wrong_start():
+    matcher = CodeMatcher({"owner": "3472", "guest": "[34]12"})
+    assert enter(matcher, "33472") == matcher.names.index("owner")
+    assert enter(matcher, "1[34]12") == matcher.names.index("guest")
+    assert enter(matcher, "3471") == -1
+    assert matcher.depth() == 0
@@ -0,0 +1,53 @@
+##############################################################################
+# InputEvents timing across the 32-bit ms wrap                               #
+##############################################################################
+
+import input_events
+from input_events import InputEvents, PRESS, RELEASE, LONG_PRESS, REPEAT, ms_diff
+
+class FakePin:
+    def __init__(self):
+        self.value = False
+
+class FakeClock:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def monotonic_ns(self):
+        return self.ms * 1000000
+
+def test_ms_diff_across_wrap():
+    assert ms_diff(5, 0xFFFFFFFB) == 10
+    assert ms_diff(0xFFFFFFFB, 5) == -10
+    assert ms_diff(1000, 400) == 600
+
+def test_events_across_wrap(monkeypatch):
+    # Start 50 ms before the ms count wraps, 49.7 days after start-up
+    clock = FakeClock((1 << 32) - 50)
+    monkeypatch.setattr(input_events.time, "monotonic_ns", clock.monotonic_ns)
+    pin = FakePin()
+    events = InputEvents(size=32)
+    events.add_input("button", pin, settle_ms=20, long_press_ms=500,
+                     repeat_delay_ms=300, repeat_ms=100)
+
+    seen = []
+    def run(ms):
+        for _ in range(ms):
+            events.update()
+            event = events.get()
+            while event is not None:
+                seen.append(event[1])
+                event = events.get()
+            clock.ms += 1
+
+    run(40)
+    pin.value = True
+    run(650)
+    pin.value = False
+    run(40)
+
+    assert seen[0] == PRESS
+    assert seen.count(LONG_PRESS) == 1
+    # Repeats from 300 ms after the press, every 100 ms, until the release
+    assert seen.count(REPEAT) == 4
+    assert seen[-1] == RELEASE
@@ -0,0 +1,70 @@
+##############################################################################
+# LoudnessTracker attack / release hysteresis                                #
+##############################################################################
+
+import array
+import math
+
+from audio_dsp import LoudnessTracker
+
+WINDOW = 480
+
+def tone(rms, count, hz=500, sample_rate=16000):
+    amplitude = rms * math.sqrt(2)
+    return array.array("H", [32768 + int(amplitude * math.sin(2 * math.pi * hz * i / sample_rate))
+                             for i in range(count)])
+
+def tracker():
+    # A settled DC level, as after listening for a while
+    return LoudnessTracker(window=WINDOW, attack=5000, release=3500)
+
+def test_attack_and_release():
+    t = tracker()
+    t.update_block(tone(4000, 4 * WINDOW))
+    assert not t.active
+    assert t.update_block(tone(6000, 2 * WINDOW))
+    assert t.active
+    t.update_block(tone(4000, 2 * WINDOW))
+    assert t.active
+    t.update_block(tone(2000, 2 * WINDOW))
+    assert not t.active
+
+def test_flush_keeps_sound_above_release_active():
+    t = tracker()
+    t.update_block(tone(6000, 2 * WINDOW))
+    assert t.active
+    t.flush()
+    # Between the attack and release levels: the sound is still on
+    assert t.update_block(tone(4000, 2 * WINDOW))
+    assert t.active
+
+def test_flush_waits_for_the_window_to_refill():
+    t = tracker()
+    t.update_block(tone(6000, 2 * WINDOW))
+    t.flush()
+    t.update_block(tone(4000, WINDOW - 1))
+    assert not t.active
+    t.update_block(tone(4000, 1))
+    assert t.active
+
+def test_flush_releases_below_release():
+    t = tracker()
+    t.update_block(tone(6000, 2 * WINDOW))
+    t.flush()
+    t.update_block(tone(2000, 2 * WINDOW))
+    assert not t.active
+
+def test_flush_then_update_one_sample_at_a_time():
+    t = tracker()
+    t.update_block(tone(6000, 2 * WINDOW))
+    t.flush()
+    for sample in tone(4000, 2 * WINDOW):
+        t.update(sample)
+    assert t.active
+
+def test_clear_needs_the_attack_level_again():
+    t = tracker()
+    t.update_block(tone(6000, 2 * WINDOW))
+    t.clear()
+    t.update_block(tone(4000, 4 * WINDOW))
+    assert not t.active
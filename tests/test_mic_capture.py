@@ -0,0 +1,49 @@
+##############################################################################
+# MicCapture block accounting, on the simulator                              #
+##############################################################################
+
+import time
+
+from simulator import Simulation
+
+def make_capture(sim):
+    import audiobusio
+    import board
+    from mic_capture import MicCapture
+    mic = audiobusio.PDMIn(board.MICROPHONE_CLOCK, board.MICROPHONE_DATA,
+                           sample_rate=16000, bit_depth=16)
+    capture = MicCapture(mic, block_size=160, buffers=2, sample_rate=16000)
+    seen = []
+    capture.add_consumer(lambda block: seen.append(block[0]))
+    return capture, seen
+
+def test_pump_processes_every_block():
+    with Simulation(record_pixels=False, record_pins=False, record_audio=False) as sim:
+        capture, seen = make_capture(sim)
+        for _ in range(10):
+            capture.pump()
+        capture.wait(0.1)
+    # wait() sleeps whatever's too short for a whole block
+    assert 19 <= capture.blocks_captured <= 20
+    assert capture.blocks_captured == capture.blocks_processed == len(seen)
+    assert capture.overruns == 0
+    assert capture.dropped_blocks == 0
+
+def test_overwritten_block_counts_once_as_an_overrun():
+    with Simulation(record_pixels=False, record_pins=False, record_audio=False) as sim:
+        capture, seen = make_capture(sim)
+        for _ in range(3):
+            capture.capture()
+        assert capture.process() == 2
+    assert capture.overruns == 1
+    assert capture.dropped_blocks == 0
+
+def test_gap_counts_as_dropped():
+    with Simulation(record_pixels=False, record_pins=False, record_audio=False) as sim:
+        capture, seen = make_capture(sim)
+        capture.pump()
+        # 10 blocks' worth of not recording
+        time.sleep(0.1)
+        capture.pump()
+    assert capture.dropped_blocks == 10
+    assert capture.overruns == 0
@@ -0,0 +1,52 @@
+##############################################################################
+# MorseReceiver speed estimation                                             #
+##############################################################################
+
+import random
+
+import pytest
+
+from morse import MorseReceiver, compile_schedule, schedule_edges
+
+#----------------------------------------------------------------------------
+# Decode text keyed at send_wpm by a receiver that starts out expecting
+# start_wpm. jitter moves each edge by that fraction of a dot (one standard
+# deviation), like a hand-keyed sender.
+#----------------------------------------------------------------------------
+def receive(text, send_wpm, start_wpm=20, jitter=0.0, seed=1):
+    rng = random.Random(seed)
+    dot_us = 1200000 // send_wpm
+    edges = schedule_edges(compile_schedule(text), send_wpm)
+    if jitter:
+        edges = [(t + int(rng.gauss(0, jitter) * dot_us) if i else t, keyed)
+                 for i, (t, keyed) in enumerate(edges)]
+    receiver = MorseReceiver(wpm=start_wpm)
+    return receiver.feed(edges).strip(), receiver
+
+@pytest.mark.parametrize("send_wpm", [8, 12, 20, 30, 40])
+def test_first_character_decodes_at_any_speed(send_wpm):
+    text, receiver = receive("THE", send_wpm)
+    assert text == "THE"
+    assert abs(receiver.wpm - send_wpm) <= send_wpm // 10 + 1
+
+# Openings where every mark is the same length, so the gaps have to decide
+@pytest.mark.parametrize("message", ["EIS", "TMO", "SOS", "73"])
+@pytest.mark.parametrize("send_wpm", [8, 40])
+def test_uniform_openings(message, send_wpm):
+    assert receive(message, send_wpm)[0] == message
+
+@pytest.mark.parametrize("start_wpm", [10, 20, 30])
+@pytest.mark.parametrize("send_wpm", [6, 15, 25, 45])
+def test_hand_keyed(start_wpm, send_wpm):
+    message = "CQ CQ DE W1AW K"
+    for seed in range(3):
+        assert receive(message, send_wpm, start_wpm, jitter=0.12, seed=seed)[0] == message
+
+# Once calibrated, the estimate keeps following a sender who speeds up
+def test_follows_speed_change():
+    first = schedule_edges(compile_schedule("PARIS PARIS "), 20)
+    start = first[-1][0] + 7 * 60000
+    second = schedule_edges(compile_schedule("PARIS PARIS"), 24, start)
+    receiver = MorseReceiver(wpm=20)
+    assert receiver.feed(first + second).split() == ["PARIS"] * 4
+    assert 22 <= receiver.wpm <= 25
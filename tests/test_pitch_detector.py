@@ -0,0 +1,74 @@
+##############################################################################
+# PitchDetector note and cents readings                                      #
+##############################################################################
+
+import array
+import math
+import random
+
+import pytest
+
+from audio_dsp import PitchDetector
+from note_table import NoteTable
+
+SAMPLE_RATE = 16000
+
+# The pitch machine's ranges, Ab3-Ab4 and Ab4-Ab5
+RANGES = [56, 68]
+
+# How far off a reading of a clean tone's cents may be
+CENTS_TOLERANCE = 6
+
+def tone_samples(frequency, count, amplitude=8000):
+    return array.array("H", [32768 + int(amplitude * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE))
+                             for i in range(count)])
+
+def noise_samples(rms, count, seed=1):
+    rng = random.Random(seed)
+    return array.array("H", [32768 + int(rng.gauss(0, rms)) for _ in range(count)])
+
+def detector_for(lowest):
+    return PitchDetector(NoteTable.octaves(lowest).frequencies(), SAMPLE_RATE)
+
+def read(detector, samples):
+    assert detector.add_samples(samples)
+    return detector.analyze()
+
+@pytest.mark.parametrize("lowest", RANGES)
+def test_detune_sweep(lowest):
+    detector = detector_for(lowest)
+    count = detector.size * detector.decimate
+    for note in detector.notes:
+        for cents in range(-45, 46, 5):
+            reading = read(detector, tone_samples(note * 2 ** (cents / 1200), count))
+            assert reading is not None, "%.1f Hz %+d cents" % (note, cents)
+            assert reading[0] == note, "%.1f Hz %+d cents read as %r" % (note, cents, reading)
+            assert abs(reading[1] - cents) <= CENTS_TOLERANCE, \
+                "%.1f Hz %+d cents read as %r" % (note, cents, reading)
+
+@pytest.mark.parametrize("lowest", RANGES)
+def test_silence_is_not_a_note(lowest):
+    detector = detector_for(lowest)
+    count = detector.size * detector.decimate
+    assert read(detector, array.array("H", [32768] * count)) is None
+
+@pytest.mark.parametrize("lowest", RANGES)
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_noise_below_gate_is_not_a_note(lowest, seed):
+    detector = detector_for(lowest)
+    count = detector.size * detector.decimate
+    assert read(detector, noise_samples(detector.min_rms * 3 // 4, count, seed)) is None
+
+@pytest.mark.parametrize("lowest", RANGES)
+def test_quiet_tone_below_gate_is_not_a_note(lowest):
+    detector = detector_for(lowest)
+    count = detector.size * detector.decimate
+    # A sine's rms is its amplitude / sqrt(2)
+    amplitude = detector.min_rms
+    assert read(detector, tone_samples(detector.notes[6], count, amplitude)) is None
+
+def test_partial_block_is_not_analyzed():
+    detector = detector_for(RANGES[0])
+    count = detector.size * detector.decimate
+    assert not detector.add_samples(tone_samples(440, count // 2))
+    assert detector.analyze() is None
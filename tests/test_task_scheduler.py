@@ -0,0 +1,59 @@
+##############################################################################
+# Scheduler smoke tests, on the host clock                                   #
+##############################################################################
+
+import time
+
+import pytest
+
+import task_scheduler
+from task_scheduler import Scheduler
+
+def busy_wait(seconds):
+    end = time.monotonic_ns() + int(seconds * 1000000000)
+    while time.monotonic_ns() < end:
+        pass
+
+def fast_and_slow():
+    scheduler = Scheduler()
+    fast = scheduler.add("fast", lambda: None, 100)
+    slow = scheduler.add("slow", lambda: busy_wait(0.03), 20)
+    return scheduler, fast, slow
+
+def check_fast_and_slow(fast, slow):
+    assert 30 <= fast.runs <= 51
+    assert 7 <= slow.runs <= 11
+    # The slow task holds the fast one up, but neither runs past its period
+    assert slow.delayed > 0
+    assert fast.skipped > 0
+    assert fast.overruns == 0
+    assert slow.overruns == 0
+    assert fast.delayed <= 2
+
+def test_run():
+    scheduler, fast, slow = fast_and_slow()
+    scheduler.run(0.5)
+    check_fast_and_slow(fast, slow)
+    assert 0 < scheduler.idle() < 1
+
+@pytest.mark.skipif(task_scheduler.asyncio is None, reason="no asyncio")
+def test_run_asyncio():
+    scheduler, fast, slow = fast_and_slow()
+    scheduler.run_asyncio(0.5)
+    check_fast_and_slow(fast, slow)
+
+def test_overrun_is_charged_to_the_slow_task():
+    scheduler = Scheduler()
+    quick = scheduler.add("quick", lambda: None, 50)
+    long_run = scheduler.add("long", lambda: busy_wait(0.03), 50)
+    scheduler.run(0.3)
+    assert long_run.overruns == long_run.runs
+    assert quick.overruns == 0
+    assert long_run.delayed > quick.delayed
+
+def test_print_stats(capsys):
+    scheduler, fast, slow = fast_and_slow()
+    scheduler.run(0.1)
+    scheduler.print_stats()
+    out = capsys.readouterr().out
+    assert "fast" in out and "slow" in out
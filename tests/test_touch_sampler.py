@@ -0,0 +1,137 @@
+##############################################################################
+# TouchSampler thresholds and time budget, on the simulator                  #
+##############################################################################
+
+import random
+import time
+
+from simulator import Simulation
+
+# Pad n is on board.An
+PADS = ["A1", "A2", "A3", "A4"]
+
+# Real touches, as (start, end) in seconds
+TOUCHES = [(5, 5.3), (20, 20.4), (40, 40.2), (55, 55.3)]
+TOUCH_DELTA = 500
+
+def finger(t):
+    for start, end in TOUCHES:
+        if start <= t < end:
+            return TOUCH_DELTA
+    return 0
+
+def bits(mask):
+    return bin(mask).count("1")
+
+#----------------------------------------------------------------------------
+# Scan pads fed raw readings by traces (pin name -> function of t) every
+# 10 ms for a number of seconds. Returns the finished touches as
+# (seconds, mask), the sampler, each scan's measured mask and the sampler's
+# full passes over the pads per second.
+#----------------------------------------------------------------------------
+def run_pads(traces, seconds, budget_us=None):
+    sim = Simulation(record_pixels=False, record_pins=False, record_audio=False)
+    for pin, trace in traces.items():
+        sim.set_touch_raw(pin, trace)
+    with sim:
+        import board
+        import touchio
+        from touch_sampler import TouchSampler
+        from touch_scanner import TouchScanner
+        inputs = [None] + [touchio.TouchIn(getattr(board, pin)) if pin in traces else None
+                           for pin in PADS]
+        sampler = TouchSampler(inputs, budget_us=budget_us)
+        scanner = TouchScanner(inputs, sampler=sampler)
+        touches = []
+        measured = []
+        end = time.monotonic_ns() + int(seconds * 1000000000)
+        while time.monotonic_ns() < end:
+            touch = scanner.scan()
+            measured.append(scanner.measured)
+            if touch:
+                touches.append((time.monotonic(), touch))
+            time.sleep(0.01)
+        sweeps = sampler.scans_per_second()
+    return touches, sampler, measured, sweeps
+
+def touch_starts(touches, pad):
+    return [int(t) for t, mask in touches if mask & (1 << pad)]
+
+def test_follows_drift_and_noise():
+    rng = random.Random(1)
+    touches, sampler, _, _ = run_pads({
+        # Drifting up 400 counts over a minute, and touched
+        "A1": lambda t: int(1000 + 400 * t / 60 + rng.gauss(0, 15) + finger(t)),
+        # Drifting down, never touched
+        "A3": lambda t: int(1200 - 200 * t / 60 + rng.gauss(0, 10)),
+    }, 60)
+    assert touch_starts(touches, 1) == [5, 20, 40, 55]
+    assert touch_starts(touches, 3) == []
+    assert list(sampler.false_triggers) == [0] * 5
+    # The baseline kept up with the drift
+    assert abs(sampler.baseline(1) - 1400) < 50
+
+def test_baseline_jump_is_a_false_trigger_not_a_touch():
+    rng = random.Random(2)
+    touches, sampler, _, _ = run_pads({
+        # Noisy, and jumps 300 counts at 25 s for good
+        "A2": lambda t: int(1000 + rng.gauss(0, 30) + (300 if t >= 25 else 0) + finger(t)),
+    }, 60)
+    # Only the real touches, before and after the jump
+    assert touch_starts(touches, 2) == [5, 20, 40, 55]
+    assert sampler.false_triggers[2] == 1
+    assert abs(sampler.baseline(2) - 1300) < 50
+    # The noise raised the threshold above the minimum
+    assert sampler.threshold(2) > sampler.min_delta
+
+def test_other_pads_work_during_a_baseline_jump():
+    rng = random.Random(5)
+    touches, sampler, _, _ = run_pads({
+        "A1": lambda t: int(1000 + rng.gauss(0, 10) + (TOUCH_DELTA if 30 <= t < 30.3 else 0)),
+        # Jumps 300 counts at 25 s, so it reads as touched until it's discarded
+        "A2": lambda t: int(1000 + rng.gauss(0, 10) + (300 if t >= 25 else 0)),
+    }, 40)
+    # The touch on pad 1, on its own, while pad 2 is still taken as touched
+    assert [(int(t), mask) for t, mask in touches] == [(30, 1 << 1)]
+    assert sampler.false_triggers[2] == 1
+
+def test_single_reading_spike():
+    rng = random.Random(3)
+    spiked = []
+    def trace(t):
+        raw = int(1000 + rng.gauss(0, 10))
+        if t >= 10 and not spiked:
+            spiked.append(t)
+            raw += TOUCH_DELTA
+        return raw
+    touches, sampler, _, _ = run_pads({"A1": trace}, 12)
+    assert spiked
+    assert touches == []
+    assert sampler.false_triggers[1] == 1
+
+def test_budget_measures_pads_round_robin():
+    rng = random.Random(4)
+    traces = {}
+    for pin in PADS:
+        traces[pin] = lambda t: int(1000 + rng.gauss(0, 10) + finger(t))
+    # Each simulated measurement takes 500 us (a little more with reading
+    # the clock), so 1200 us fits two
+    touches, sampler, measured, sweeps = run_pads(traces, 60, budget_us=1200)
+    every_pad = 0b11110
+    for i in range(1, len(measured) - 1):
+        assert bits(measured[i]) == 2
+        assert measured[i] | measured[i + 1] == every_pad
+    # Every pad still sees every touch, together
+    assert [(int(t), mask) for t, mask in touches] == [(start, every_pad) for start, _ in TOUCHES]
+    assert list(sampler.false_triggers) == [0] * 5
+    # Half the pads per scan, every 10 ms plus the measuring
+    assert 40 < sweeps < 50
+
+def test_no_budget_measures_every_pad():
+    traces = {}
+    for pin in PADS:
+        traces[pin] = lambda t: 1000 + finger(t)
+    touches, sampler, measured, sweeps = run_pads(traces, 10)
+    assert set(measured) == {0b11110}
+    assert len(touches) == 1
+    assert 80 < sweeps < 100
@@ -0,0 +1,212 @@
+##############################################################################
+#                 Self-Calibrating Touch Pad Sampler                         #
+##############################################################################
+# touchio.TouchIn.value compares each reading against a threshold fixed    #
+# when the pad was set up, so as humidity or the enclosure shift the       #
+# untouched reading, pads either stop responding or trigger on their own.  #
+# TouchSampler reads raw_value instead and keeps, per pad:                   #
+#                                                                            #
+#   - a baseline that slowly follows the reading while it isn't touched    #
+#   - a noise level (average distance of the reading from the baseline)   #
+#   - a threshold above the baseline of min_delta or noise_factor times    #
+#     the noise, whichever is larger, with hysteresis so a touch has to    #
+#     fall back to half of it to count as released                         #
+#                                                                            #
+# A "touch" that lasts longer than max_touch_ms is taken to be the baseline #
+# jumping (say, the lock being moved) rather than a finger: the pad is     #
+# recalibrated and it counts as a false trigger, as does a touch that only #
+# shows up in a single reading. Pads given up on like this are flagged in  #
+# discarded, so TouchScanner doesn't report them as a touch. Well before   #
+# that, once a touch has lasted stale_ms, the pad is flagged in stale so   #
+# TouchScanner stops waiting for it and the other pads keep working.      #
+#                                                                            #
+# Each measurement takes real time, so sample() measures pads round-robin, #
+# picking up where it left off, until the next one would go over a time    #
+# budget. With a small budget a scan measures only some of the pads.        #
+##############################################################################
+
+import array
+import time
+
+# Baselines and noise levels are kept in 1/16ths of a count
+BASELINE_BITS = 4
+
+# Touch start times are kept in ms, wrapping at 32 bits
+MS_MASK = 0xFFFFFFFF
+
+class TouchSampler:
+    #------------------------------------------------------------------------
+    # inputs is a list of TouchIn objects indexed by pad number (None for
+    # numbers with no pad), the same as TouchScanner's. budget_us is the
+    # time in us each sample() may spend measuring; None measures every pad.
+    # The baseline moves 1/2**baseline_shift of the way to each untouched
+    # reading, and the noise level 1/2**noise_shift.
+    #------------------------------------------------------------------------
+    def __init__(self, inputs, budget_us=None, min_delta=100, noise_factor=8,
+                 baseline_shift=6, noise_shift=4, max_touch_ms=10000,
+                 calibrate_samples=8, stale_ms=2000):
+        self.inputs = inputs
+        self.count = len(inputs)
+        self.budget_us = budget_us
+        self.min_delta = min_delta
+        self.noise_factor = noise_factor
+        self.baseline_shift = baseline_shift
+        self.noise_shift = noise_shift
+        self.max_touch_ms = max_touch_ms
+        self.stale_ms = stale_ms
+        self.baselines = array.array("l", [0] * self.count)
+        self.noise = array.array("l", [0] * self.count)
+        self.raw = array.array("L", [0] * self.count)
+        self.touched_since = array.array("L", [0] * self.count)
+        # Readings in a row the current touch has lasted
+        self.runs = array.array("H", [0] * self.count)
+        # Touched pads, and the pads measured by the last sample() and those
+        # whose touch it gave up on
+        self.state = 0
+        self.measured = 0
+        self.discarded = 0
+        # Touched pads whose touch has lasted longer than stale_ms
+        self.stale = 0
+        self.next_pad = 0
+        self.calibrate(calibrate_samples)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.sweeps = 0
+        self.started_ns = time.monotonic_ns()
+        # Running average time per measurement, in us
+        self.measure_us = array.array("L", [0] * self.count)
+        self.measures = array.array("L", [0] * self.count)
+        self.false_triggers = array.array("L", [0] * self.count)
+
+    # Set every pad's baseline to the average of some readings; nobody
+    # should be touching the pads while this runs
+    def calibrate(self, samples=8):
+        for pad in range(self.count):
+            if self.inputs[pad] is not None:
+                self.recalibrate(pad, samples)
+
+    # Start a pad's baseline again from its current reading. The noise level
+    # is kept: it's only the baseline that has moved.
+    def recalibrate(self, pad, samples=1):
+        total = 0
+        for _ in range(samples):
+            total += self.inputs[pad].raw_value
+        self.raw[pad] = total // samples
+        self.baselines[pad] = (total << BASELINE_BITS) // samples
+        self.runs[pad] = 0
+        self.state &= ~(1 << pad)
+        self.stale &= ~(1 << pad)
+
+    # How far above the baseline a reading has to be to count as a touch
+    def threshold(self, pad):
+        delta = (self.noise[pad] * self.noise_factor) >> BASELINE_BITS
+        if delta < self.min_delta:
+            return self.min_delta
+        return delta
+
+    def baseline(self, pad):
+        return self.baselines[pad] >> BASELINE_BITS
+
+    def touched(self, pad):
+        return (self.state >> pad) & 1
+
+    #------------------------------------------------------------------------
+    # Measure one pad and update its state
+    #------------------------------------------------------------------------
+    def measure(self, pad, now=None):
+        started = time.monotonic_ns()
+        raw = self.inputs[pad].raw_value
+        elapsed = (time.monotonic_ns() - started) // 1000
+        if self.measures[pad]:
+            average = self.measure_us[pad]
+            self.measure_us[pad] = average + ((elapsed - average) >> 3)
+        else:
+            self.measure_us[pad] = elapsed
+        self.measures[pad] += 1
+        self.raw[pad] = raw
+        if now is None:
+            now = (started // 1000000) & MS_MASK
+
+        bit = 1 << pad
+        baseline = self.baselines[pad]
+        noise = self.noise[pad]
+        delta = raw - (baseline >> BASELINE_BITS)
+        threshold = (noise * self.noise_factor) >> BASELINE_BITS
+        if threshold < self.min_delta:
+            threshold = self.min_delta
+        if self.state & bit:
+            runs = self.runs
+            held = (now - self.touched_since[pad]) & MS_MASK
+            if delta < threshold // 2:
+                self.state &= ~bit
+                self.stale &= ~bit
+                if runs[pad] == 1:
+                    self.false_triggers[pad] += 1
+            elif held > self.max_touch_ms:
+                self.false_triggers[pad] += 1
+                self.discarded |= bit
+                self.recalibrate(pad)
+            else:
+                if held > self.stale_ms:
+                    self.stale |= bit
+                if runs[pad] < 65535:
+                    runs[pad] += 1
+        elif delta > threshold:
+            self.state |= bit
+            self.touched_since[pad] = now
+            self.runs[pad] = 1
+        else:
+            # Untouched: follow slow drift, and how noisy the pad is
+            self.baselines[pad] = baseline + (((raw << BASELINE_BITS) - baseline) >> self.baseline_shift)
+            if delta < 0:
+                delta = -delta
+            self.noise[pad] = noise + (((delta << BASELINE_BITS) - noise) >> self.noise_shift)
+        return elapsed
+
+    #------------------------------------------------------------------------
+    # Measure pads, round-robin, within the time budget (always at least
+    # one). Returns the mask of touched pads; measured is set to the mask
+    # of pads that were actually measured, and discarded to those that were
+    # recalibrated because they had been touched for too long.
+    #------------------------------------------------------------------------
+    def sample(self):
+        self.discarded = 0
+        inputs = self.inputs
+        count = self.count
+        budget = self.budget_us
+        measure_us = self.measure_us
+        spent = 0
+        measured = 0
+        pad = self.next_pad
+        now = (time.monotonic_ns() // 1000000) & MS_MASK
+        for _ in range(count):
+            if inputs[pad] is not None:
+                # Stop if this pad's average measurement says it won't fit
+                if budget is not None and measured and spent + measure_us[pad] > budget:
+                    break
+                spent += self.measure(pad, now)
+                measured |= 1 << pad
+            pad += 1
+            if pad == count:
+                pad = 0
+                self.sweeps += 1
+        self.next_pad = pad
+        self.measured = measured
+        return self.state
+
+    # Full passes over every pad per second, since the stats were reset
+    def scans_per_second(self):
+        elapsed = time.monotonic_ns() - self.started_ns
+        if elapsed <= 0:
+            return 0.0
+        return self.sweeps * 1000000000 / elapsed
+
+    def print_stats(self, name="touch pads"):
+        print("%s: %0.1f scans/s" % (name, self.scans_per_second()))
+        for pad in range(self.count):
+            if self.inputs[pad] is None:
+                continue
+            print("  pad %d: baseline %d, threshold %d, %d us/measurement, %d false triggers" %
+                  (pad, self.baseline(pad), self.threshold(pad), self.measure_us[pad],
+                   self.false_triggers[pad]))
@@ -0,0 +1,179 @@
+##############################################################################
+#                 Bitmask Touch Pad Scanner                                  #
+##############################################################################
+# Scans a set of touchio.TouchIn pads into one integer, bit n set when pad  #
+# n is touched, without allocating anything. Each pad is debounced with an #
+# integrator that counts up while it reads touched and down while it      #
+# doesn't, and only changes state at either end, so a single noisy read   #
+# can't register as a touch or a release.                                    #
+#                                                                            #
+# A touch is reported once, when every pad involved has been let go, as    #
+# the mask of all the pads touched along the way. Touching one pad gives   #
+# its bit; touching several together (a chord) gives all of theirs.        #
+#                                                                            #
+# Pads are read through their own value by default, or through a           #
+# TouchSampler (see touch_sampler.py) for adaptive thresholds. A sampler   #
+# with a time budget may only measure some pads each scan; the others      #
+# keep their debounce counts until they're measured again. A pad the       #
+# sampler discards (touched for too long, so really a baseline jump) is    #
+# released without counting towards the touch, and one it flags as stale   #
+# (touched for a while already) stops holding up the other pads' touches.  #
+##############################################################################
+
+import time
+
+#----------------------------------------------------------------------------
+# Parse a code into a list of touch masks. Each digit is one touch of that
+# pad; digits in square brackets are touched together, e.g. "3[47]2".
+# Raises ValueError if the code isn't written that way.
+#----------------------------------------------------------------------------
+def code_masks(code):
+    masks = []
+    chord = None
+    for c in code:
+        if c == "[":
+            if chord is not None:
+                raise ValueError("code %r: chords can't be nested" % code)
+            chord = 0
+        elif c == "]":
+            if chord is None:
+                raise ValueError("code %r: ] without [" % code)
+            if chord == 0:
+                raise ValueError("code %r: empty chord" % code)
+            masks.append(chord)
+            chord = None
+        elif not c.isdigit():
+            raise ValueError("code %r: %r isn't a pad number" % (code, c))
+        elif chord is None:
+            masks.append(1 << int(c))
+        else:
+            chord |= 1 << int(c)
+    if chord is not None:
+        raise ValueError("code %r: [ without ]" % code)
+    return masks
+
+#----------------------------------------------------------------------------
+# A touch mask written the same way, e.g. "3" or "[47]"
+#----------------------------------------------------------------------------
+def mask_name(mask):
+    pads = ""
+    pad = 0
+    while mask >> pad:
+        if mask & (1 << pad):
+            pads += str(pad)
+        pad += 1
+    if len(pads) == 1:
+        return pads
+    return "[" + pads + "]"
+
+class TouchScanner:
+    #------------------------------------------------------------------------
+    # inputs is a list of TouchIn objects indexed by pad number (None for
+    # numbers with no pad). A pad changes state after `debounce` readings
+    # in a row that agree.
+    #------------------------------------------------------------------------
+    def __init__(self, inputs, debounce=3, sampler=None):
+        self.inputs = inputs
+        self.debounce = debounce
+        self.sampler = sampler
+        # Pads read by the last read_raw(), and those the sampler discarded
+        # or flagged as stale
+        self.measured = (1 << len(inputs)) - 1
+        self.discarded = 0
+        self.stale = 0
+        self.levels = bytearray(len(inputs))
+        # Debounced state of every pad
+        self.state = 0
+        # Pads that went down / up on the last scan
+        self.pressed = 0
+        self.released = 0
+        # Pads touched since they were last all released
+        self.chord = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.scans = 0
+        self.last_scan_ns = 0
+        self.worst_scan_ns = 0
+        self.total_scan_ns = 0
+
+    # Raw, undebounced touch mask
+    def read_raw(self):
+        if self.sampler is not None:
+            raw = self.sampler.sample()
+            self.measured = self.sampler.measured
+            self.discarded = self.sampler.discarded
+            self.stale = self.sampler.stale
+            return raw
+        raw = 0
+        bit = 1
+        for pad in self.inputs:
+            if pad is not None and pad.value:
+                raw |= bit
+            bit <<= 1
+        return raw
+
+    #------------------------------------------------------------------------
+    # Scan every pad. Returns the mask of a touch that has just finished,
+    # or 0 if none has.
+    #------------------------------------------------------------------------
+    def scan(self):
+        started = time.monotonic_ns()
+        raw = self.read_raw()
+        measured = self.measured
+        discarded = self.discarded
+        levels = self.levels
+        debounce = self.debounce
+        state = self.state
+        new_state = state
+        bit = 1
+        for pad in range(len(levels)):
+            level = levels[pad]
+            if discarded & bit:
+                level = 0
+                new_state &= ~bit
+            elif not measured & bit:
+                pass
+            elif raw & bit:
+                if level < debounce:
+                    level += 1
+                    if level == debounce:
+                        new_state |= bit
+            elif level > 0:
+                level -= 1
+                if level == 0:
+                    new_state &= ~bit
+            levels[pad] = level
+            bit <<= 1
+
+        self.pressed = new_state & ~state
+        self.released = state & ~new_state & ~discarded
+        self.state = new_state
+        # A stale pad doesn't count towards a touch, or keep one from ending
+        stale = self.stale
+        self.chord = ((self.chord & ~discarded) | new_state) & ~stale
+        touch = 0
+        if new_state & ~stale == 0 and self.chord:
+            touch = self.chord
+            self.chord = 0
+
+        elapsed = time.monotonic_ns() - started
+        self.scans += 1
+        self.last_scan_ns = elapsed
+        self.total_scan_ns += elapsed
+        if elapsed > self.worst_scan_ns:
+            self.worst_scan_ns = elapsed
+        return touch
+
+    # Forget any touch in progress; it has to be let go and touched again
+    def clear(self):
+        self.chord = 0
+        self.state = 0
+        for pad in range(len(self.levels)):
+            self.levels[pad] = 0
+
+    def print_stats(self, name="touch"):
+        average = self.total_scan_ns // self.scans if self.scans else 0
+        print("%s: %d scans, last %d us, average %d us, worst %d us" %
+              (name, self.scans, self.last_scan_ns // 1000, average // 1000,
+               self.worst_scan_ns // 1000))
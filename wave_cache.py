@@ -0,0 +1,119 @@
+##############################################################################
+#                 Cached Wavetables for Playing Notes                        #
+##############################################################################
+# A looped sample plays at sample_rate / length Hz per cycle it holds, so a #
+# one-cycle table can only hit frequencies that divide the sample rate      #
+# (8000 / 440 = 18.18 samples, which truncates to 18 and plays 444 Hz).     #
+# Tables here hold however many whole cycles it takes for the loop to play  #
+# within CENTS_TOLERANCE of the asked-for frequency: 440 Hz at 8 kHz is 11  #
+# cycles in exactly 200 samples.                                             #
+#                                                                            #
+# WaveCache builds each table once and keeps it, with its RawSample, until  #
+# the cache runs over its memory budget, when the least recently played   #
+# tables are dropped first.                                                  #
+##############################################################################
+
+import array
+import math
+
+import audioio
+
+# How close, in cents, the looped table's pitch must be to the one asked for
+CENTS_TOLERANCE = 1.0
+
+# Longest table to consider, in samples
+MAX_TABLE_LENGTH = 2048
+
+#----------------------------------------------------------------------------
+# The fewest whole cycles, and the table length holding them, that play
+# within tolerance cents of frequency. If nothing up to max_length is close
+# enough, the closest found.
+#----------------------------------------------------------------------------
+def table_size(frequency, sample_rate, tolerance=CENTS_TOLERANCE, max_length=MAX_TABLE_LENGTH):
+    best = None
+    best_error = None
+    cycles = 1
+    while True:
+        length = int(sample_rate * cycles / frequency + 0.5)
+        if length > max_length:
+            break
+        if length >= 2:
+            error = abs(1200 * math.log(sample_rate * cycles / length / frequency) / math.log(2))
+            if error <= tolerance:
+                return (cycles, length)
+            if best is None or error < best_error:
+                best = (cycles, length)
+                best_error = error
+        cycles += 1
+    if best is None:
+        return (1, max(2, min(max_length, int(sample_rate / frequency + 0.5))))
+    return best
+
+#----------------------------------------------------------------------------
+# A sine wavetable of 16-bit unsigned samples (as RawSample expects)
+# looping at frequency. volume is 0.0-1.0.
+#----------------------------------------------------------------------------
+def make_wavetable(frequency, sample_rate, volume=1.0):
+    cycles, length = table_size(frequency, sample_rate)
+    amplitude = int(32767 * volume)
+    step = 2 * math.pi * cycles / length
+    table = array.array("H", [0] * length)
+    for i in range(length):
+        table[i] = 32768 + int(math.sin(step * i) * amplitude)
+    return table
+
+class WaveCache:
+    def __init__(self, max_bytes=8192, volume=1.0):
+        self.max_bytes = max_bytes
+        self.volume = volume
+        self.samples = {}
+        self.tables = {}
+        # Keys from least to most recently used
+        self.order = []
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    #------------------------------------------------------------------------
+    # A RawSample that loops at frequency, built the first time it's asked
+    # for and reused after that.
+    #------------------------------------------------------------------------
+    def get(self, frequency, sample_rate=8000):
+        key = (frequency, sample_rate)
+        sample = self.samples.get(key)
+        if sample is not None:
+            self.hits += 1
+            if self.order[-1] != key:
+                self.order.remove(key)
+                self.order.append(key)
+            return sample
+
+        self.misses += 1
+        table = make_wavetable(frequency, sample_rate, self.volume)
+        size = 2 * len(table)
+        while self.order and self.bytes + size > self.max_bytes:
+            self.evict(self.order[0])
+        sample = audioio.RawSample(table, sample_rate=sample_rate)
+        self.samples[key] = sample
+        self.tables[key] = table
+        self.order.append(key)
+        self.bytes += size
+        return sample
+
+    def evict(self, key):
+        self.samples.pop(key).deinit()
+        self.bytes -= 2 * len(self.tables.pop(key))
+        self.order.remove(key)
+        self.evictions += 1
+
+    # Build the tables for a list of frequencies up front, e.g. at startup,
+    # so the first time each note plays doesn't wait for it
+    def preload(self, frequencies, sample_rate=8000):
+        for frequency in frequencies:
+            self.get(frequency, sample_rate)
+
+    def print_stats(self, name="waves"):
+        print("%s: %d tables in %d bytes, %d hits, %d misses, %d evicted" %
+              (name, len(self.order), self.bytes, self.hits, self.misses,
+               self.evictions))